@@ -0,0 +1,142 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import random
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from ldap3 import MOCK_SYNC, Connection, Server
+from ldap3.protocol.schemas.slapd24 import (slapd_2_4_dsa_info,
+                                            slapd_2_4_schema)
+
+import bituldap as b
+
+""" Synthetic directory for benchmarks, served by an ldap3 MOCK_SYNC
+    server, with the same layout as the test data in tests/config.py.
+"""
+
+BASE_DN = 'dc=example,dc=org'
+USERS_DN = f'ou=people,{BASE_DN}'
+GROUPS_DN = f'ou=groups,{BASE_DN}'
+ADMIN_DN = f'cn=admin,{BASE_DN}'
+ADMIN_PASSWORD = 'adminpassword'
+
+# First POSIX IDs of generated users and groups.
+FIRST_UID = 10000
+FIRST_GID = 20000
+
+
+@dataclass
+class DirectorySpec:
+    """Shape of a synthetic directory.
+
+    Args:
+        users (int): Number of users.
+        groups (int): Number of groups.
+        members (int): Users per group.
+        nesting (int): Depth of nested groups. Groups are chained, so
+            each group contains the next group of its chain, up to
+            nesting levels deep.
+        seed (int): Seed of the random member selection.
+    """
+    users: int = 1000
+    groups: int = 100
+    members: int = 20
+    nesting: int = 0
+    seed: int = 0
+
+
+def user_dn(index: int) -> str:
+    return f'uid={user_uid(index)},{USERS_DN}'
+
+
+def user_uid(index: int) -> str:
+    return f'user{index:06d}'
+
+
+def group_cn(index: int) -> str:
+    return f'group{index:06d}'
+
+
+def group_dn(index: int) -> str:
+    return f'cn={group_cn(index)},{GROUPS_DN}'
+
+
+def entries(spec: DirectorySpec) -> List[Tuple[str, dict]]:
+    """Generate the entries of a synthetic directory.
+
+    Args:
+        spec (DirectorySpec): Shape of the directory.
+
+    Returns:
+        List[Tuple[str, dict]]: DN and attributes of each entry, parents
+            first.
+    """
+    rng = random.Random(spec.seed)
+    result: List[Tuple[str, dict]] = [
+        (BASE_DN, {'objectClass': ['domain', 'top'], 'dc': 'example'}),
+        (USERS_DN, {'objectClass': ['organizationalUnit', 'top'],
+                    'ou': 'people'}),
+        (GROUPS_DN, {'objectClass': ['organizationalUnit', 'top'],
+                     'ou': 'groups'}),
+    ]
+    for i in range(spec.users):
+        uid = user_uid(i)
+        result.append((user_dn(i), {
+            'objectClass': ['inetOrgPerson', 'posixAccount', 'top'],
+            'uid': uid,
+            'cn': f'User {i}',
+            'sn': f'{i}',
+            'mail': f'{uid}@example.org',
+            'uidNumber': FIRST_UID + i,
+            'gidNumber': FIRST_GID,
+            'homeDirectory': f'/home/{uid}',
+            'loginShell': '/bin/bash',
+        }))
+
+    chain = spec.nesting + 1
+    for j in range(spec.groups):
+        members = [user_dn(i) for i in
+                   rng.sample(range(spec.users),
+                              min(spec.members, spec.users))]
+        if spec.nesting and j % chain < spec.nesting and j + 1 < spec.groups:
+            members.append(group_dn(j + 1))
+        result.append((group_dn(j), {
+            'objectClass': ['groupOfNames', 'posixGroup', 'top'],
+            'cn': group_cn(j),
+            'gidNumber': FIRST_GID + j,
+            'member': members or [ADMIN_DN],
+        }))
+    return result
+
+
+def connect(spec: DirectorySpec) -> Tuple[bool, Connection]:
+    """Create a MOCK_SYNC server holding a synthetic directory, and
+    configure the library to use it.
+
+    Args:
+        spec (DirectorySpec): Shape of the directory.
+
+    Returns:
+        bool: Bound successfully.
+        Connection: Connection to the mock server.
+    """
+    server = Server.from_definition('bench_server', slapd_2_4_dsa_info,
+                                    slapd_2_4_schema)
+    b.singleton.shared_configuration = b.types.Configuration(
+        servers=[server],
+        username=ADMIN_DN,
+        password=ADMIN_PASSWORD,
+        read_only=False,
+        users=b.types.LdapQueryOptions(USERS_DN, ['inetOrgPerson'],
+                                       ['posixAccount']),
+        groups=b.types.LdapQueryOptions(GROUPS_DN, ['groupOfNames'],
+                                        ['posixGroup']))
+    b.invalidate_object_definitions()
+
+    connection = Connection(server=server, user=ADMIN_DN,
+                            password=ADMIN_PASSWORD,
+                            client_strategy=MOCK_SYNC)
+    connection.strategy.add_entry(ADMIN_DN, {'userPassword': ADMIN_PASSWORD,
+                                             'sn': 'admin'})
+    for dn, attributes in entries(spec):
+        connection.strategy.add_entry(dn, attributes, validate=False)
+    return connection.bind(), connection
@@ -0,0 +1,311 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import argparse
+import datetime
+import gc
+import itertools
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+from unittest.mock import patch
+
+import ldap3
+
+import bituldap as b
+from benchmarks import directory
+from benchmarks.directory import DirectorySpec
+
+""" Benchmarks of the library against a synthetic MOCK_SYNC directory.
+
+    Usage:
+        python -m benchmarks.run --scale 1000 10000 --output results.json
+        python -m benchmarks.run --compare before.json after.json
+
+    Each benchmark is timed like timeit: an operation is called enough
+    times to take about --target seconds, and this is repeated --repeat
+    times. The time per call of each repeat is reported. The mock server
+    evaluates every search in Python, so absolute timings are far from
+    those of a real server, but relative changes between commits are
+    meaningful.
+"""
+
+# Users created per call by the bulk creation benchmark.
+BULK_SIZE = 100
+
+Operation = Callable[[], object]
+Setup = Callable[[DirectorySpec, random.Random], Operation]
+
+BENCHMARKS: Dict[str, Setup] = {}
+
+
+def benchmark(name: str) -> Callable[[Setup], Setup]:
+    """Register a benchmark. The decorated function is called once per
+    directory, and returns the operation to time."""
+    def register(setup: Setup) -> Setup:
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+@benchmark('get_user')
+def bench_get_user(spec: DirectorySpec, rng: random.Random) -> Operation:
+    return lambda: b.get_user(directory.user_uid(rng.randrange(spec.users)))
+
+
+@benchmark('get_user_compact')
+def bench_get_user_compact(spec: DirectorySpec,
+                           rng: random.Random) -> Operation:
+    return lambda: b.get_user(directory.user_uid(rng.randrange(spec.users)),
+                              compact=True)
+
+
+@benchmark('get_group')
+def bench_get_group(spec: DirectorySpec, rng: random.Random) -> Operation:
+    return lambda: b.get_group(directory.group_cn(rng.randrange(spec.groups)))
+
+
+@benchmark('list_groups')
+def bench_list_groups(spec: DirectorySpec, rng: random.Random) -> Operation:
+    return b.list_groups
+
+
+@benchmark('member_of')
+def bench_member_of(spec: DirectorySpec, rng: random.Random) -> Operation:
+    return lambda: b.member_of(directory.user_dn(rng.randrange(spec.users)))
+
+
+@benchmark('transitive_member_of')
+def bench_transitive_member_of(spec: DirectorySpec,
+                               rng: random.Random) -> Operation:
+    return lambda: b.transitive_member_of(
+        directory.user_dn(rng.randrange(spec.users)))
+
+
+@benchmark('next_uid_number')
+def bench_next_uid_number(spec: DirectorySpec,
+                          rng: random.Random) -> Operation:
+    return b.next_uid_number
+
+
+@benchmark('next_gid_number')
+def bench_next_gid_number(spec: DirectorySpec,
+                          rng: random.Random) -> Operation:
+    return b.next_gid_number
+
+
+@benchmark('bulk_create_users')
+def bench_bulk_create_users(spec: DirectorySpec,
+                            rng: random.Random) -> Operation:
+    counter = itertools.count()
+
+    def create() -> object:
+        batch = next(counter)
+        return b.bulk_create_users(
+            {'uid': f'bulk{batch}x{i}', 'cn': 'Bulk', 'sn': 'Bulk',
+             'gidNumber': directory.FIRST_GID,
+             'homeDirectory': f'/home/bulk{batch}x{i}'}
+            for i in range(BULK_SIZE))
+    return create
+
+
+def time_operation(operation: Operation, repeat: int,
+                   target: float) -> Dict[str, float]:
+    """Time an operation.
+
+    Args:
+        operation (Operation): Function to call.
+        repeat (int): Number of timed repeats.
+        target (float): Seconds each repeat should take, approximately.
+
+    Returns:
+        Dict[str, float]: Number of calls per repeat, and the minimum,
+            median and mean seconds per call.
+    """
+    started = time.perf_counter()
+    operation()
+    first = time.perf_counter() - started
+    number = max(1, int(target / first)) if first > 0 else 1
+
+    timings: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            operation()
+        timings.append((time.perf_counter() - started) / number)
+    return {'number': number,
+            'min': min(timings),
+            'median': statistics.median(timings),
+            'mean': statistics.mean(timings)}
+
+
+def measure_memory(spec: DirectorySpec) -> Dict[str, float]:
+    """Measure the memory held per user, as entries and as compact
+    records.
+
+    Args:
+        spec (DirectorySpec): Shape of the directory.
+
+    Returns:
+        Dict[str, float]: Bytes per entry and per record.
+    """
+    result: Dict[str, float] = {}
+    for name, compact in (('entry_bytes', False), ('record_bytes', True)):
+        gc.collect()
+        tracemalloc.start()
+        users = b.list_users(compact=compact)
+        held, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result[name] = held / max(len(users), 1)
+        del users
+    return result
+
+
+def run(specs: List[DirectorySpec], names: List[str], repeat: int,
+        target: float, quiet: bool = False) -> List[dict]:
+    """Run benchmarks against directories of each shape.
+
+    Args:
+        specs (List[DirectorySpec]): Shapes of the directories.
+        names (List[str]): Benchmarks to run.
+        repeat (int): Number of timed repeats.
+        target (float): Seconds each repeat should take, approximately.
+        quiet (bool, optional): Don't print each result to stderr.
+
+    Returns:
+        List[dict]: Result of each benchmark and directory.
+    """
+    results: List[dict] = []
+    for spec in specs:
+        shape = {'users': spec.users, 'groups': spec.groups,
+                 'members': spec.members, 'nesting': spec.nesting}
+        for name in names:
+            # Benchmarks changing the directory get a fresh one.
+            connection = directory.connect(spec)
+            with patch("bituldap.create_connection",
+                       return_value=connection):
+                if name == 'memory':
+                    measured = measure_memory(spec)
+                else:
+                    operation = BENCHMARKS[name](spec,
+                                                 random.Random(spec.seed))
+                    measured = time_operation(operation, repeat, target)
+            result = {'benchmark': name, **shape, **measured}
+            results.append(result)
+            if not quiet:
+                print(format_result(result), file=sys.stderr)
+    b.close_connections()
+    return results
+
+
+def format_result(result: dict) -> str:
+    if result['benchmark'] == 'memory':
+        return (f"{result['benchmark']:<22} {result['users']:>8} users  "
+                f"entry {result['entry_bytes']:>10.0f} B  "
+                f"record {result['record_bytes']:>8.0f} B")
+    return (f"{result['benchmark']:<22} {result['users']:>8} users  "
+            f"{result['median'] * 1000:>10.3f} ms/call  "
+            f"(min {result['min'] * 1000:.3f}, n={result['number']})")
+
+
+def commit() -> Optional[str]:
+    """Get the commit of the working tree, if it is a git repository."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'],
+                              capture_output=True, check=True,
+                              text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(before: dict, after: dict) -> List[str]:
+    """Compare two result files.
+
+    Args:
+        before (dict): Results of the baseline.
+        after (dict): Results to compare with the baseline.
+
+    Returns:
+        List[str]: Lines of a report, with the ratio of the median time
+            per call, or of the memory per entry, after to before.
+    """
+    def key(result: dict) -> tuple:
+        return (result['benchmark'], result['users'], result['groups'],
+                result['members'], result['nesting'])
+
+    def metric(result: dict) -> float:
+        if result['benchmark'] == 'memory':
+            return result['record_bytes']
+        return result['median']
+
+    baseline = {key(result): result for result in before['results']}
+    lines = [f"{before.get('commit')} -> {after.get('commit')}"]
+    for result in after['results']:
+        old = baseline.get(key(result))
+        if old is None or not metric(old):
+            continue
+        ratio = metric(result) / metric(old)
+        lines.append(f"{result['benchmark']:<22} {result['users']:>8} users  "
+                     f"{ratio:>6.2f}x")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.run',
+        description='Benchmark bituldap against a synthetic directory.')
+    parser.add_argument('--scale', type=int, nargs='+', default=[1000],
+                        help='numbers of users, e.g. 1000 10000 100000')
+    parser.add_argument('--groups', type=float, default=0.1,
+                        help='groups per user, default 0.1')
+    parser.add_argument('--members', type=int, default=20,
+                        help='users per group, default 20')
+    parser.add_argument('--nesting', type=int, default=2,
+                        help='depth of nested groups, default 2')
+    parser.add_argument('--benchmark', nargs='+',
+                        choices=sorted(BENCHMARKS) + ['memory'],
+                        default=list(BENCHMARKS) + ['memory'],
+                        help='benchmarks to run, default all')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--target', type=float, default=0.2,
+                        help='seconds per repeat, default 0.2')
+    parser.add_argument('--output', help='write results to a JSON file')
+    parser.add_argument('--quiet', action='store_true',
+                        help="don't print results while running")
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='compare two result files')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as before, open(args.compare[1]) as after:
+            print('\n'.join(compare(json.load(before), json.load(after))))
+        return 0
+
+    specs = [DirectorySpec(users=scale,
+                           groups=max(1, int(scale * args.groups)),
+                           members=args.members,
+                           nesting=args.nesting)
+             for scale in args.scale]
+    results = run(specs, args.benchmark, args.repeat, args.target,
+                  args.quiet)
+    report = {
+        'commit': commit(),
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'ldap3': ldap3.__version__,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(report, fp, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
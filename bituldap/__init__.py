@@ -1,15 +1,76 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
-from typing import List, Tuple, Union
-
-from ldap3.core.exceptions import LDAPSessionTerminatedByServerError
+import copy
+import itertools
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import (Callable, Dict, Iterable, Iterator, List, Mapping,
+                    Optional, Sequence, Set, Tuple, TypeVar, Union, cast)
+
+from ldap3.core.exceptions import (LDAPBindError, LDAPCommunicationError,
+                                   LDAPException)
+from ldap3.core.results import RESULT_ENTRY_ALREADY_EXISTS
 from ldap3.utils.conv import escape_filter_chars
+from ldap3.utils.dn import escape_rdn, parse_dn
 from ldap3.utils.hashed import hashed
-from ldap3 import (FIRST, HASHED_SALTED_SHA, MODIFY_REPLACE,
-                   Connection, Entry, ObjectDef, Reader,
-                   ServerPool, Writer)
+from ldap3 import (ALL_ATTRIBUTES, BASE, MODIFY_ADD, MODIFY_DELETE,
+                   MODIFY_REPLACE, SUBTREE,
+                   Connection, Entry, ObjectDef, Reader, Server, Writer)
+
+from . import (allocator, configure, instrument, pool, retry, selection,
+               singleton, snapshot, transfer)
+from .allocator import AllocationError
+from .cache import CachedEntry, EntryCache
+from .cursor import (CommitWriter, add_commit_listener, cursor_from_responses,
+                     notify_commit, set_connection_source, writer_from_reader)
+from .index import MembershipIndex
+from .instrument import (BudgetExceeded, Event, Tracker,
+                         add_operation_listener, timed, timed_iteration)
+from .membership import MembershipMemo, is_descendant
+from .mirror import Mirror
+from .bulk import BulkWorkers
+from .pool import ConnectionPool, PoolTimeoutError
+from .record import Record, records_from_responses
+from .retry import RetryPolicy
+from .selection import ServerSelector
+from .types import (Attributes, BulkResult, Configuration, ImportResult,
+                    LdapQueryOptions)
+
+# Upper bound on cached ObjectDefs, reached only if the schema keeps changing.
+OBJECT_DEFINITION_LIMIT = 256
+
+# Default upper bound on the length of generated LDAP filters, well below
+# the request size limits of common LDAP servers.
+FILTER_LENGTH_LIMIT = 8192
+
+# Number of times a chunk of DNs tested for group membership is split in
+# halves, before testing the remaining DNs one at a time. Each level at
+# most doubles the searches, so a chunk of n DNs takes at most
+# 2 ** (MEMBER_SPLIT_DEPTH + 1) - 1 + n searches.
+MEMBER_SPLIT_DEPTH = 3
+
+# Attributes left out when listing groups, unless explicitly requested.
+MEMBER_ATTRIBUTES = ['member', 'uniqueMember', 'memberUid']
+
+# Operations taking longer than the configured slow_query_threshold.
+slow_log = logging.getLogger('bituldap.slow')
+
+T = TypeVar('T')
+
+
+def as_list(value: Union[str, Sequence[str]]) -> List[str]:
+    """Normalize a value that is either a string or a list to a list.
+
+    Args:
+        value (Union[str, Sequence[str]]): Single value or list of values.
 
-from . import configure, singleton
-from .types import Configuration, LdapQueryOptions
+    Returns:
+        List[str]: List of values.
+    """
+    if isinstance(value, str):
+        return [value]
+    return list(value)
 
 
 def read_configuration() -> Configuration:
@@ -37,310 +98,2711 @@ def read_configuration() -> Configuration:
     return singleton.shared_configuration
 
 
-def __ldap_reconnect() -> Tuple[bool, Connection]:
+def server_selector(replica: bool = False) -> ServerSelector:
+    """Get the server selector matching the current configuration,
+    creating it on first use. The selector is shared by read-only and
+    read/write connections to the same servers.
+
+    Args:
+        replica (bool): Return the selector of the read servers.
+
+    Returns:
+        ServerSelector: Shared server selector.
+    """
+    config = read_configuration()
+    servers = config.read_servers if replica else config.servers
+    key = (tuple(str(server) for server in servers),
+           config.server_strategy)
+    with singleton.shared_selectors_lock:
+        if key not in singleton.shared_selectors:
+            singleton.shared_selectors[key] = ServerSelector(
+                servers,
+                strategy=config.server_strategy,
+                failure_threshold=config.server_failure_threshold,
+                reset_timeout=config.server_reset_timeout,
+                probe=selection.probe_server)
+        return singleton.shared_selectors[key]
+
+
+def __ldap_reconnect(read_only: bool = False,
+                     replica: bool = False) -> Tuple[bool, Connection]:
     """Create a new connection to an LDAP server
 
     This function exists separate from the create_connection()
     to facilitate easier unittesting, by allowing the LDAP
     connection to be mocked, while retaining reconnect logic.
 
+    Servers are tried in the order preferred by the server selector,
+    until one accepts the connection.
+
+    Args:
+        read_only (bool): Open a read-only connection, even if the
+            configuration allows writes.
+        replica (bool): Connect to one of the read servers, rather than
+            the primary servers.
+
+    Raises:
+        LDAPCommunicationError: None of the servers could be reached.
+
     Returns:
         bool: Successfully connected to LDAP server.
         Connection: LDAP connection object.
     """
     config = read_configuration()
-    server_pool = ServerPool(config.servers, FIRST)
-    connection = Connection(server=server_pool,
+    selector = server_selector(replica)
+    servers = selector.candidates()
+    if not servers:
+        raise LDAPCommunicationError('No LDAP servers configured')
+    connection = Connection(server=servers[0],
                             user=config.username,
                             password=config.password,
-                            read_only=config.read_only)
-    bound = connection.bind()
-    return bound, connection
+                            read_only=config.read_only or read_only)
+    return open_session(connection, selector, servers), connection
+
 
+def open_session(connection: Connection, selector: ServerSelector,
+                 servers: List[Server]) -> bool:
+    """Bind a connection to the first of the servers accepting it.
+
+    Args:
+        connection (Connection): Unbound LDAP connection.
+        selector (ServerSelector): Selector recording the outcome.
+        servers (List[Server]): Servers to try, in order.
 
-def create_connection() -> Tuple[bool, Connection]:
-    """Creates a new connection to an LDAP server.
+    Raises:
+        LDAPCommunicationError: None of the servers could be reached.
 
     Returns:
-        bool: Successfully connected to LDAP server.
-        Connection: LDAP connection object.
+        bool: Successfully bound.
     """
-    return __ldap_reconnect()
+    error: Optional[LDAPCommunicationError] = None
+    for server in servers:
+        connection.server = server
+        started = time.monotonic()
+        try:
+            with timed('bind', connection) as event:
+                bound = event.success = connection.bind()
+        except LDAPCommunicationError as e:
+            selector.record_failure(server)
+            error = e
+            continue
+        selector.record_success(server, time.monotonic() - started)
+        return bound
+    raise error or LDAPCommunicationError('No LDAP servers configured')
+
+
+def reconnect(connection: Connection) -> None:
+    """Replace the session of a borrowed connection, after a transient
+    error. The connection is bound again, to the preferred server of the
+    same set of servers. The connection object itself is kept, so it
+    keeps its place in the pool, and entries read using it stay usable.
 
+    Args:
+        connection (Connection): Broken LDAP connection.
 
-def ldap_query(connection: Connection,
-               object_def: ObjectDef,
-               dn: str, query: str) -> Union[Reader, Writer]:
-    """Query LDAP server and reader or writer object. The reader cursor is
-    converted to a writer, if the connection to LDAP is defined as read/write.
-    If not, a reader is returned
+    Raises:
+        LDAPCommunicationError: None of the servers could be reached.
+        LDAPBindError: The server rejected the credentials.
+    """
+    record_failure(connection)
+    try:
+        connection.unbind()
+    except Exception:
+        # The session is being replaced, errors from the old socket
+        # are expected.
+        pass
+
+    config = read_configuration()
+    replica = any(connection.server is server
+                  for server in config.read_servers)
+    selector = server_selector(replica)
+    if not open_session(connection, selector, selector.candidates()):
+        raise LDAPBindError(f'Unable to bind as {connection.user}')
+
+
+def retry_policy() -> RetryPolicy:
+    """Get the retry policy of the current configuration.
+
+    Returns:
+        RetryPolicy: Retry settings.
+    """
+    config = read_configuration()
+    return RetryPolicy(attempts=config.retry_attempts,
+                       backoff=config.retry_backoff,
+                       max_backoff=config.retry_max_backoff,
+                       deadline=config.retry_deadline)
+
+
+def retry_operation(connection: Connection,
+                    operation: Callable[[], T],
+                    retry_if: Optional[Callable[[T], bool]] = None) -> T:
+    """Run an operation on a borrowed connection, retrying on transient
+    errors according to the retry policy. The session of the connection
+    is replaced, using reconnect(), before every retry.
 
     Args:
-        connection (Connection): LDAP connection
-        object_def (ObjectDef): Object representation of the LDAP object
-            classes
-            (https://ldap3.readthedocs.io/en/latest/abstraction.html#objectdef-class).
-        dn (str): Distinguished Name of the LDAP subtree that is to be queried.
-        query (str): LDAP query, in either standard LDAP query language, or
-            LDAP3 Simplified Query Language
-            (https://ldap3.readthedocs.io/en/latest/abstraction.html#simplified-query-language)
+        connection (Connection): LDAP connection used by operation.
+        operation (Callable[[], T]): LDAP operation.
+        retry_if (Callable, optional): Check of the return value, for
+            operations reporting failures by their result.
 
     Returns:
-        Union[Reader, Writer]: LDAP server response, as a reader or writer
-            object. The only functional difference between the two types
-            are the ability to commit changes to the LDAP server.
+        T: Return value of operation.
     """
+    return retry.call(operation, retry_policy(),
+                      recover=lambda: reconnect(connection),
+                      retry_if=retry_if)
 
-    reader = Reader(connection, object_def, dn, escape_filter_chars(query))
 
-    try:
-        reader.search()
-    except LDAPSessionTerminatedByServerError:
-        bound, c = create_connection()
-        return ldap_query(c, object_def, dn, query)
+def record_latency(connection: Connection, started: float) -> None:
+    """Update the latency statistics of the server used by a connection.
 
-    if not connection.read_only:
-        writer = Writer.from_cursor(reader)
-        return writer
-    return reader
+    Args:
+        connection (Connection): LDAP connection.
+        started (float): time.monotonic() at the start of the operation.
+    """
+    latency = time.monotonic() - started
+    for selector in list(singleton.shared_selectors.values()):
+        selector.record_success(connection.server, latency)
 
 
-def new_entry(options: LdapQueryOptions, dn: str) -> Entry:
-    """_summary_
+def record_failure(connection: Connection) -> None:
+    """Count an error communicating with the server used by a connection.
 
     Args:
-        options (LdapQueryOptions): Settings objects containing object
-            classes of the LDAP object to create
-        dn (str): Distinguished Name of the new object.
+        connection (Connection): LDAP connection.
+    """
+    for selector in list(singleton.shared_selectors.values()):
+        selector.record_failure(connection.server)
 
-    Returns:
-        Entry: Newly created, but not committed LDAP object.
-            Actual attributes will depend on the specified object
-            classes.
+
+def record_write(request: dict) -> None:
+    """Note the time of a committed change, starting the read-your-writes
+    window. This is registered as a commit listener.
+
+    Args:
+        request (dict): LDAP request of the committed change.
     """
-    bound, connection = create_connection()
-    if not bound:
-        return Entry(dn=dn, cursor=None)
-    object_def = ObjectDef(options.object_classes,
-                           connection,
-                           auxiliary_class=options.auxiliary_classes)
-    writer = Writer(connection, object_def)
-    return writer.new(dn)
+    singleton.shared_last_write = time.monotonic()
 
 
-def get_single_object(query_options: LdapQueryOptions,
-                      attr: str,
-                      value: str) -> Union[None, Entry]:
-    """Fetch a single object from LDAP.
+add_commit_listener(record_write)
+
+
+def log_slow_operation(event: Event) -> None:
+    """Log operations taking longer than the configured
+    slow_query_threshold, as warnings of the "bituldap.slow" logger.
+    This is registered as an operation listener.
 
     Args:
-        query_options (LdapQueryOptions): Settings object containing
-            object classes and base dn for the queried object.
-        attr (str): LDAP attribute to query on.
-        value (str): Value of the LDAP attribute queried.
+        event (Event): The completed operation.
+    """
+    threshold = read_configuration().slow_query_threshold
+    if threshold <= 0 or event.latency < threshold:
+        return
+    slow_log.warning('%s took %.3fs on %s, %d entries, filter %s%s',
+                     event.operation, event.latency, event.server or '-',
+                     event.entries, event.filter_shape or '-',
+                     f', {event.error}' if event.error else '')
+
+
+add_operation_listener(log_slow_operation)
+
+
+def track(binds: Optional[int] = None,
+          searches: Optional[int] = None,
+          modifies: Optional[int] = None,
+          entries: Optional[int] = None,
+          strict: bool = True) -> Tracker:
+    """Count the LDAP requests made, and entries returned, within a
+    block, optionally enforcing a budget. Requests made by the current
+    thread or asyncio task are counted, including those made on its
+    behalf by worker threads of the library, e.g. by bulk_create_users()
+    and the bituldap.aio functions. Entries served from the entry cache
+    or membership index cost no requests.
+
+    Example:
+        with bituldap.track(searches=2) as usage:
+            bituldap.member_of(dn)
+        print(usage.searches, usage.entries)
 
-    Raises:
-        Exception: The result yielded more entries than expected.
+    Args:
+        binds (int, optional): Maximum number of binds.
+        searches (int, optional): Maximum number of searches. Each
+            paged search counts once.
+        modifies (int, optional): Maximum number of writes, i.e. adds,
+            modifies, deletes, renames and committed entries.
+        entries (int, optional): Maximum number of entries returned by
+            searches.
+        strict (bool, optional): Raise BudgetExceeded, instead of
+            sending a request exceeding the budget. Otherwise only count,
+            and leave checking the exceeded property to the caller.
+            Defaults to True.
 
     Returns:
-        Union[None, Entry]: Return either the LDAP object if found, or None.
+        Tracker: Context manager holding the counts.
     """
-    bound, connection = create_connection()
-    if not bound:
-        return None
+    return Tracker({'binds': binds, 'searches': searches,
+                    'modifies': modifies, 'entries': entries}, strict)
 
-    object_def = ObjectDef(query_options.object_classes,
-                           connection,
-                           auxiliary_class=query_options.auxiliary_classes)
 
-    # Also get modification timestamp for the requested object.
-    object_def += ['modifyTimestamp']
-    result = ldap_query(connection, object_def,
-                        query_options.dn, f'{attr}: {value}')
-    if len(result) == 0:
-        return None
-    elif len(result) > 1:
-        raise Exception("Result set larger than expected")
-    return result[0]
+def recently_written() -> bool:
+    """Check whether a change was committed within the read-your-writes
+    window, during which reads are served by the primary servers.
 
+    Returns:
+        bool: A change was committed within the window.
+    """
+    window = read_configuration().read_your_writes
+    return (window > 0 and
+            time.monotonic() - singleton.shared_last_write < window)
 
-def next_uid_number() -> int:
-    """Find the next unused POSIX user ID. This will always
-    be zero, if no posixAccount objects exists.
+
+def replica_reads() -> bool:
+    """Check whether reads are currently served by the read servers.
 
     Returns:
-        int: POSIX user ID.
+        bool: Read servers are configured, and no change was committed
+            within the read-your-writes window.
     """
-    config = read_configuration()
-    bound, connection = create_connection()
+    return bool(read_configuration().read_servers) and not recently_written()
 
-    # Query does not need to be configurable, beyond dn,
-    # as uidNumber is only provided by the posixAccount
-    # schema.
-    results = connection.extend.standard.paged_search(
-        config.users.dn,
-        '(objectClass=posixAccount)',
-        attributes=['uidNumber'],
-        paged_size=1000,
-        generator=True
-        )
-    uids = [result['attributes']['uidNumber'] for result in results]
-    return max(uids) + 1
 
+def connection_pool(read_only: bool = False,
+                    primary: bool = False) -> ConnectionPool:
+    """Get the connection pool matching the current configuration,
+    creating it on first use. Read-only and read/write connections
+    are kept in separate pools. Read-only connections are made to the
+    read servers, if configured.
 
-def next_gid_number() -> int:
-    """Find the next used POSIX group ID. Will always return zero
-    if no posixGroups are found.
+    Args:
+        read_only (bool): Return the read-only pool.
+        primary (bool): Return a pool of connections to the primary
+            servers, even for read-only connections.
 
     Returns:
-        int: POSIX group ID
+        ConnectionPool: Shared connection pool.
     """
+    config = read_configuration()
+    read_only = config.read_only or read_only
+    replica = read_only and not primary and replica_reads()
+    key = pool.pool_key(config, read_only, replica)
+    with singleton.shared_pools_lock:
+        if key in singleton.shared_pools:
+            return singleton.shared_pools[key]
+
+    # The pool opens its first connections outside the lock, so other
+    # pools remain available meanwhile.
+    created = ConnectionPool(
+        lambda: __ldap_reconnect(read_only, replica),
+        min_size=config.pool_min_size,
+        max_size=config.pool_max_size,
+        idle_timeout=config.pool_idle_timeout,
+        timeout=config.pool_timeout)
+    with singleton.shared_pools_lock:
+        shared_pool = singleton.shared_pools.setdefault(key, created)
+    if shared_pool is not created:
+        created.close()
+    return shared_pool
+
+
+def create_connection(read_only: bool = False,
+                      primary: bool = False) -> Tuple[bool, Connection]:
+    """Borrow a connection to an LDAP server from the shared connection
+    pool. The connection should be handed back using release_connection()
+    once the caller is done with it.
 
-    # Get all groups using the posixGroup object class, filtering out
-    # any "groups" without a gidNumber.
-    groups = list_groups("objectClass: posixGroup")
-    if len(groups) == 0:
-        return 0
-    gid_numbers = [group.gidNumber.value for group in groups]
-    return max(gid_numbers) + 1
+    Args:
+        read_only (bool): Borrow a read-only connection, for queries
+            which will never result in changes being committed. These
+            are served by the read servers, if configured.
+        primary (bool): Connect to the primary servers, even for
+            read-only connections, e.g. when replication lag matters.
 
+    Returns:
+        bool: Successfully connected to LDAP server.
+        Connection: LDAP connection object.
+    """
+    with timed('create_connection') as event:
+        bound, connection = connection_pool(read_only, primary).acquire()
+        event.server = instrument.server_name(connection)
+        event.success = bound
+    return bound, connection
 
-def new_user(uid: str) -> Entry:
-    """Create a new user object in LDAP. The user will be created
-    in the subtree specified in the configuration. If the method
-    "entry_commit_changes()" is not called on the returning object,
-    the entry will be discarded once the program ends.
+
+def primary_cursor(object_def: ObjectDef, base: str,
+                   responses: List[dict]) -> Union[Reader, CommitWriter]:
+    """Build entries from search responses read from a replica, bound to
+    a connection to the primary servers, so changes are committed there.
 
     Args:
-        uid (str): Account name for the new user.
+        object_def (ObjectDef): Object definition of the entries.
+        base (str): Search base of the entries.
+        responses (List[dict]): Search result entries.
 
     Returns:
-        Entry: Create, but not committed user entry.
+        Union[Reader, CommitWriter]: Cursor containing the entries.
     """
-    config = read_configuration()
-    dn = f'uid={uid},{config.users.dn}'
-    user = new_entry(config.users, dn)
-    return user
+    bound, connection = create_connection()
+    try:
+        return cursor_from_responses(connection, object_def, base,
+                                     responses)
+    finally:
+        release_connection(connection)
 
 
-def new_group(cn: str, gid_number: int = 0,
-              members: list[str] = [],
-              description: str = '') -> Tuple[bool, Entry]:
-    """Create a new group object in LDAP. The group will be created
-    in the subtree specified in the configuration. If the method
-    "entry_commit_changes()" is not called on the returning object,
-    the entry will be discarded once the program ends.
+def release_connection(connection: Connection) -> None:
+    """Return a connection borrowed with create_connection() to its pool.
+    The connection may be handed to another thread right away. Entries
+    read using it remain usable, but commit changes using a connection
+    borrowed for each commit.
 
     Args:
-        cn (str): Name of the group to create.
+        connection (Connection): LDAP connection.
+    """
+    for shared_pool in list(singleton.shared_pools.values()):
+        if shared_pool.release(connection):
+            return
+
+
+def commit_connection() -> Connection:
+    """Borrow a connection for committing changes to an entry, handed
+    back using release_connection() after the commit.
+
+    Raises:
+        LDAPCommunicationError: Unable to bind to an LDAP server.
 
     Returns:
-        bool: Group created successfully.
-        Entry: Create, but not committed group entry.
+        Connection: Bound LDAP connection.
     """
-    config = read_configuration()
-    dn = f'cn={cn},{config.groups.dn}'
-    group = new_entry(config.groups, dn)
-    group.member = members
+    bound, connection = create_connection()
+    if not bound:
+        release_connection(connection)
+        raise LDAPCommunicationError('Unable to connect to LDAP server')
+    return connection
 
-    if not members:
-        return False, group
 
-    if gid_number == 0:
-        group.gidNumber = next_gid_number()
-    else:
-        group.gidNumber = gid_number
+def retry_commit(connection: Connection, commit: Callable[[], bool]
+                 ) -> bool:
+    """Commit changes to an entry on a borrowed connection, retrying on
+    transient errors like other modify operations. The connection may
+    have been dropped by the server while idle in the pool.
 
-    if description:
-        group.description = description
+    Args:
+        connection (Connection): Connection borrowed for the commit.
+        commit (Callable[[], bool]): Function committing the changes.
 
-    created: bool = group.entry_commit_changes()
-    return created, group
+    Returns:
+        bool: The changes were committed.
+    """
+    return retry_operation(
+        connection, commit,
+        retry_if=lambda ok: not ok and retry.retryable_result(connection))
 
 
-def get_user(uid: str) -> Union[None, Entry]:
-    """Fetch a single LDAP user object based on username.
+set_connection_source(commit_connection, release_connection, retry_commit)
+
+
+def discard_connection(connection: Connection) -> None:
+    """Remove a broken connection, borrowed with create_connection(),
+    from its pool and close it.
 
     Args:
-        uid (str): Username
+        connection (Connection): LDAP connection.
+    """
+    for shared_pool in list(singleton.shared_pools.values()):
+        if shared_pool.discard(connection):
+            return
+
+
+def close_connections() -> None:
+    """Close all pooled connections and reset server statistics, e.g.
+    after changing the configuration. New pools are created on the next
+    connection.
+    """
+    with singleton.shared_pools_lock:
+        pools = list(singleton.shared_pools.values())
+        singleton.shared_pools.clear()
+    for shared_pool in pools:
+        shared_pool.close()
+
+    with singleton.shared_selectors_lock:
+        selectors = list(singleton.shared_selectors.values())
+        singleton.shared_selectors.clear()
+    for selector in selectors:
+        selector.close()
+
+
+def ldap_query(connection: Connection,
+               object_def: ObjectDef,
+               dn: str, query: str,
+               attributes: Optional[List[str]] = None
+               ) -> Union[Reader, Writer]:
+    """Query LDAP server and reader or writer object. The reader cursor is
+    converted to a writer, if the connection to LDAP is defined as read/write.
+    If not, a reader is returned
+
+    Args:
+        connection (Connection): LDAP connection
+        object_def (ObjectDef): Object representation of the LDAP object
+            classes
+            (https://ldap3.readthedocs.io/en/latest/abstraction.html#objectdef-class).
+        dn (str): Distinguished Name of the LDAP subtree that is to be queried.
+        query (str): LDAP query, in either standard LDAP query language, or
+            LDAP3 Simplified Query Language
+            (https://ldap3.readthedocs.io/en/latest/abstraction.html#simplified-query-language)
+        attributes (List[str], optional): LDAP attributes to fetch, must be
+            part of object_def. Defaults to all attributes of object_def.
 
     Returns:
-        Union[None, Entry]: LDAP entry, or None if user does not exists.
+        Union[Reader, Writer]: LDAP server response, as a reader or writer
+            object. The only functional difference between the two types
+            are the ability to commit changes to the LDAP server.
     """
-    config = read_configuration()
-    return get_single_object(config.users, 'uid', uid)
+    return ldap_search(connection, object_def, dn,
+                       escape_filter_chars(query), attributes)
 
 
-def get_group(cn: str) -> Union[None, Entry]:
-    """Fetch a single LDAP group object, based on group name.
+def ldap_search(connection: Connection,
+                object_def: ObjectDef,
+                dn: str, query: str,
+                attributes: Optional[List[str]] = None,
+                sub_tree: bool = True) -> Union[Reader, Writer]:
+    """Like ldap_query(), but the query is passed to the server without
+    escaping filter characters. Only use this for filters built from
+    escaped values.
 
     Args:
-        cn (str): Common Name of group
+        connection (Connection): LDAP connection
+        object_def (ObjectDef): Object representation of the LDAP object
+            classes.
+        dn (str): Distinguished Name of the LDAP subtree that is to be queried.
+        query (str): LDAP filter, or simplified query.
+        attributes (List[str], optional): LDAP attributes to fetch, must be
+            part of object_def. Defaults to all attributes of object_def.
+        sub_tree (bool, optional): Search the whole subtree, rather than
+            only the immediate children of dn. Defaults to True.
 
     Returns:
-        Union[None, Entry]: LDAP entry, or None if group does not exists.
+        Union[Reader, Writer]: LDAP server response, as a reader or writer
+            object.
     """
-    config = read_configuration()
-    return get_single_object(config.groups, 'CommonName', cn)
+    reader = Reader(connection, object_def, dn, query, attributes=attributes,
+                    sub_tree=sub_tree)
 
+    started = time.monotonic()
+    with timed('search', connection) as event:
+        retry_operation(connection, reader.search)
+        event.search_filter = reader.query_filter
+        event.entries = len(reader)
+    record_latency(connection, started)
+
+    if not connection.read_only:
+        writer = writer_from_reader(reader)
+        return writer
+    return reader
 
-def list_groups(query='CommonName: *') -> List[Entry]:
-    """List available groups in LDAP
+
+def base_search(connection: Connection, dn: str, query: str,
+                attributes: List[str]) -> List[dict]:
+    """Search a single entry, retrying on transient errors, returning the
+    search responses rather than an entry.
 
     Args:
-        query (str, optional): Optional filter to apply. Defaults
-            to "CommonName: \\*" for all group objects.
-        attributes: LDAP attributes to return in reader.
-                    Default is to exclude members.
+        connection (Connection): LDAP connection.
+        dn (str): Distinguished Name of the entry.
+        query (str): LDAP filter the entry must match.
+        attributes (List[str]): Attributes to fetch, e.g. ["1.1"] for
+            none.
 
     Returns:
-        List[Entry]: List of groups.
+        List[dict]: The search result entry, or an empty list if the
+            entry does not exist or does not match.
     """
-    bound, connection = create_connection()
-    if not bound:
-        return []
+    with timed('search', connection, query) as event:
+        retry_operation(connection, lambda: connection.search(
+            dn, query, BASE, attributes=attributes))
+        responses = [response for response in connection.response or []
+                     if response['type'] == 'searchResEntry']
+        event.entries = len(responses)
+    return responses
+
+
+def shared_search(key: tuple, base: str,
+                  search: Callable[[], Optional[Union[Reader, Writer]]]
+                  ) -> Optional[Union[Reader, Writer]]:
+    """Run a search, sharing it with concurrent callers of the same search.
+    Callers waiting for a search started by another thread receive their
+    own copies of the entries found.
 
-    config = read_configuration()
-    group = ObjectDef(config.groups.object_classes,
-                      connection,
-                      auxiliary_class=config.groups.auxiliary_classes)
+    Args:
+        key (tuple): Identity of the search, e.g. base, filter and
+            attributes.
+        base (str): Distinguished Name of the search base.
+        search (Callable): Function performing the search, returning a
+            cursor, or None.
+
+    Returns:
+        Optional[Union[Reader, Writer]]: Cursor returned by search.
+    """
+    # Budgets belong to the caller, so a search refused by the budget of
+    # one caller is run again by the others.
+    cursor, shared = singleton.shared_flights.do(key, search,
+                                                 unshared=BudgetExceeded)
+    if not shared or cursor is None:
+        return cursor
+    responses = [copy.deepcopy(entry._state.response) for entry in cursor]
+    return cursor_from_responses(cursor.connection, cursor.definition, base,
+                                 responses)
+
+
+def or_filters(attr: str, values: Sequence[str],
+               chunk_size: int = 100,
+               max_length: int = FILTER_LENGTH_LIMIT) -> Iterator[str]:
+    """Build LDAP filters matching any of the given values, split in
+    chunks of at most chunk_size values and max_length characters.
 
-    reader = Reader(connection,
-                    group,
-                    config.groups.dn,
-                    query)
+    Args:
+        attr (str): LDAP attribute to match.
+        values (Sequence[str]): Attribute values, unescaped.
+        chunk_size (int, optional): Maximum number of values per filter.
+        max_length (int, optional): Maximum length of a filter.
 
-    reader.search()
-    return [group for group in reader]
+    Yields:
+        str: LDAP filter, e.g. "(|(uid=jdoe)(uid=jroe))".
+    """
+    chunk: List[str] = []
+    length = 3
+    for value in values:
+        assertion = f'({attr}={escape_filter_chars(value)})'
+        if chunk and (len(chunk) >= chunk_size
+                      or length + len(assertion) > max_length):
+            yield '(|' + ''.join(chunk) + ')'
+            chunk, length = [], 3
+        chunk.append(assertion)
+        length += len(assertion)
+    if chunk:
+        yield '(|' + ''.join(chunk) + ')'
+
+
+def schema_identity(connection: Connection) -> tuple:
+    """Identify the schema of the server a connection is bound to. Servers
+    re-read their schema on every bind, so the schema modification
+    timestamp is used, when available, rather than the schema object.
 
+    Args:
+        connection (Connection): LDAP connection.
 
-def member_of(dn: str) -> List[Entry]:
-    """Query LDAP for group membership
+    Returns:
+        tuple: Hashable schema identity.
+    """
+    schema = connection.server.schema
+    timestamp = getattr(schema, 'modify_time_stamp', None)
+    if timestamp:
+        return (connection.server.name, str(schema.schema_entry),
+                tuple(timestamp))
+    return (connection.server.name, id(schema))
+
+
+def object_definition(options: LdapQueryOptions,
+                      connection: Connection,
+                      attributes: Sequence[str] = ()) -> ObjectDef:
+    """Get an ObjectDef for the object classes of an LDAP object type.
+    Definitions are cached per schema, and each caller is handed its own
+    copy, as ldap3 cursors add the auxiliary classes of the entries read
+    to their definition. A new definition is built when the server schema
+    changes.
 
     Args:
-        dn (str): Distinguished Name of a group member/user
+        options (LdapQueryOptions): Settings object containing object
+            classes and auxiliary classes.
+        connection (Connection): LDAP connection, used to read the schema.
+        attributes (Sequence[str], optional): Additional attributes, not
+            part of the object classes, e.g. operational attributes.
 
     Returns:
-        List[Entry]: List of groups.
+        ObjectDef: Object representation of the LDAP object classes.
     """
-    query = f"(&(objectClass=groupOfNames)(member={dn}))"
-    return list_groups(query)
+    key = (tuple(as_list(options.object_classes)),
+           tuple(as_list(options.auxiliary_classes)),
+           tuple(attributes),
+           schema_identity(connection))
+
+    with singleton.shared_object_definitions_lock:
+        object_def = singleton.shared_object_definitions.get(key)
+        if object_def is None:
+            object_def = ObjectDef(options.object_classes,
+                                   connection,
+                                   auxiliary_class=options.auxiliary_classes)
+            if attributes:
+                object_def += list(attributes)
+
+            cached = singleton.shared_object_definitions
+            if len(cached) >= OBJECT_DEFINITION_LIMIT:
+                cached.clear()
+            cached[key] = object_def
+        return copy_object_definition(object_def)
+
+
+def copy_object_definition(object_def: ObjectDef) -> ObjectDef:
+    """Copy an ObjectDef, so the copy can be changed without changing the
+    original. Attribute definitions and the schema are shared.
 
+    Args:
+        object_def (ObjectDef): Object definition to copy.
 
-def set_user_password(dn: str, password: str) -> bool:
-    """Set a password for a given user DN.
+    Returns:
+        ObjectDef: Independent copy of the definition.
+    """
+    attr_defs = object_def._attributes.copy()
+    attr_defs._alias_keymap = {key: list(aliases) for key, aliases
+                               in attr_defs._alias_keymap.items()}
+    clone = copy.copy(object_def)
+    clone.__dict__['_attributes'] = attr_defs
+    clone.__dict__['_auxiliary_class'] = list(object_def._auxiliary_class)
+    clone.__dict__['_oid_info'] = list(object_def._oid_info)
+    return clone
+
+
+def invalidate_object_definitions() -> None:
+    """Clear the ObjectDef cache, e.g. after the server schema has
+    been changed without updating the schema modification timestamp.
+    """
+    with singleton.shared_object_definitions_lock:
+        singleton.shared_object_definitions.clear()
+
+
+def projection(object_def: ObjectDef,
+               attributes: Attributes,
+               exclude: Sequence[str] = ()) -> Optional[List[str]]:
+    """Resolve the attributes argument of the query functions to the
+    attributes requested from the server.
 
     Args:
-        dn (str): Distinguished Name of the user.
-        password (str): New password
+        object_def (ObjectDef): Object representation of the LDAP object
+            classes.
+        attributes (Attributes): Requested attributes, None for the
+            default set or ALL_ATTRIBUTES for every attribute.
+        exclude (Sequence[str], optional): Attributes left out of the
+            default set, e.g. group members.
 
     Returns:
-        bool: Password updated successfully, True or False.
+        Optional[List[str]]: Attributes to request, or None for all
+            attributes of the ObjectDef.
     """
-    success, connection = create_connection()
-    if not success:
-        return success
+    if attributes == ALL_ATTRIBUTES:
+        return None
+    if attributes is not None:
+        return as_list(attributes)
+    if not exclude:
+        return None
+    excluded = [name.lower() for name in exclude]
+    return [attr_def.key for attr_def in object_def
+            if attr_def.key.lower() not in excluded]
 
-    hashed_password = hashed(HASHED_SALTED_SHA, password)
-    return connection.modify(dn, {'userPassword': [
-                                  (MODIFY_REPLACE, [hashed_password])]})
+
+def new_entry(options: LdapQueryOptions, dn: str) -> Entry:
+    """_summary_
+
+    Args:
+        options (LdapQueryOptions): Settings objects containing object
+            classes of the LDAP object to create
+        dn (str): Distinguished Name of the new object.
+
+    Returns:
+        Entry: Newly created, but not committed LDAP object.
+            Actual attributes will depend on the specified object
+            classes.
+    """
+    bound, connection = create_connection()
+    try:
+        if not bound:
+            return Entry(dn=dn, cursor=None)
+        object_def = object_definition(options, connection)
+        writer = CommitWriter(connection, object_def)
+        return writer.new(dn)
+    finally:
+        release_connection(connection)
+
+
+def entry_cache() -> Optional[EntryCache]:
+    """Get the shared entry cache, creating it on first use.
+
+    Returns:
+        Optional[EntryCache]: Entry cache, or None if caching is disabled
+            by a cache size of zero.
+    """
+    config = read_configuration()
+    if config.cache_size <= 0:
+        return None
+    if singleton.shared_entry_cache is None:
+        singleton.shared_entry_cache = EntryCache(config.cache_size,
+                                                  config.cache_negative_ttl)
+        add_commit_listener(invalidate_cached_entry)
+    return singleton.shared_entry_cache
+
+
+def invalidate_cached_entry(request: dict) -> None:
+    """Remove a changed entry from the entry cache. This is registered
+    as a commit listener, and called for every committed change.
+
+    Args:
+        request (dict): LDAP request of the committed change.
+    """
+    cache = singleton.shared_entry_cache
+    if cache is None:
+        return
+    cache.invalidate(request['entry'])
+    if request.get('newRdn'):
+        cache.invalidate(request['newRdn'])
+
+
+def revalidate_entry(connection: Connection, cached: CachedEntry) -> bool:
+    """Check whether an expired cache entry is unchanged on the server,
+    by fetching only its modification timestamp.
+
+    Args:
+        connection (Connection): LDAP connection.
+        cached (CachedEntry): Expired cache entry.
+
+    Returns:
+        bool: The entry still exists and has not been modified.
+    """
+    timestamp, dn = cached.modify_timestamp, cached.dn
+    if not timestamp or not dn:
+        return False
+    responses = base_search(connection, dn, '(objectClass=*)',
+                            ['modifyTimestamp'])
+    if len(responses) != 1:
+        return False
+    current = CachedEntry(responses[0], 0).modify_timestamp
+    return current == timestamp
+
+
+def get_single_object(query_options: LdapQueryOptions,
+                      attr: str,
+                      value: str,
+                      ttl: float = 0,
+                      attributes: Attributes = None) -> Union[None, Entry]:
+    """Fetch a single object from LDAP.
+
+    Args:
+        query_options (LdapQueryOptions): Settings object containing
+            object classes and base dn for the queried object.
+        attr (str): LDAP attribute to query on.
+        value (str): Value of the LDAP attribute queried.
+        ttl (float, optional): Seconds a result may be served from the
+            entry cache, if enabled. Defaults to 0, bypassing the cache.
+        attributes (Attributes, optional): LDAP attributes to fetch.
+            Defaults to all attributes.
+
+    Raises:
+        Exception: The result yielded more entries than expected.
+
+    Returns:
+        Union[None, Entry]: Return either the LDAP object if found, or None.
+    """
+    cache = entry_cache() if ttl > 0 else None
+    requested = None if attributes is None else as_list(attributes)
+    key = (query_options.dn, attr.lower(), value, tuple(requested or ()))
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None and cached.fresh and cached.response is None:
+        return None
+
+    replica = replica_reads()
+
+    def lookup() -> Optional[Union[Reader, Writer]]:
+        result: Union[Reader, Writer]
+        bound, connection = create_connection(read_only=replica)
+        try:
+            if not bound:
+                return None
+
+            # Also get modification timestamp for the requested object.
+            object_def = object_definition(query_options, connection,
+                                           ['modifyTimestamp'])
+
+            if (cache is not None and cached is not None
+                    and cached.response is not None
+                    and (cached.fresh
+                         or revalidate_entry(connection, cached))):
+                cache.touch(key, ttl)
+                result = cursor_from_responses(
+                    connection, object_def, query_options.dn,
+                    [copy.deepcopy(cached.response)])
+            else:
+                fetch = projection(object_def, attributes)
+                if fetch is not None and 'modifyTimestamp' not in fetch:
+                    fetch.append('modifyTimestamp')
+                result = ldap_query(connection, object_def, query_options.dn,
+                                    f'{attr}: {value}', fetch)
+                if len(result) > 1:
+                    raise Exception("Result set larger than expected")
+                if cache is not None:
+                    response = (result[0]._state.response if len(result)
+                                else None)
+                    cache.store(key, response, ttl)
+        finally:
+            release_connection(connection)
+        if replica:
+            return primary_cursor(object_def, query_options.dn,
+                                  [entry._state.response
+                                   for entry in result])
+        return result
+
+    with timed('get_single_object',
+               search_filter=f'({attr}={escape_filter_chars(value)})'
+               ) as event:
+        result = shared_search((query_options.dn, f'{attr}: {value}',
+                                key[3], replica, cache is not None),
+                               query_options.dn, lookup)
+        event.entries = 0 if result is None else len(result)
+    if result is None or len(result) == 0:
+        return None
+    return result[0]
+
+
+def get_objects(query_options: LdapQueryOptions,
+                attr: str,
+                values: Iterable[str],
+                ttl: float = 0,
+                attributes: Attributes = None,
+                chunk_size: int = 100) -> Dict[str, Optional[Entry]]:
+    """Fetch multiple objects from LDAP, using one connection and a
+    search per chunk of values.
+
+    Args:
+        query_options (LdapQueryOptions): Settings object containing
+            object classes and base dn for the queried objects.
+        attr (str): LDAP attribute to query on.
+        values (Iterable[str]): Values of the LDAP attribute queried.
+        ttl (float, optional): Seconds a result may be served from the
+            entry cache, if enabled. Defaults to 0, bypassing the cache.
+        attributes (Attributes, optional): LDAP attributes to fetch.
+            Defaults to all attributes.
+        chunk_size (int, optional): Maximum number of values per search.
+            Defaults to 100.
+
+    Returns:
+        Dict[str, Optional[Entry]]: Entries keyed on the requested values,
+            None for values which did not match an object.
+    """
+    objects: Dict[str, Optional[Entry]] = dict.fromkeys(values)
+    if not objects:
+        return objects
+
+    cache = entry_cache() if ttl > 0 else None
+    requested = None if attributes is None else as_list(attributes)
+    fields = tuple(requested or ())
+    # Requested spellings of each missing value, keyed on the lowercased
+    # value, as servers match most attributes case-insensitively.
+    missing: Dict[str, List[str]] = {}
+    cached_responses: Dict[str, dict] = {}
+    for value in objects:
+        cached = cache.get((query_options.dn, attr.lower(), value, fields)
+                           ) if cache is not None else None
+        if cached is not None and cached.fresh:
+            if cached.response is not None:
+                cached_responses[value] = cached.response
+        else:
+            missing.setdefault(value.lower(), []).append(value)
+
+    replica = replica_reads()
+    bound, connection = create_connection(read_only=replica)
+    try:
+        if not bound:
+            return objects
+
+        object_def = object_definition(query_options, connection,
+                                       ['modifyTimestamp'])
+
+        if cached_responses:
+            cursor = cursor_from_responses(
+                connection, object_def, query_options.dn,
+                [copy.deepcopy(response)
+                 for response in cached_responses.values()])
+            objects.update(zip(cached_responses, cursor))
+
+        fetch = projection(object_def, attributes)
+        if fetch is not None:
+            for name in (attr, 'modifyTimestamp'):
+                if name not in fetch:
+                    fetch.append(name)
+
+        for query in or_filters(attr, [spellings[0] for spellings
+                                       in missing.values()], chunk_size):
+            for entry in ldap_search(connection, object_def,
+                                     query_options.dn, query, fetch):
+                for entry_value in entry[attr].values:
+                    key = str(entry_value).lower()
+                    if key not in missing:
+                        continue
+                    for value in missing.pop(key):
+                        objects[value] = entry
+                        if cache is not None:
+                            cache.store((query_options.dn, attr.lower(),
+                                         value, fields),
+                                        entry._state.response, ttl)
+    finally:
+        release_connection(connection)
+
+    if cache is not None:
+        for value in itertools.chain.from_iterable(missing.values()):
+            cache.store((query_options.dn, attr.lower(), value, fields),
+                        None, ttl)
+
+    if replica:
+        found = {value: entry for value, entry in objects.items()
+                 if entry is not None}
+        cursor = primary_cursor(object_def, query_options.dn,
+                                [entry._state.response
+                                 for entry in found.values()])
+        objects.update(zip(found, cursor))
+    return objects
+
+
+def scan_next_id(dn: str, object_class: str, attribute: str) -> int:
+    """Find the next unused ID by scanning a subtree for the highest
+    value of a numeric attribute. Only the attribute is fetched, using
+    a paged search.
+
+    Args:
+        dn (str): Distinguished Name of the subtree to scan.
+        object_class (str): Object class providing the attribute.
+        attribute (str): Numeric ID attribute, e.g. uidNumber.
+
+    Returns:
+        int: Highest ID plus one, or zero if no objects were found.
+    """
+    # Replicas may lag behind, and not yet have the most recent IDs.
+    bound, connection = create_connection(read_only=True, primary=True)
+    try:
+        def scan() -> List[int]:
+            query = f'(objectClass={object_class})'
+            results = timed_iteration(
+                'search', connection.extend.standard.paged_search(
+                    dn,
+                    query,
+                    attributes=[attribute],
+                    paged_size=1000,
+                    generator=True
+                    ), connection, query)
+            return [result['attributes'][attribute] for result in results
+                    if isinstance(result['attributes'].get(attribute), int)]
+
+        ids = retry_operation(connection, scan)
+    finally:
+        release_connection(connection)
+    if not ids:
+        return 0
+    return max(ids) + 1
+
+
+def reserve_ids(counter_dn: str, attribute: str, count: int,
+                seed: Callable[[], int]) -> range:
+    """Reserve a block of IDs from a counter entry, seeding the counter
+    on first use. Without a counter entry, the block starts at the value
+    returned by seed(), and is not protected against concurrent use.
+
+    Args:
+        counter_dn (str): Distinguished Name of the counter entry, or an
+            empty string if no counter is configured.
+        attribute (str): Attribute holding the counter.
+        count (int): Number of IDs to reserve.
+        seed (Callable[[], int]): Function scanning for the next free ID.
+
+    Raises:
+        AllocationError: The counter could not be updated.
+
+    Returns:
+        range: Reserved IDs.
+    """
+    if not counter_dn:
+        start = seed()
+        return range(start, start + count)
+
+    bound, connection = create_connection()
+    try:
+        if not bound:
+            raise AllocationError('Unable to connect to LDAP server')
+        return retry_operation(connection, lambda: allocator.reserve(
+            connection, counter_dn, attribute, count, seed))
+    finally:
+        release_connection(connection)
+
+
+def reserve_uid_numbers(count: int = 1) -> range:
+    """Reserve a block of consecutive POSIX user IDs, e.g. for bulk
+    provisioning. The IDs are allocated atomically if a uidNumber
+    counter entry is configured.
+
+    Args:
+        count (int, optional): Number of IDs. Defaults to 1.
+
+    Returns:
+        range: POSIX user IDs.
+    """
+    config = read_configuration()
+
+    # Query does not need to be configurable, beyond dn,
+    # as uidNumber is only provided by the posixAccount
+    # schema.
+    return reserve_ids(config.uid_counter_dn, 'uidNumber', count,
+                       lambda: scan_next_id(config.users.dn,
+                                            'posixAccount', 'uidNumber'))
+
+
+def reserve_gid_numbers(count: int = 1) -> range:
+    """Reserve a block of consecutive POSIX group IDs, e.g. for bulk
+    provisioning. The IDs are allocated atomically if a gidNumber
+    counter entry is configured.
+
+    Args:
+        count (int, optional): Number of IDs. Defaults to 1.
+
+    Returns:
+        range: POSIX group IDs.
+    """
+    config = read_configuration()
+    return reserve_ids(config.gid_counter_dn, 'gidNumber', count,
+                       lambda: scan_next_id(config.groups.dn,
+                                            'posixGroup', 'gidNumber'))
+
+
+def next_uid_number() -> int:
+    """Find the next unused POSIX user ID. This will always
+    be zero, if no posixAccount objects exists.
+
+    If a uidNumber counter entry is configured, the ID is allocated
+    from the counter, and will not be returned again.
+
+    Returns:
+        int: POSIX user ID.
+    """
+    return reserve_uid_numbers()[0]
+
+
+def next_gid_number() -> int:
+    """Find the next used POSIX group ID. Will always return zero
+    if no posixGroups are found.
+
+    If a gidNumber counter entry is configured, the ID is allocated
+    from the counter, and will not be returned again.
+
+    Returns:
+        int: POSIX group ID
+    """
+    return reserve_gid_numbers()[0]
+
+
+def new_user(uid: str) -> Entry:
+    """Create a new user object in LDAP. The user will be created
+    in the subtree specified in the configuration. If the method
+    "entry_commit_changes()" is not called on the returning object,
+    the entry will be discarded once the program ends.
+
+    Args:
+        uid (str): Account name for the new user.
+
+    Returns:
+        Entry: Create, but not committed user entry.
+    """
+    config = read_configuration()
+    dn = f'uid={uid},{config.users.dn}'
+    user = new_entry(config.users, dn)
+    return user
+
+
+def new_group(cn: str, gid_number: int = 0,
+              members: list[str] = [],
+              description: str = '') -> Tuple[bool, Entry]:
+    """Create a new group object in LDAP. The group will be created
+    in the subtree specified in the configuration. If the method
+    "entry_commit_changes()" is not called on the returning object,
+    the entry will be discarded once the program ends.
+
+    Args:
+        cn (str): Name of the group to create.
+
+    Returns:
+        bool: Group created successfully.
+        Entry: Create, but not committed group entry.
+    """
+    config = read_configuration()
+    dn = f'cn={cn},{config.groups.dn}'
+    group = new_entry(config.groups, dn)
+    group.member = members
+
+    if not members:
+        return False, group
+
+    if gid_number == 0:
+        group.gidNumber = next_gid_number()
+    else:
+        group.gidNumber = gid_number
+
+    if description:
+        group.description = description
+
+    created: bool = group.entry_commit_changes()
+    return created, group
+
+
+def member_attribute(options: LdapQueryOptions) -> str:
+    """Get the attribute holding member DNs of groups.
+
+    Args:
+        options (LdapQueryOptions): Settings object containing object
+            classes of groups.
+
+    Returns:
+        str: uniqueMember for groupOfUniqueNames groups, else member.
+    """
+    classes = [name.lower() for name in as_list(options.object_classes)]
+    if 'groupofuniquenames' in classes:
+        return 'uniqueMember'
+    return 'member'
+
+
+def value_chunks(values: Sequence[str], chunk_size: int,
+                 max_length: int = FILTER_LENGTH_LIMIT // 2
+                 ) -> Iterator[List[str]]:
+    """Split values in chunks of at most chunk_size values and max_length
+    characters in total.
+
+    Args:
+        values (Sequence[str]): Values to split.
+        chunk_size (int): Maximum number of values per chunk.
+        max_length (int, optional): Maximum total length of a chunk.
+
+    Yields:
+        List[str]: Chunks of values.
+    """
+    chunk: List[str] = []
+    length = 0
+    for value in values:
+        if chunk and (len(chunk) >= chunk_size
+                      or length + len(value) > max_length):
+            yield chunk
+            chunk, length = [], 0
+        chunk.append(value)
+        length += len(value)
+    if chunk:
+        yield chunk
+
+
+def select_members(connection: Connection, group_dn: str, attribute: str,
+                   dns: Sequence[str], present: bool,
+                   chunk_size: int = 100) -> List[str]:
+    """Find which of the given DNs are, or are not, members of a group,
+    without reading the members of the group. Each chunk of DNs is tested
+    with a single search of the group, and only split in halves when it
+    contains DNs of both kinds. Chunks still mixed after MEMBER_SPLIT_DEPTH
+    splits are tested one DN at a time.
+
+    Args:
+        connection (Connection): LDAP connection.
+        group_dn (str): Distinguished Name of the group.
+        attribute (str): Attribute holding member DNs.
+        dns (Sequence[str]): Distinguished Names to test.
+        present (bool): Select members if True, else non-members.
+        chunk_size (int, optional): Maximum number of DNs per search.
+
+    Returns:
+        List[str]: The selected DNs.
+    """
+    def unwanted(dn: str) -> str:
+        assertion = f'({attribute}={escape_filter_chars(dn)})'
+        return f'(!{assertion})' if present else assertion
+
+    def any_unwanted(chunk: List[str]) -> bool:
+        query = '(|' + ''.join(unwanted(dn) for dn in chunk) + ')'
+        return bool(base_search(connection, group_dn, query, ['1.1']))
+
+    selected: List[str] = []
+    pending = [(chunk, 0) for chunk in value_chunks(dns, chunk_size)]
+    pending.reverse()
+    while pending:
+        chunk, depth = pending.pop()
+        if not any_unwanted(chunk):
+            selected.extend(chunk)
+        elif len(chunk) == 1:
+            continue
+        elif depth < MEMBER_SPLIT_DEPTH:
+            half = len(chunk) // 2
+            pending.extend([(chunk[half:], depth + 1),
+                            (chunk[:half], depth + 1)])
+        else:
+            selected.extend(dn for dn in chunk if not any_unwanted([dn]))
+    return selected
+
+
+def modify_members(connection: Connection, group_dn: str, attribute: str,
+                   operation: str, dns: Sequence[str],
+                   chunk_size: int = 1000) -> Tuple[bool, List[str]]:
+    """Add or delete member values of a group, using one modify operation
+    per chunk of DNs.
+
+    Args:
+        connection (Connection): LDAP connection.
+        group_dn (str): Distinguished Name of the group.
+        attribute (str): Attribute holding member DNs.
+        operation (str): MODIFY_ADD or MODIFY_DELETE.
+        dns (Sequence[str]): Distinguished Names to add or delete.
+        chunk_size (int, optional): Maximum number of DNs per operation.
+
+    Returns:
+        bool: All DNs were added or deleted.
+        List[str]: DNs added or deleted, also when failing part way.
+    """
+    changed: List[str] = []
+    for start in range(0, len(dns), chunk_size):
+        chunk = list(dns[start:start + chunk_size])
+        with timed('modify', connection) as event:
+            modified = event.success = retry_operation(
+                connection,
+                lambda: connection.modify(group_dn,
+                                          {attribute: [(operation, chunk)]}),
+                retry_if=lambda ok: (not ok and
+                                     retry.retryable_result(connection)))
+        if not modified:
+            return False, changed
+        notify_commit({'type': 'modifyRequest', 'entry': group_dn})
+        changed.extend(chunk)
+    return True, changed
+
+
+def change_members(cn: str, dns: Iterable[str], operation: str,
+                   chunk_size: int = 1000) -> Tuple[bool, List[str]]:
+    """Add or remove members of a group, sending only the DNs which are
+    not already members, or are members, respectively.
+
+    Args:
+        cn (str): Common name of the group.
+        dns (Iterable[str]): Distinguished Names of members.
+        operation (str): MODIFY_ADD or MODIFY_DELETE.
+        chunk_size (int, optional): Maximum number of DNs per operation.
+
+    Returns:
+        bool: Group updated successfully.
+        List[str]: DNs added or removed.
+    """
+    config = read_configuration()
+    group_dn = f'cn={cn},{config.groups.dn}'
+    attribute = member_attribute(config.groups)
+    unique = list({dn.lower(): dn for dn in dns}.values())
+    success, connection = create_connection()
+    try:
+        if not success:
+            return False, []
+        delta = select_members(connection, group_dn, attribute, unique,
+                               present=operation == MODIFY_DELETE)
+        return modify_members(connection, group_dn, attribute, operation,
+                              delta, chunk_size)
+    finally:
+        release_connection(connection)
+
+
+def add_members(cn: str, dns: Iterable[str],
+                chunk_size: int = 1000) -> Tuple[bool, List[str]]:
+    """Add members to a group. Only DNs which are not already members are
+    sent to the server, and the members of the group are never read, so
+    this is suited to very large groups.
+
+    Args:
+        cn (str): Common name of the group.
+        dns (Iterable[str]): Distinguished Names of new members.
+        chunk_size (int, optional): Maximum number of DNs added per
+            operation. Defaults to 1000.
+
+    Returns:
+        bool: Members added successfully.
+        List[str]: DNs added.
+    """
+    return change_members(cn, dns, MODIFY_ADD, chunk_size)
+
+
+def remove_members(cn: str, dns: Iterable[str],
+                   chunk_size: int = 1000) -> Tuple[bool, List[str]]:
+    """Remove members from a group. Only DNs which are members are sent
+    to the server, and the members of the group are never read.
+
+    Args:
+        cn (str): Common name of the group.
+        dns (Iterable[str]): Distinguished Names of members to remove.
+        chunk_size (int, optional): Maximum number of DNs removed per
+            operation. Defaults to 1000.
+
+    Returns:
+        bool: Members removed successfully.
+        List[str]: DNs removed.
+    """
+    return change_members(cn, dns, MODIFY_DELETE, chunk_size)
+
+
+def set_members(cn: str, dns: Iterable[str],
+                chunk_size: int = 1000) -> Tuple[bool, List[str], List[str]]:
+    """Replace the members of a group, sending only the difference
+    between the current and the new members. New members are added
+    before old members are removed, so the group never becomes empty.
+
+    Finding the members to remove requires reading the current member
+    DNs, which is done using a single search of the member attribute,
+    without building an entry.
+
+    Args:
+        cn (str): Common name of the group.
+        dns (Iterable[str]): Distinguished Names of all members.
+        chunk_size (int, optional): Maximum number of DNs added or
+            removed per operation. Defaults to 1000.
+
+    Returns:
+        bool: Members replaced successfully.
+        List[str]: DNs added.
+        List[str]: DNs removed.
+    """
+    config = read_configuration()
+    group_dn = f'cn={cn},{config.groups.dn}'
+    attribute = member_attribute(config.groups)
+    wanted = {dn.lower(): dn for dn in dns}
+    success, connection = create_connection()
+    try:
+        if not success:
+            return False, [], []
+        found = base_search(connection, group_dn, '(objectClass=*)',
+                            [attribute])
+        if not found:
+            return False, [], []
+        current = {value.lower(): value for name, values
+                   in found[0]['attributes'].items()
+                   if name.lower() == attribute.lower()
+                   for value in values}
+
+        added = [dn for key, dn in wanted.items() if key not in current]
+        removed = [dn for key, dn in current.items() if key not in wanted]
+        success, added = modify_members(connection, group_dn, attribute,
+                                        MODIFY_ADD, added, chunk_size)
+        if not success:
+            return False, added, []
+        success, removed = modify_members(connection, group_dn, attribute,
+                                          MODIFY_DELETE, removed, chunk_size)
+        return success, added, removed
+    finally:
+        release_connection(connection)
+
+
+def bulk_workers(workers: int, name: str,
+                 limit: Optional[int] = None) -> BulkWorkers:
+    """Start the worker threads of a bulk operation.
+
+    Args:
+        workers (int): Number of workers, or 0 for half the maximum
+            connection pool size, leaving connections for other threads.
+        name (str): Prefix of the thread names.
+        limit (int, optional): Maximum number of workers, e.g. the number
+            of items.
+
+    Returns:
+        BulkWorkers: Thread pool, to be used as a context manager.
+    """
+    config = read_configuration()
+    workers = workers or max(config.pool_max_size // 2, 1)
+    if limit is not None:
+        workers = min(workers, limit)
+    return BulkWorkers(workers, name)
+
+
+def add_entry(dn: str, attributes: dict,
+              object_class: Optional[List[str]] = None) -> BulkResult:
+    """Add a single entry, on a pooled connection.
+
+    Args:
+        dn (str): Distinguished Name of the entry.
+        attributes (dict): Attribute values, as str or raw bytes.
+        object_class (List[str], optional): Object classes of the entry.
+            Defaults to the objectClass values among the attributes.
+
+    Returns:
+        BulkResult: Outcome of the add operation.
+    """
+    try:
+        bound, connection = create_connection()
+    except (PoolTimeoutError, LDAPException) as e:
+        return BulkResult(dn, False, str(e))
+    try:
+        if not bound:
+            return BulkResult(dn, False, 'Unable to connect to LDAP server')
+        with timed('add', connection) as event:
+            added = event.success = retry_operation(
+                connection,
+                lambda: connection.add(dn, object_class, attributes),
+                retry_if=lambda ok: (not ok and
+                                     retry.retryable_result(connection)))
+        if not added:
+            result = connection.result or {}
+            return BulkResult(dn, False, result.get('message') or
+                              result.get('description', ''),
+                              result.get('result', 0))
+    except LDAPException as e:
+        return BulkResult(dn, False, str(e))
+    finally:
+        release_connection(connection)
+
+    notify_commit({'type': 'addRequest', 'entry': dn})
+    return BulkResult(dn, True)
+
+
+def bulk_create(options: LdapQueryOptions,
+                rdn_attribute: str,
+                entries: Iterable[dict],
+                id_attribute: str,
+                id_class: str,
+                reserve: Callable[[int], range],
+                workers: int = 0) -> List[BulkResult]:
+    """Create many entries, using concurrent add operations on pooled
+    connections. Entries of a POSIX object class without an ID are
+    assigned IDs from a single block reserved up front.
+
+    Args:
+        options (LdapQueryOptions): Settings object containing object
+            classes and base dn of the entries.
+        rdn_attribute (str): Attribute naming the entries, e.g. uid.
+        entries (Iterable[dict]): Attributes of each entry.
+        id_attribute (str): Attribute holding the POSIX ID.
+        id_class (str): Object class requiring the POSIX ID.
+        reserve (Callable[[int], range]): Function reserving IDs.
+        workers (int, optional): Maximum number of concurrent adds.
+            Defaults to half the maximum connection pool size, leaving
+            connections for other threads.
+
+    Raises:
+        AllocationError: The ID block could not be reserved. No entries
+            are created.
+        BudgetExceeded: Adds were refused by a strict tracker. The other
+            entries are created, and the outcome of each entry is the
+            result of the exception.
+
+    Returns:
+        List[BulkResult]: Outcome of each entry, in the order given.
+    """
+    classes = (as_list(options.object_classes) +
+               as_list(options.auxiliary_classes))
+    items = [dict(attributes) for attributes in entries]
+
+    if id_class.lower() in (name.lower() for name in classes):
+        missing = [item for item in items
+                   if not any(key.lower() == id_attribute.lower()
+                              for key in item)]
+        if missing:
+            for item, number in zip(missing, reserve(len(missing))):
+                item[id_attribute] = number
+
+    def create(attributes: dict) -> BulkResult:
+        name = attributes.get(rdn_attribute)
+        if isinstance(name, (list, tuple)):
+            name = name[0] if name else None
+        if not name:
+            return BulkResult('', False, f'Missing {rdn_attribute}')
+
+        dn = f'{rdn_attribute}={escape_rdn(str(name))},{options.dn}'
+        try:
+            return add_entry(dn, attributes, classes)
+        except BudgetExceeded as e:
+            runner.refuse(e)
+            return BulkResult(dn, False, str(e))
+
+    with bulk_workers(workers, 'bituldap-bulk') as runner:
+        results = list(runner.map(create, items))
+    runner.check(results)
+    return results
+
+
+def bulk_create_users(users: Iterable[dict],
+                      workers: int = 0) -> List[BulkResult]:
+    """Create many users, e.g. when onboarding a batch of accounts. Each
+    dict holds the attributes of a user, and must include the uid. Users
+    without a uidNumber are assigned one from a single reserved block, if
+    posixAccount is among the configured object classes.
+
+    Args:
+        users (Iterable[dict]): Attributes of each user.
+        workers (int, optional): Maximum number of concurrent adds.
+            Defaults to half the maximum connection pool size, leaving
+            connections for other threads.
+
+    Returns:
+        List[BulkResult]: Outcome of each user, in the order given.
+    """
+    config = read_configuration()
+    return bulk_create(config.users, 'uid', users, 'uidNumber',
+                       'posixAccount', reserve_uid_numbers, workers)
+
+
+def bulk_create_groups(groups: Iterable[dict],
+                       workers: int = 0) -> List[BulkResult]:
+    """Create many groups. Each dict holds the attributes of a group, and
+    must include the cn. Groups without a gidNumber are assigned one from
+    a single reserved block, if posixGroup is among the configured object
+    classes.
+
+    Args:
+        groups (Iterable[dict]): Attributes of each group.
+        workers (int, optional): Maximum number of concurrent adds.
+            Defaults to half the maximum connection pool size, leaving
+            connections for other threads.
+
+    Returns:
+        List[BulkResult]: Outcome of each group, in the order given.
+    """
+    config = read_configuration()
+    return bulk_create(config.groups, 'cn', groups, 'gidNumber',
+                       'posixGroup', reserve_gid_numbers, workers)
+
+
+def get_user(uid: str, attributes: Attributes = None,
+             compact: bool = False) -> Union[None, Entry, Record]:
+    """Fetch a single LDAP user object based on username.
+
+    Args:
+        uid (str): Username
+        attributes (Attributes, optional): LDAP attributes to fetch.
+            Defaults to all attributes.
+        compact (bool, optional): Return a read-only Record rather than
+            an entry.
+
+    Returns:
+        Union[None, Entry, Record]: LDAP entry, or None if user does not
+            exists.
+    """
+    config = read_configuration()
+    user = get_single_object(config.users, 'uid', uid,
+                             ttl=config.cache_user_ttl,
+                             attributes=attributes)
+    return compact_record(config.users, user) if compact else user
+
+
+def get_group(cn: str, attributes: Attributes = None,
+              compact: bool = False) -> Union[None, Entry, Record]:
+    """Fetch a single LDAP group object, based on group name.
+
+    Args:
+        cn (str): Common Name of group
+        attributes (Attributes, optional): LDAP attributes to fetch.
+            Defaults to all attributes, including members.
+        compact (bool, optional): Return a read-only Record rather than
+            an entry.
+
+    Returns:
+        Union[None, Entry, Record]: LDAP entry, or None if group does not
+            exists.
+    """
+    config = read_configuration()
+    group = get_single_object(config.groups, 'CommonName', cn,
+                              ttl=config.cache_group_ttl,
+                              attributes=attributes)
+    return compact_record(config.groups, group) if compact else group
+
+
+def compact_record(options: LdapQueryOptions,
+                   entry: Optional[Entry]) -> Optional[Record]:
+    """Convert an entry to a read-only Record.
+
+    Args:
+        options (LdapQueryOptions): Object type of the entry.
+        entry (Optional[Entry]): LDAP entry.
+
+    Returns:
+        Optional[Record]: Record, None if entry is None.
+    """
+    if entry is None:
+        return None
+    return next(records_from_responses(options, [entry._state.response]),
+                None)
+
+
+def get_entry(query_options: LdapQueryOptions, dn: str,
+              attributes: Attributes = None) -> Optional[Entry]:
+    """Fetch an object by Distinguished Name, as a writable entry.
+
+    Args:
+        query_options (LdapQueryOptions): Settings object containing
+            object classes of the object.
+        dn (str): Distinguished Name of the object.
+        attributes (Attributes, optional): LDAP attributes to fetch.
+            Defaults to all attributes.
+
+    Returns:
+        Optional[Entry]: Writable LDAP entry, None if not found.
+    """
+    bound, connection = create_connection()
+    try:
+        if not bound:
+            return None
+        object_def = object_definition(query_options, connection)
+        reader = Reader(connection, object_def, dn,
+                        attributes=projection(object_def, attributes))
+        with timed('search', connection, '(objectClass=*)') as event:
+            found = retry_operation(connection, reader.search_object)
+            event.entries = 0 if found is None else 1
+        if found is None:
+            return None
+        writer = writer_from_reader(reader)
+        return writer[0] if len(writer) else None
+    finally:
+        release_connection(connection)
+
+
+def get_users(uids: Iterable[str],
+              attributes: Attributes = None) -> Dict[str, Optional[Entry]]:
+    """Fetch multiple LDAP user objects based on username, using a
+    single search per chunk of usernames.
+
+    Args:
+        uids (Iterable[str]): Usernames
+        attributes (Attributes, optional): LDAP attributes to fetch.
+            Defaults to all attributes.
+
+    Returns:
+        Dict[str, Optional[Entry]]: LDAP entries keyed on username, None
+            for users which do not exist.
+    """
+    config = read_configuration()
+    return get_objects(config.users, 'uid', uids,
+                       ttl=config.cache_user_ttl,
+                       attributes=attributes)
+
+
+def get_groups(cns: Iterable[str],
+               attributes: Attributes = None) -> Dict[str, Optional[Entry]]:
+    """Fetch multiple LDAP group objects based on group name, using a
+    single search per chunk of group names.
+
+    Args:
+        cns (Iterable[str]): Common Names of groups
+        attributes (Attributes, optional): LDAP attributes to fetch.
+            Defaults to all attributes, including members.
+
+    Returns:
+        Dict[str, Optional[Entry]]: LDAP entries keyed on group name, None
+            for groups which do not exist.
+    """
+    config = read_configuration()
+    return get_objects(config.groups, 'cn', cns,
+                       ttl=config.cache_group_ttl,
+                       attributes=attributes)
+
+
+def list_groups(query='CommonName: *',
+                attributes: Attributes = None,
+                compact: bool = False) -> List[Union[Entry, Record]]:
+    """List available groups in LDAP
+
+    Args:
+        query (str, optional): Optional filter to apply. Defaults
+            to "CommonName: \\*" for all group objects.
+        attributes (Attributes, optional): LDAP attributes to return in
+            reader. Default is to exclude members, use ALL_ATTRIBUTES to
+            include them.
+        compact (bool, optional): Return read-only Records, fetched using
+            a paged search, rather than entries.
+
+    Returns:
+        List[Union[Entry, Record]]: List of groups.
+    """
+    if compact:
+        return list(iter_groups(query, attributes, compact=True))
+
+    config = read_configuration()
+    requested = () if attributes is None else tuple(as_list(attributes))
+
+    def search() -> Optional[Reader]:
+        bound, connection = create_connection(read_only=True)
+        try:
+            if not bound:
+                return None
+
+            group = object_definition(config.groups, connection)
+
+            reader = Reader(connection,
+                            group,
+                            config.groups.dn,
+                            query,
+                            attributes=projection(group, attributes,
+                                                  MEMBER_ATTRIBUTES))
+
+            with timed('search', connection) as event:
+                retry_operation(connection, reader.search)
+                event.search_filter = reader.query_filter
+                event.entries = len(reader)
+        finally:
+            release_connection(connection)
+        return reader
+
+    with timed('list_groups') as event:
+        reader = shared_search((config.groups.dn, query, requested, True),
+                               config.groups.dn, search)
+        event.entries = 0 if reader is None else len(reader)
+    if reader is None:
+        return []
+    return [group for group in reader]
+
+
+def iter_entries(query_options: LdapQueryOptions,
+                 query: str,
+                 attributes: Attributes = None,
+                 page_size: int = 500,
+                 exclude: Sequence[str] = (),
+                 compact: bool = False) -> Iterator[Union[Entry, Record]]:
+    """Lazily iterate over LDAP objects, using a paged search. Only a
+    single page of results is held in memory at any time. The connection
+    is borrowed until the iteration is completed or the generator closed.
+
+    Args:
+        query_options (LdapQueryOptions): Settings object containing
+            object classes and base dn for the queried objects.
+        query (str): LDAP query, in either standard LDAP query language, or
+            LDAP3 Simplified Query Language.
+        attributes (Attributes, optional): LDAP attributes to fetch.
+            Defaults to all attributes of the object classes.
+        page_size (int, optional): Number of entries per page.
+            Defaults to 500.
+        exclude (Sequence[str], optional): Attributes left out, unless
+            explicitly requested.
+        compact (bool, optional): Yield read-only Records, built from the
+            search responses without creating entries.
+
+    Yields:
+        Union[Entry, Record]: LDAP entries, read-only.
+    """
+    bound, connection = create_connection(read_only=True)
+    try:
+        if not bound:
+            return
+
+        object_def = object_definition(query_options, connection)
+        reader = Reader(connection,
+                        object_def,
+                        query_options.dn,
+                        query,
+                        attributes=projection(object_def, attributes,
+                                              exclude))
+
+        # A paged search can not be resumed on a new session, so only
+        # the first page is retried.
+        pages: List[Iterator[Union[Entry, Record]]] = []
+
+        def first_entry() -> Optional[Union[Entry, Record]]:
+            # Build the filter as the Reader would, to report it, and to
+            # keep the raw responses of compact searches.
+            reader._create_query_filter()  # type: ignore
+            results: Iterator[Union[Entry, Record]]
+            if compact:
+                responses = connection.extend.standard.paged_search(
+                    query_options.dn, reader.query_filter, SUBTREE,
+                    attributes=list(reader.attributes),
+                    paged_size=page_size, generator=True)
+                results = records_from_responses(query_options, responses)
+            else:
+                results = reader.search_paged(page_size, generator=True)
+            pages[:] = [timed_iteration('search', results, connection,
+                                        reader.query_filter)]
+            return next(pages[0], None)
+
+        entry = retry_operation(connection, first_entry)
+        if entry is None:
+            return
+        yield entry
+        yield from pages[0]
+    finally:
+        release_connection(connection)
+
+
+def iter_users(query: str = 'uid: *',
+               attributes: Attributes = None,
+               page_size: int = 500,
+               compact: bool = False) -> Iterator[Union[Entry, Record]]:
+    """Lazily iterate over users in LDAP, using a paged search.
+
+    Args:
+        query (str, optional): Optional filter to apply. Defaults
+            to "uid: \\*" for all user objects.
+        attributes (Attributes, optional): LDAP attributes to fetch.
+            Defaults to all attributes.
+        page_size (int, optional): Number of entries per page.
+            Defaults to 500.
+        compact (bool, optional): Yield read-only Records rather than
+            entries.
+
+    Yields:
+        Union[Entry, Record]: User entries.
+    """
+    config = read_configuration()
+    return iter_entries(config.users, query, attributes, page_size,
+                        compact=compact)
+
+
+def iter_groups(query: str = 'CommonName: *',
+                attributes: Attributes = None,
+                page_size: int = 500,
+                compact: bool = False) -> Iterator[Union[Entry, Record]]:
+    """Lazily iterate over groups in LDAP, using a paged search.
+
+    Args:
+        query (str, optional): Optional filter to apply. Defaults
+            to "CommonName: \\*" for all group objects.
+        attributes (Attributes, optional): LDAP attributes to fetch.
+            Default is to exclude members, use ALL_ATTRIBUTES to
+            include them.
+        page_size (int, optional): Number of entries per page.
+            Defaults to 500.
+        compact (bool, optional): Yield read-only Records rather than
+            entries.
+
+    Yields:
+        Union[Entry, Record]: Group entries.
+    """
+    config = read_configuration()
+    return iter_entries(config.groups, query, attributes, page_size,
+                        MEMBER_ATTRIBUTES, compact)
+
+
+def list_users(query: str = 'uid: *',
+               attributes: Attributes = None,
+               compact: bool = False) -> List[Union[Entry, Record]]:
+    """List users in LDAP. The result is fetched using a paged search,
+    to avoid server size limits.
+
+    Args:
+        query (str, optional): Optional filter to apply. Defaults
+            to "uid: \\*" for all user objects.
+        attributes (Attributes, optional): LDAP attributes to fetch.
+            Defaults to all attributes.
+        compact (bool, optional): Return read-only Records rather than
+            entries.
+
+    Returns:
+        List[Union[Entry, Record]]: List of users.
+    """
+    return list(iter_users(query, attributes, compact=compact))
+
+
+def member_of(dn: str, attributes: Attributes = None) -> List[Entry]:
+    """Query LDAP for group membership
+
+    Args:
+        dn (str): Distinguished Name of a group member/user
+        attributes (Attributes, optional): LDAP attributes to return.
+            Default is to exclude members.
+
+    Returns:
+        List[Entry]: List of groups.
+    """
+    index = membership_index() if attributes is None else None
+    if index is not None:
+        return indexed_groups(index.groups_of(dn))
+
+    query = f"(&(objectClass=groupOfNames)(member={dn}))"
+    return cast(List[Entry], list_groups(query, attributes))
+
+
+def is_member(dn: str, group_dn: str) -> bool:
+    """Check whether a DN is a direct member of a group.
+
+    Args:
+        dn (str): Distinguished Name of a possible member.
+        group_dn (str): Distinguished Name of the group.
+
+    Returns:
+        bool: dn is a member of the group.
+    """
+    index = membership_index()
+    if index is not None:
+        return index.is_member(dn, group_dn)
+
+    value = escape_filter_chars(dn)
+    bound, connection = create_connection(read_only=True)
+    try:
+        if not bound:
+            return False
+        return bool(base_search(
+            connection, group_dn,
+            f'(|(member={value})(uniqueMember={value}))', ['1.1']))
+    finally:
+        release_connection(connection)
+
+
+def object_class_filter(options: LdapQueryOptions) -> str:
+    """Build an LDAP filter matching the object classes of an object type.
+
+    Args:
+        options (LdapQueryOptions): Settings object containing object
+            classes.
+
+    Returns:
+        str: LDAP filter, e.g. "(&(objectClass=groupOfNames))".
+    """
+    classes = as_list(options.object_classes)
+    return '(&' + ''.join(f'(objectClass={escape_filter_chars(name)})'
+                          for name in classes) + ')'
+
+
+def membership_index() -> Optional[MembershipIndex]:
+    """Get the shared membership index, building it on first use and
+    refreshing it when due.
+
+    Returns:
+        Optional[MembershipIndex]: Membership index, or None if the index
+            is disabled, or could not be built.
+    """
+    config = read_configuration()
+    if not config.membership_index:
+        return None
+    with singleton.shared_pools_lock:
+        if singleton.shared_membership_index is None:
+            singleton.shared_membership_index = MembershipIndex()
+            add_commit_listener(mark_membership_change)
+        index = singleton.shared_membership_index
+    refresh_membership_index(index)
+    return index if index.loaded else None
+
+
+def mark_membership_change(request: dict) -> None:
+    """Mark a changed group for refresh in the membership index. This is
+    registered as a commit listener, and called for every committed
+    change.
+
+    Args:
+        request (dict): LDAP request of the committed change.
+    """
+    index = singleton.shared_membership_index
+    dn = request['entry']
+    if index is None or not is_descendant(dn, read_configuration().groups.dn):
+        return
+    if request.get('type') == 'delRequest':
+        index.remove(dn)
+    elif request.get('newRdn'):
+        parent = request.get('newSuperior') or dn.split(',', 1)[-1]
+        index.remove(dn)
+        index.mark(f"{request['newRdn']},{parent}")
+    else:
+        index.mark(dn)
+
+
+def search_responses(connection: Connection, base: str, query: str,
+                     scope: str = SUBTREE,
+                     attributes: Sequence[str] = (ALL_ATTRIBUTES,
+                                                  'modifyTimestamp')
+                     ) -> Iterator[dict]:
+    """Search for entries, returning search responses rather than
+    entries. Subtree searches are paged, and the responses read lazily.
+
+    Args:
+        connection (Connection): LDAP connection.
+        base (str): Search base.
+        query (str): LDAP filter.
+        scope (str, optional): Search scope. Defaults to SUBTREE.
+        attributes (Sequence[str], optional): Attributes to fetch.
+            Defaults to all attributes and the modification timestamp.
+
+    Yields:
+        dict: Search result entries.
+    """
+    if scope == BASE:
+        with timed('search', connection, query) as event:
+            connection.search(base, query, BASE, attributes=list(attributes))
+            results = [result for result in connection.response or []
+                       if result['type'] == 'searchResEntry']
+            event.entries = len(results)
+        return iter(results)
+    results = connection.extend.standard.paged_search(
+        base, query, scope, attributes=list(attributes),
+        paged_size=1000, generator=True)
+    return timed_iteration('search', (result for result in results
+                                      if result['type'] == 'searchResEntry'),
+                           connection, query)
+
+
+def group_responses(connection: Connection, base: str, query: str,
+                    scope: str = SUBTREE) -> List[dict]:
+    """Read groups, with all attributes and the modification timestamp,
+    as search responses, using a paged search.
+
+    Args:
+        connection (Connection): LDAP connection.
+        base (str): Search base.
+        query (str): LDAP filter.
+        scope (str, optional): Search scope. Defaults to SUBTREE.
+
+    Returns:
+        List[dict]: Search result entries.
+    """
+    return list(search_responses(connection, base, query, scope))
+
+
+def refresh_membership_index(index: MembershipIndex,
+                             force: bool = False) -> None:
+    """Bring the membership index up to date. The index is rebuilt from
+    a scan of all groups when the rebuild interval has passed, or when
+    the server does not provide modification timestamps. Otherwise only
+    groups modified since the last poll, and groups changed using this
+    library, are read again.
+
+    Args:
+        index (MembershipIndex): Membership index.
+        force (bool, optional): Rebuild the index now.
+    """
+    config = read_configuration()
+    now = time.monotonic()
+    rebuild = (force or not index.loaded or
+               now - index.loaded_at >= config.membership_index_rebuild)
+    poll = now - index.polled_at >= config.membership_index_interval
+    if not (rebuild or poll or index.pending):
+        return
+
+    # Keep serving the current index while another thread refreshes it,
+    # unless there is nothing to serve yet.
+    if not index.refresh_lock.acquire(blocking=not index.loaded):
+        return
+    try:
+        dirty = index.take_dirty()
+        bound, connection = create_connection(read_only=True)
+        try:
+            if not bound:
+                return
+            base = config.groups.dn
+            query = object_class_filter(config.groups)
+            if rebuild or not index.high_water:
+                index.load(retry_operation(connection, lambda: group_responses(
+                    connection, base, query)))
+                return
+
+            if poll:
+                changed = (f'(&{query}'
+                           f'(modifyTimestamp>={index.high_water}))')
+                index.update(retry_operation(connection, lambda: (
+                    group_responses(connection, base, changed))))
+            for dn in dirty:
+                found = retry_operation(connection, lambda: group_responses(
+                    connection, dn, query, BASE))
+                if found:
+                    index.replace(found)
+                else:
+                    index.remove(dn)
+        finally:
+            release_connection(connection)
+    finally:
+        index.refresh_lock.release()
+
+
+def indexed_groups(responses: List[dict]) -> List[Entry]:
+    """Build read-only group entries from responses of the membership
+    index, without querying the server.
+
+    Args:
+        responses (List[dict]): Group responses, without members.
+
+    Returns:
+        List[Entry]: Group entries.
+    """
+    config = read_configuration()
+    bound, connection = create_connection(read_only=True)
+    try:
+        if not bound:
+            return []
+        group_def = object_definition(config.groups, connection)
+        return list(cursor_from_responses(
+            connection, group_def, config.groups.dn,
+            [copy.deepcopy(response) for response in responses]))
+    finally:
+        release_connection(connection)
+
+
+def sync_mirror(mirror: Mirror, reconcile_interval: int = 3600,
+                full: bool = False) -> None:
+    """Bring a local mirror of users and groups up to date. Entries are
+    dumped in full into an empty mirror, or when the server does not
+    provide modification timestamps. Otherwise only entries modified
+    since the newest mirrored entry are read, and the mirrored DNs are
+    checked for deleted entries once the reconcile interval has passed.
+
+    Args:
+        mirror (Mirror): Local mirror.
+        reconcile_interval (int, optional): Seconds between checks for
+            deleted entries. Defaults to 3600.
+        full (bool, optional): Dump all entries again.
+    """
+    config = read_configuration()
+    bound, connection = create_connection(read_only=True)
+    try:
+        if not bound:
+            return
+
+        for kind, options in ((Mirror.USERS, config.users),
+                              (Mirror.GROUPS, config.groups)):
+            base = options.dn
+            query = object_class_filter(options)
+            high_water = mirror.high_water(kind)
+            if full or not high_water:
+                retry_operation(connection, lambda: mirror.load(
+                    kind, search_responses(connection, base, query)))
+                continue
+
+            changed = f'(&{query}(modifyTimestamp>={high_water}))'
+            retry_operation(connection, lambda: mirror.update(
+                kind, search_responses(connection, base, changed)))
+            if time.time() - mirror.reconciled_at(kind) >= reconcile_interval:
+                retry_operation(connection, lambda: mirror.reconcile(
+                    kind, (response['dn'] for response in search_responses(
+                        connection, base, query, attributes=['1.1']))))
+    finally:
+        release_connection(connection)
+
+
+def dump_snapshot(path: Union[str, Path],
+                  bases: Optional[Sequence[str]] = None) -> int:
+    """Dump subtrees of the directory to a snapshot file, which can be
+    loaded into a MOCK_SYNC server, e.g. as a test fixture, using
+    bituldap.snapshot.Snapshot.from_file().
+
+    Args:
+        path (Union[str, Path]): Snapshot file. Names ending in .jsonl
+            are written as JSON Lines, as entries are read, others are
+            pickled. A further .gz suffix compresses the file.
+        bases (Sequence[str], optional): Distinguished Names of the
+            subtrees. Defaults to the users and groups subtrees.
+
+    Returns:
+        int: Number of entries dumped.
+    """
+    config = read_configuration()
+    if bases is None:
+        bases = [config.users.dn, config.groups.dn]
+    bound, connection = create_connection(read_only=True)
+    try:
+        if not bound:
+            return 0
+        return snapshot.dump(itertools.chain.from_iterable(
+            timed_iteration('search', snapshot.read_directory(connection,
+                                                              base),
+                            connection, '(objectClass=*)')
+            for base in bases), path)
+    finally:
+        release_connection(connection)
+
+
+def export_entries(path: Union[str, Path],
+                   kinds: Sequence[str] = ('users', 'groups'),
+                   attributes: Attributes = None,
+                   page_size: int = 500) -> int:
+    """Export users and groups to an LDIF or JSON Lines file, e.g. for
+    backups or migrations. Entries are streamed from a paged search to
+    the file, so memory use does not grow with the size of the directory.
+
+    Args:
+        path (Union[str, Path]): Export file. Names ending in .ldif are
+            written as LDIF, names ending in .jsonl as JSON Lines. A
+            further .gz suffix compresses the file.
+        kinds (Sequence[str], optional): Object types to export, users
+            and/or groups. Defaults to both.
+        attributes (Attributes, optional): Attributes to export. Defaults
+            to all user attributes.
+        page_size (int, optional): Number of entries per page.
+
+    Raises:
+        ValueError: Unknown object type or export format.
+
+    Returns:
+        int: Number of entries exported.
+    """
+    config = read_configuration()
+    options = {'users': config.users, 'groups': config.groups}
+    unknown = [kind for kind in kinds if kind not in options]
+    if unknown:
+        raise ValueError(f'Unknown object types: {", ".join(unknown)}')
+    transfer.file_format(path)
+    requested: List[str] = [ALL_ATTRIBUTES]
+    if attributes is not None:
+        requested = as_list(attributes) + ['objectClass']
+
+    bound, connection = create_connection(read_only=True)
+    try:
+        if not bound:
+            return 0
+        return transfer.write(itertools.chain.from_iterable(
+            timed_iteration('search', snapshot.read_directory(
+                connection, options[kind].dn,
+                object_class_filter(options[kind]), requested, page_size),
+                connection, object_class_filter(options[kind]))
+            for kind in kinds), path)
+    finally:
+        release_connection(connection)
+
+
+def import_entries(path: Union[str, Path],
+                   checkpoint: Optional[Union[str, Path]] = None,
+                   batch_size: int = 1000,
+                   workers: int = 0) -> ImportResult:
+    """Import entries from an LDIF or JSON Lines file, written by
+    export_entries() or another tool. Entries are read one batch at a
+    time, and each batch is added using concurrent add operations on
+    pooled connections. Entries which already exist are left as they are,
+    so an import can safely be repeated. Parent entries must be added
+    before their children, in an earlier batch.
+
+    Args:
+        path (Union[str, Path]): Import file. See export_entries().
+        checkpoint (Union[str, Path], optional): File recording the
+            progress after every batch. An interrupted import, given the
+            same checkpoint, resumes after the last completed batch.
+        batch_size (int, optional): Number of entries read and added at
+            a time.
+        workers (int, optional): Maximum number of concurrent adds.
+            Defaults to half the maximum connection pool size, leaving
+            connections for other threads.
+
+    Raises:
+        ValueError: Invalid import file, or a checkpoint of another file.
+        BudgetExceeded: Adds were refused by a strict tracker. The batch
+            is completed, but not saved to the checkpoint, and the
+            ImportResult so far is the result of the exception.
+
+    Returns:
+        ImportResult: Numbers of added and existing entries, and the
+        entries which failed.
+    """
+    source = str(Path(path).resolve())
+    progress = (transfer.Checkpoint.load(checkpoint, source)
+                if checkpoint else transfer.Checkpoint(source))
+    result = ImportResult(progress.added, progress.existing)
+    entries = itertools.islice(transfer.read(path), progress.position, None)
+    refused: Set[int] = set()
+
+    def add(dn: str, attributes: dict) -> BulkResult:
+        try:
+            return add_entry(dn, attributes)
+        except BudgetExceeded as e:
+            runner.refuse(e)
+            outcome = BulkResult(dn, False, str(e))
+            refused.add(id(outcome))
+            return outcome
+
+    with bulk_workers(workers, 'bituldap-import') as runner:
+        while True:
+            batch = list(itertools.islice(entries, max(batch_size, 1)))
+            if not batch:
+                break
+            for outcome in runner.map(add, *zip(*batch)):
+                if outcome.success:
+                    result.added += 1
+                elif outcome.code == RESULT_ENTRY_ALREADY_EXISTS:
+                    result.existing += 1
+                elif id(outcome) not in refused:
+                    result.failures.append(outcome)
+                    progress.failed += 1
+            # The refused entries are added when resuming the batch.
+            runner.check(result)
+            progress.position += len(batch)
+            progress.added, progress.existing = result.added, result.existing
+            if checkpoint:
+                progress.save(checkpoint)
+    return result
+
+
+def transitive_member_of(dn: str,
+                         attributes: Attributes = None,
+                         memo: Optional[MembershipMemo] = None,
+                         chunk_size: int = 100) -> List[Entry]:
+    """Query LDAP for group membership, including membership through
+    nested groups. Groups are found breadth-first, using one search per
+    level of nesting and chunk of DNs, rather than one per group.
+
+    Args:
+        dn (str): Distinguished Name of a group member/user.
+        attributes (Attributes, optional): LDAP attributes to return.
+            Default is to exclude members.
+        memo (MembershipMemo, optional): Memo table shared by the calls
+            of a single request.
+        chunk_size (int, optional): Maximum number of DNs per search.
+            Defaults to 100.
+
+    Returns:
+        List[Entry]: List of groups, read-only, nearest first.
+    """
+    memo = memo if memo is not None else MembershipMemo()
+    key = dn.lower()
+    if key in memo.member_of:
+        return [memo.groups[group] for group in memo.member_of[key]]
+
+    config = read_configuration()
+    found: Dict[str, None] = {}
+    visited = {key}
+    level = [dn]
+    bound, connection = create_connection(read_only=True)
+    try:
+        if not bound:
+            return []
+
+        group_def = object_definition(config.groups, connection)
+        fetch = projection(group_def, attributes, MEMBER_ATTRIBUTES)
+        while level:
+            search: List[str] = []
+            for member in level:
+                closure = memo.member_of.get(member.lower())
+                if closure is None:
+                    search.append(member)
+                else:
+                    # Already complete, no need to walk it again.
+                    found.update(dict.fromkeys(closure))
+
+            level = []
+            for query in or_filters('member', search, chunk_size):
+                for group in ldap_search(connection, group_def,
+                                         config.groups.dn, query, fetch):
+                    group_key = group.entry_dn.lower()
+                    memo.groups[group_key] = group
+                    found[group_key] = None
+                    if group_key not in visited:
+                        visited.add(group_key)
+                        level.append(group.entry_dn)
+    finally:
+        release_connection(connection)
+
+    memo.member_of[key] = list(found)
+    return [memo.groups[group] for group in found]
+
+
+def expand_group(cn: str,
+                 memo: Optional[MembershipMemo] = None,
+                 chunk_size: int = 100) -> List[str]:
+    """Find all members of a group, including the members of nested
+    groups. Members below the groups DN are looked up as groups,
+    breadth-first, using one search per level of nesting and chunk of
+    DNs. Each group is expanded only once, so membership cycles are
+    harmless.
+
+    Args:
+        cn (str): Common Name of the group.
+        memo (MembershipMemo, optional): Memo table shared by the calls
+            of a single request.
+        chunk_size (int, optional): Maximum number of DNs per search.
+            Defaults to 100.
+
+    Returns:
+        List[str]: Distinguished Names of the members which are not
+            groups themselves, e.g. users.
+    """
+    memo = memo if memo is not None else MembershipMemo()
+    group = cast(Optional[Entry], get_group(cn, attributes=ALL_ATTRIBUTES))
+    if group is None:
+        return []
+
+    config = read_configuration()
+    root = group.entry_dn.lower()
+    memo.members[root] = member_dns(group)[0]
+    members: Dict[str, str] = {}
+    visited = {root}
+    level = [group.entry_dn]
+    bound, connection = create_connection(read_only=True)
+    try:
+        if not bound:
+            return []
+
+        group_def = object_definition(config.groups, connection)
+        fetch = [name for name in MEMBER_ATTRIBUTES if name in group_def]
+        while level:
+            unknown = [dn for dn in level if dn.lower() not in memo.members]
+            batches, single = batch_dns(unknown)
+            for entry in search_batches(connection, group_def, batches,
+                                        single, fetch, chunk_size):
+                memo.members[entry.entry_dn.lower()] = member_dns(entry)[0]
+            for dn in unknown:
+                memo.members.setdefault(dn.lower(), None)
+
+            next_level: List[str] = []
+            for dn in level:
+                dns = memo.members[dn.lower()]
+                if dns is None:
+                    members[dn.lower()] = dn
+                    continue
+                for member in dns:
+                    if member.lower() in visited:
+                        continue
+                    visited.add(member.lower())
+                    if is_descendant(member, config.groups.dn):
+                        next_level.append(member)
+                    else:
+                        members[member.lower()] = member
+            level = next_level
+    finally:
+        release_connection(connection)
+    return list(members.values())
+
+
+def member_dns(group: Entry) -> Tuple[List[str], List[str]]:
+    """Get the members of a group entry, as DNs for groupOfNames and
+    groupOfUniqueNames groups, and usernames for memberUid.
+
+    Args:
+        group (Entry): LDAP group entry.
+
+    Returns:
+        List[str]: Distinguished Names of members.
+        List[str]: Usernames of members.
+    """
+    dns: List[str] = []
+    uids: List[str] = []
+    for attr in group.entry_attributes:
+        if attr.lower() in ('member', 'uniquemember'):
+            dns.extend(group[attr].values)
+        elif attr.lower() == 'memberuid':
+            uids.extend(group[attr].values)
+    return dns, uids
+
+
+def resolve_members(group: Union[str, Entry],
+                    attributes: Attributes = None,
+                    chunk_size: int = 100) -> Iterator[Entry]:
+    """Resolve the members of a group to user entries. Member DNs are
+    grouped by parent DN and fetched using one search per chunk of
+    members, rather than one lookup per member. Members which are not
+    users, e.g. nested groups, are skipped.
+
+    Args:
+        group (Union[str, Entry]): Group entry, or Common Name of group.
+        attributes (Attributes, optional): LDAP attributes to fetch for
+            each user. Defaults to all attributes.
+        chunk_size (int, optional): Maximum number of members per search.
+            Defaults to 100.
+
+    Yields:
+        Entry: User entries, read-only.
+    """
+    config = read_configuration()
+    if isinstance(group, str):
+        found = cast(Optional[Entry],
+                     get_group(group, attributes=ALL_ATTRIBUTES))
+        if found is None:
+            return
+        group = found
+
+    dns, uids = member_dns(group)
+    batches, single = batch_dns(dns)
+    if uids:
+        key = (config.users.dn.lower(), 'uid')
+        batches.setdefault(key, (config.users.dn, []))[1].extend(uids)
+
+    bound, connection = create_connection(read_only=True)
+    try:
+        if not bound:
+            return
+
+        object_def = object_definition(config.users, connection)
+        fetch = projection(object_def, attributes)
+        yield from search_batches(connection, object_def, batches, single,
+                                  fetch, chunk_size)
+    finally:
+        release_connection(connection)
+
+
+def batch_dns(dns: Iterable[str]) -> Tuple[
+        Dict[Tuple[str, str], Tuple[str, List[str]]], List[str]]:
+    """Group DNs by parent DN and RDN attribute, so the entries can be
+    read using one single-level search per batch. DNs with multi-valued
+    or escaped RDNs can not be matched by a filter, and are returned
+    separately.
+
+    Args:
+        dns (Iterable[str]): Distinguished Names.
+
+    Returns:
+        Dict: RDN values, with the parent DN, keyed on lower case parent
+            DN and RDN attribute.
+        List[str]: DNs to read individually.
+    """
+    batches: Dict[Tuple[str, str], Tuple[str, List[str]]] = {}
+    single: List[str] = []
+    for dn in dns:
+        parts = parse_dn(dn)
+        attr, value, separator = parts[0]
+        if separator == '+' or '\\' in value or len(parts) < 2:
+            single.append(dn)
+            continue
+        parent = ','.join(f'{a}={v}' for a, v, _ in parts[1:])
+        key = (parent.lower(), attr.lower())
+        batches.setdefault(key, (parent, []))[1].append(value)
+    return batches, single
+
+
+def search_batches(connection: Connection,
+                   object_def: ObjectDef,
+                   batches: Dict[Tuple[str, str], Tuple[str, List[str]]],
+                   single: List[str],
+                   fetch: Optional[List[str]],
+                   chunk_size: int = 100) -> Iterator[Entry]:
+    """Read the entries of DNs grouped by batch_dns(). DNs which do not
+    exist, or do not match the object definition, are skipped.
+
+    Args:
+        connection (Connection): LDAP connection.
+        object_def (ObjectDef): Object definition of the entries.
+        batches (Dict): Batches returned by batch_dns().
+        single (List[str]): DNs to read individually.
+        fetch (Optional[List[str]]): LDAP attributes to fetch.
+        chunk_size (int, optional): Maximum number of values per search.
+
+    Yields:
+        Entry: LDAP entries.
+    """
+    for (_, attr), (parent, values) in batches.items():
+        for query in or_filters(attr, values, chunk_size):
+            yield from ldap_search(connection, object_def, parent,
+                                   query, fetch, sub_tree=False)
+
+    for dn in single:
+        reader = Reader(connection, object_def, dn, attributes=fetch)
+        with timed('search', connection, '(objectClass=*)') as event:
+            entry = retry_operation(connection, reader.search_object)
+            event.entries = 0 if entry is None else 1
+        if entry is not None:
+            yield entry
+
+
+def hash_password(password: str) -> str:
+    """Hash a password using the configured scheme.
+
+    Args:
+        password (str): Password in clear text.
+
+    Returns:
+        str: Password hash, e.g. "{SSHA}...", or the password itself if
+            the scheme is PLAIN, leaving hashing to the server.
+    """
+    config = read_configuration()
+    return hashed(config.password_hash, password)
+
+
+def replace_password(connection: Connection, dn: str,
+                     hashed_password: str) -> bool:
+    """Replace the password of an entry, retrying on transient errors.
+
+    Args:
+        connection (Connection): LDAP connection.
+        dn (str): Distinguished Name of the user.
+        hashed_password (str): New password, hashed.
+
+    Returns:
+        bool: Password updated successfully, True or False.
+    """
+    with timed('modify', connection) as event:
+        modified = event.success = retry_operation(
+            connection,
+            lambda: connection.modify(dn, {'userPassword': [
+                                      (MODIFY_REPLACE, [hashed_password])]}),
+            retry_if=lambda ok: not ok and retry.retryable_result(connection))
+    if modified:
+        notify_commit({'type': 'modifyRequest', 'entry': dn})
+    return modified
+
+
+def set_user_password(dn: str, password: str) -> bool:
+    """Set a password for a given user DN.
+
+    Args:
+        dn (str): Distinguished Name of the user.
+        password (str): New password
+
+    Returns:
+        bool: Password updated successfully, True or False.
+    """
+    with timed('set_user_password') as event:
+        success, connection = create_connection()
+        try:
+            if success:
+                success = replace_password(connection, dn,
+                                           hash_password(password))
+        finally:
+            release_connection(connection)
+        event.server = instrument.server_name(connection)
+        event.success = success
+    return success
+
+
+def set_passwords(passwords: Mapping[str, str],
+                  workers: int = 0) -> List[BulkResult]:
+    """Set the passwords of many users, e.g. for a credential rotation.
+    Each worker thread borrows one pooled connection for the duration of
+    the call, and hashes and sends the passwords it picks up, so hashing
+    overlaps with waiting for the server. Workers unable to borrow a
+    connection leave the passwords to the others; if none can, the
+    passwords are reported as failed.
+
+    Args:
+        passwords (Mapping[str, str]): New passwords, in clear text,
+            keyed on the Distinguished Name of the user.
+        workers (int, optional): Number of worker threads and
+            connections. Defaults to half the maximum connection pool
+            size, leaving connections for other threads.
+
+    Raises:
+        BudgetExceeded: Modifies were refused by a strict tracker. The
+            other passwords are set, and the outcome of each user is the
+            result of the exception.
+
+    Returns:
+        List[BulkResult]: Outcome of each user, in the order given.
+    """
+    items = list(passwords.items())
+    results = [BulkResult(dn, False, 'Not attempted') for dn, _ in items]
+    pending = iter(enumerate(items))
+    lock = threading.Lock()
+    errors: List[str] = []
+
+    def work(_: int) -> None:
+        try:
+            bound, connection = create_connection()
+        except BudgetExceeded as e:
+            runner.refuse(e)
+            with lock:
+                errors.append(str(e))
+            return
+        except (PoolTimeoutError, LDAPException) as e:
+            with lock:
+                errors.append(f'Unable to connect to LDAP server: {e}')
+            return
+        try:
+            while True:
+                with lock:
+                    item = next(pending, None)
+                if item is None:
+                    return
+                index, (dn, password) = item
+                if not bound:
+                    results[index].error = 'Unable to connect to LDAP server'
+                    continue
+                try:
+                    if replace_password(connection, dn,
+                                        hash_password(password)):
+                        results[index] = BulkResult(dn, True)
+                        continue
+                    result = connection.result or {}
+                    results[index].error = (result.get('message') or
+                                            result.get('description', ''))
+                except BudgetExceeded as e:
+                    runner.refuse(e)
+                    results[index].error = str(e)
+                except LDAPException as e:
+                    results[index].error = str(e)
+        finally:
+            release_connection(connection)
+
+    if not items:
+        return results
+    with bulk_workers(workers, 'bituldap-passwords', len(items)) as runner:
+        list(runner.map(work, range(runner.workers)))
+
+    # Passwords left over when no worker could borrow a connection.
+    if errors:
+        for index, (dn, _) in pending:
+            results[index].error = errors[0]
+    runner.check(results)
+    return results
@@ -0,0 +1,190 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import (Any, Callable, Dict, Iterable, List, Optional, Tuple,
+                    Union)
+
+from ldap3 import Entry
+
+import bituldap
+
+from . import singleton
+from .record import Record
+from .types import Attributes, BulkResult
+
+""" Coroutine versions of the public functions, for use in asyncio
+    applications.
+
+    ldap3 does not integrate with asyncio, so each call is run in a
+    dedicated thread pool, keeping socket I/O off the event loop. The
+    thread pool is sized to the connection pool, limiting the number of
+    concurrent LDAP operations started by coroutines. The connection pool
+    is shared with synchronous callers, and functions using several
+    connections at once, so a worker thread may still wait for a
+    connection, up to pool_timeout seconds. The event loop is never
+    blocked while it waits.
+"""
+
+
+def executor() -> ThreadPoolExecutor:
+    """Get the thread pool used to run LDAP operations, creating it on
+    first use.
+
+    Returns:
+        ThreadPoolExecutor: Shared thread pool.
+    """
+    with singleton.shared_pools_lock:
+        if singleton.shared_executor is None:
+            config = bituldap.read_configuration()
+            singleton.shared_executor = ThreadPoolExecutor(
+                max_workers=max(config.pool_max_size, 1),
+                thread_name_prefix='bituldap')
+        return singleton.shared_executor
+
+
+def shutdown(wait: bool = True) -> None:
+    """Shut down the thread pool, e.g. when the application exits. A new
+    pool is created by the next call.
+
+    Args:
+        wait (bool, optional): Wait for running operations to complete.
+    """
+    with singleton.shared_pools_lock:
+        pool, singleton.shared_executor = singleton.shared_executor, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+
+async def run(function: Callable, *args, **kwargs) -> Any:
+    """Run a blocking function in the LDAP thread pool, in a copy of the
+    context of the calling task, so requests count towards its trackers.
+
+    Args:
+        function (Callable): Function to call.
+
+    Returns:
+        Any: Return value of the function.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        executor(), functools.partial(context.run, function, *args, **kwargs))
+
+
+async def get_user(uid: str,
+                   attributes: Attributes = None,
+                   compact: bool = False) -> Optional[Union[Entry, Record]]:
+    """Coroutine version of bituldap.get_user()."""
+    return await run(bituldap.get_user, uid, attributes, compact)
+
+
+async def get_users(uids: Iterable[str],
+                    attributes: Attributes = None
+                    ) -> Dict[str, Optional[Entry]]:
+    """Coroutine version of bituldap.get_users()."""
+    return await run(bituldap.get_users, list(uids), attributes)
+
+
+async def get_group(cn: str,
+                    attributes: Attributes = None,
+                    compact: bool = False) -> Optional[Union[Entry, Record]]:
+    """Coroutine version of bituldap.get_group()."""
+    return await run(bituldap.get_group, cn, attributes, compact)
+
+
+async def get_groups(cns: Iterable[str],
+                     attributes: Attributes = None
+                     ) -> Dict[str, Optional[Entry]]:
+    """Coroutine version of bituldap.get_groups()."""
+    return await run(bituldap.get_groups, list(cns), attributes)
+
+
+async def list_users(query: str = 'uid: *',
+                     attributes: Attributes = None,
+                     compact: bool = False) -> List[Union[Entry, Record]]:
+    """Coroutine version of bituldap.list_users()."""
+    return await run(bituldap.list_users, query, attributes, compact)
+
+
+async def list_groups(query: str = 'CommonName: *',
+                      attributes: Attributes = None,
+                      compact: bool = False) -> List[Union[Entry, Record]]:
+    """Coroutine version of bituldap.list_groups()."""
+    return await run(bituldap.list_groups, query, attributes, compact)
+
+
+async def member_of(dn: str, attributes: Attributes = None) -> List[Entry]:
+    """Coroutine version of bituldap.member_of()."""
+    return await run(bituldap.member_of, dn, attributes)
+
+
+async def new_group(cn: str, gid_number: int = 0,
+                    members: Optional[List[str]] = None,
+                    description: str = '') -> Tuple[bool, Entry]:
+    """Coroutine version of bituldap.new_group()."""
+    return await run(bituldap.new_group, cn, gid_number,
+                     members or [], description)
+
+
+async def add_members(cn: str, dns: Iterable[str],
+                      chunk_size: int = 1000) -> Tuple[bool, List[str]]:
+    """Coroutine version of bituldap.add_members()."""
+    return await run(bituldap.add_members, cn, list(dns), chunk_size)
+
+
+async def remove_members(cn: str, dns: Iterable[str],
+                         chunk_size: int = 1000) -> Tuple[bool, List[str]]:
+    """Coroutine version of bituldap.remove_members()."""
+    return await run(bituldap.remove_members, cn, list(dns), chunk_size)
+
+
+async def set_members(cn: str, dns: Iterable[str],
+                      chunk_size: int = 1000
+                      ) -> Tuple[bool, List[str], List[str]]:
+    """Coroutine version of bituldap.set_members()."""
+    return await run(bituldap.set_members, cn, list(dns), chunk_size)
+
+
+async def set_user_password(dn: str, password: str) -> bool:
+    """Coroutine version of bituldap.set_user_password()."""
+    return await run(bituldap.set_user_password, dn, password)
+
+
+async def set_passwords(passwords: Dict[str, str],
+                        workers: int = 0) -> List[BulkResult]:
+    """Coroutine version of bituldap.set_passwords()."""
+    return await run(bituldap.set_passwords, passwords, workers)
+
+
+async def commit(entry: Entry) -> bool:
+    """Commit changes to an entry, without blocking the event loop.
+
+    Args:
+        entry (Entry): Writable entry, e.g. returned by get_user().
+
+    Returns:
+        bool: Changes committed successfully.
+    """
+    return await run(entry.entry_commit_changes)
+
+
+async def next_uid_number() -> int:
+    """Coroutine version of bituldap.next_uid_number()."""
+    return await run(bituldap.next_uid_number)
+
+
+async def next_gid_number() -> int:
+    """Coroutine version of bituldap.next_gid_number()."""
+    return await run(bituldap.next_gid_number)
+
+
+async def reserve_uid_numbers(count: int = 1) -> range:
+    """Coroutine version of bituldap.reserve_uid_numbers()."""
+    return await run(bituldap.reserve_uid_numbers, count)
+
+
+async def reserve_gid_numbers(count: int = 1) -> range:
+    """Coroutine version of bituldap.reserve_gid_numbers()."""
+    return await run(bituldap.reserve_gid_numbers, count)
@@ -0,0 +1,128 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import random
+import time
+from typing import Callable, Optional, Tuple
+
+from ldap3 import BASE, MODIFY_ADD, MODIFY_DELETE, Connection
+from ldap3.utils.dn import parse_dn
+
+from .instrument import count_entries, timed
+
+""" Allocation of POSIX user and group IDs from a counter entry.
+
+    The counter entry holds the next free ID. IDs are allocated by
+    replacing the current value with a single modify operation, deleting
+    the value read and adding the new one. If another client changed the
+    counter in the meantime, the delete fails, the whole modify is rejected
+    by the server and the allocation is retried.
+"""
+
+# The extensibleObject class allows the counter entry to hold uidNumber
+# or gidNumber, without requiring a schema extension.
+COUNTER_OBJECT_CLASSES = ['device', 'extensibleObject']
+
+
+class AllocationError(Exception):
+    """Raised when no IDs could be allocated, after retrying."""
+
+
+def read_counter(connection: Connection, dn: str,
+                 attribute: str) -> Tuple[bool, Optional[int]]:
+    """Read the current value of a counter entry.
+
+    Args:
+        connection (Connection): LDAP connection.
+        dn (str): Distinguished Name of the counter entry.
+        attribute (str): Attribute holding the counter.
+
+    Returns:
+        bool: The counter entry exists.
+        Optional[int]: Next free ID, or None if not set.
+    """
+    with timed('search', connection, '(objectClass=*)') as event:
+        connection.search(dn, '(objectClass=*)', BASE,
+                          attributes=[attribute])
+        event.entries = count_entries(connection.response)
+    for response in connection.response or []:
+        if response['type'] != 'searchResEntry':
+            continue
+        value = response['attributes'].get(attribute)
+        if isinstance(value, list):
+            value = value[0] if value else None
+        return True, None if value is None else int(value)
+    return False, None
+
+
+def compare_and_swap(connection: Connection, dn: str, attribute: str,
+                     current: int, new: int) -> bool:
+    """Replace the counter value, only if it is still the current value.
+
+    Args:
+        connection (Connection): LDAP connection.
+        dn (str): Distinguished Name of the counter entry.
+        attribute (str): Attribute holding the counter.
+        current (int): Value read from the counter.
+        new (int): New counter value.
+
+    Returns:
+        bool: Counter was updated.
+    """
+    with timed('modify', connection) as event:
+        event.success = connection.modify(dn, {attribute: [
+                                          (MODIFY_DELETE, [str(current)]),
+                                          (MODIFY_ADD, [str(new)])]})
+    return event.success
+
+
+def reserve(connection: Connection, dn: str, attribute: str, count: int,
+            seed: Callable[[], int], retries: int = 10) -> range:
+    """Reserve a block of consecutive IDs from a counter entry. If the
+    counter does not exist it is created, starting from the value returned
+    by seed().
+
+    Args:
+        connection (Connection): Read/write LDAP connection.
+        dn (str): Distinguished Name of the counter entry.
+        attribute (str): Attribute holding the counter.
+        count (int): Number of IDs to reserve.
+        seed (Callable[[], int]): Function returning the first free ID,
+            used only when the counter has not yet been created.
+        retries (int): Number of attempts, when other clients allocate
+            IDs at the same time.
+
+    Raises:
+        AllocationError: The counter could not be updated.
+
+    Returns:
+        range: Reserved IDs.
+    """
+    if count < 1:
+        raise ValueError('At least one ID must be reserved')
+
+    for attempt in range(retries):
+        exists, current = read_counter(connection, dn, attribute)
+        if not exists:
+            start = seed()
+            name, value, _ = parse_dn(dn)[0]
+            with timed('add', connection) as event:
+                event.success = connection.add(
+                    dn, COUNTER_OBJECT_CLASSES,
+                    {name: value, attribute: start + count})
+            if event.success:
+                return range(start, start + count)
+        elif current is None:
+            start = seed()
+            with timed('modify', connection) as event:
+                event.success = connection.modify(dn, {attribute: [
+                    (MODIFY_ADD, [str(start + count)])]})
+            if event.success:
+                return range(start, start + count)
+        elif compare_and_swap(connection, dn, attribute,
+                              current, current + count):
+            return range(current, current + count)
+
+        # Another client won the race, back off before retrying.
+        time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+
+    raise AllocationError(f'Unable to allocate {attribute} from {dn} '
+                          f'after {retries} attempts')
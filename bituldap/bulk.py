@@ -0,0 +1,74 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, TypeVar
+
+from .instrument import BudgetExceeded
+
+""" Worker threads of bulk operations, e.g. creating many entries or
+    setting many passwords, on behalf of the calling thread.
+"""
+
+T = TypeVar('T')
+
+
+class BulkWorkers:
+    """Thread pool running the operations of a bulk call. Workers run in
+    copies of the context of the caller, so their requests count towards
+    the trackers of the caller. Requests refused by a strict tracker are
+    noted with refuse(), while the other operations continue, and raised
+    by check() once the outcome of every operation is known.
+
+    Args:
+        workers (int): Number of worker threads, at least one.
+        name (str): Prefix of the thread names.
+    """
+
+    def __init__(self, workers: int, name: str):
+        self.workers = max(workers, 1)
+        self.refusals: List[BudgetExceeded] = []
+        self._context = contextvars.copy_context()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix=name)
+
+    def __enter__(self) -> 'BulkWorkers':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._executor.shutdown(wait=True)
+
+    def map(self, function: Callable[..., T],
+            *iterables: Iterable) -> Iterator[T]:
+        """Call function for every item, like ThreadPoolExecutor.map().
+
+        Args:
+            function (Callable): Operation, taking one argument from each
+                iterable.
+            iterables (Iterable): Arguments of the operations.
+
+        Returns:
+            Iterator[T]: Return values, in the order of the items.
+        """
+        return self._executor.map(
+            lambda *args: self._context.copy().run(function, *args),
+            *iterables)
+
+    def refuse(self, error: BudgetExceeded) -> None:
+        """Note an operation refused by a strict tracker.
+
+        Args:
+            error (BudgetExceeded): Error raised by the operation.
+        """
+        self.refusals.append(error)
+
+    def check(self, result: Any) -> None:
+        """Raise the first refusal, if any, with the outcome of the call.
+
+        Args:
+            result (Any): Outcome of the call so far.
+
+        Raises:
+            BudgetExceeded: An operation was refused.
+        """
+        if self.refusals:
+            raise BudgetExceeded(str(self.refusals[0]), result)
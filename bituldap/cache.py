@@ -0,0 +1,162 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import copy
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+
+
+CacheKey = Tuple[str, str, str, Tuple[str, ...]]
+
+
+@dataclass
+class CachedEntry:
+    """Search response of a cached entry. A response of None records that
+    the entry does not exist.
+    """
+    response: Optional[dict]
+    expires: float
+
+    @property
+    def dn(self) -> Optional[str]:
+        return self.response['dn'] if self.response else None
+
+    @property
+    def modify_timestamp(self) -> Optional[list]:
+        if not self.response:
+            return None
+        raw = self.response['raw_attributes']
+        for name in raw:
+            if name.lower() == 'modifytimestamp':
+                return raw[name]
+        return None
+
+    @property
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires
+
+
+def rdn_value(dn: str) -> str:
+    """Get the value of the first RDN of a DN, in lower case.
+
+    Args:
+        dn (str): Distinguished Name.
+
+    Returns:
+        str: Value of the first RDN, e.g. "jdoe" for "uid=jdoe,ou=users".
+    """
+    rdn = dn.split(',', 1)[0]
+    return rdn.split('=', 1)[-1].strip().lower()
+
+
+class EntryCache:
+    """Thread-safe, size bounded LRU cache of LDAP search responses,
+    keyed on search base, attribute, value and requested attributes.
+
+    Args:
+        size (int): Maximum number of cached entries.
+        negative_ttl (float): Seconds to remember that an entry does not
+            exist.
+    """
+
+    def __init__(self, size: int = 1000, negative_ttl: float = 10):
+        self.size = size
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[CacheKey, CachedEntry]' = OrderedDict()
+        self._by_dn: Dict[str, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> Optional[CachedEntry]:
+        """Look up an entry, fresh or expired. Expired entries are kept
+        so they may be revalidated using their modification timestamp.
+
+        Args:
+            key (CacheKey): Search base, attribute name, value and
+                requested attributes.
+
+        Returns:
+            Optional[CachedEntry]: Cached entry, or None if not cached.
+        """
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None or not cached.fresh:
+                self.misses += 1
+            else:
+                self.hits += 1
+            if cached is not None:
+                self._entries.move_to_end(key)
+            return cached
+
+    def store(self, key: CacheKey, response: Optional[dict],
+              ttl: float) -> None:
+        """Cache a search response, or the absence of an entry.
+
+        Args:
+            key (CacheKey): Search base, attribute name, value and
+                requested attributes.
+            response (Optional[dict]): Search response, None if the
+                entry does not exist.
+            ttl (float): Seconds the response is considered fresh.
+        """
+        if response is not None:
+            response = copy.deepcopy(response)
+        else:
+            ttl = self.negative_ttl
+        cached = CachedEntry(response, time.monotonic() + ttl)
+
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = cached
+            index = cached.dn.lower() if cached.dn else key[2].lower()
+            self._by_dn.setdefault(index, set()).add(key)
+            while len(self._entries) > self.size:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+
+    def touch(self, key: CacheKey, ttl: float) -> None:
+        """Mark a revalidated entry as fresh for another ttl seconds.
+
+        Args:
+            key (CacheKey): Search base, attribute name, value and
+                requested attributes.
+            ttl (float): Seconds the response is considered fresh.
+        """
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                cached.expires = time.monotonic() + ttl
+
+    def invalidate(self, dn: str) -> None:
+        """Remove an entry, and any cached absence of an entry with the
+        same RDN value, e.g. after the entry was added or modified.
+
+        Args:
+            dn (str): Distinguished Name of the changed entry.
+        """
+        with self._lock:
+            for index in (dn.lower(), rdn_value(dn)):
+                for key in list(self._by_dn.get(index, ())):
+                    self._discard(key)
+
+    def clear(self) -> None:
+        """Remove all cached entries."""
+        with self._lock:
+            self._entries.clear()
+            self._by_dn.clear()
+
+    def _discard(self, key: CacheKey) -> None:
+        cached = self._entries.pop(key, None)
+        if cached is None:
+            return
+        index = cached.dn.lower() if cached.dn else key[2].lower()
+        keys = self._by_dn.get(index)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_dn[index]
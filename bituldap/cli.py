@@ -0,0 +1,85 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import argparse
+import sys
+from typing import List, Optional
+
+import bituldap
+
+""" Command line interface, installed as the bituldap command.
+
+    Usage:
+        bituldap export users.ldif.gz
+        bituldap export --kind groups groups.jsonl
+        bituldap import --checkpoint users.progress users.ldif.gz
+
+    The connection is configured like the library, by a configuration file
+    or BITU_* environment variables.
+"""
+
+
+def parser() -> argparse.ArgumentParser:
+    """Build the argument parser of the command."""
+    parser = argparse.ArgumentParser(
+        prog='bituldap',
+        description='Export and import LDAP users and groups.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export = commands.add_parser(
+        'export', help='Export entries to an LDIF or JSON Lines file.')
+    export.add_argument('path', help='File ending in .ldif or .jsonl, '
+                                     'optionally followed by .gz.')
+    export.add_argument('--kind', action='append',
+                        choices=['users', 'groups'],
+                        help='Object type to export, may be repeated. '
+                             'Defaults to users and groups.')
+    export.add_argument('--attributes', nargs='+',
+                        help='Attributes to export. Defaults to all.')
+    export.add_argument('--page-size', type=int, default=500)
+
+    load = commands.add_parser(
+        'import', help='Import entries from an LDIF or JSON Lines file.')
+    load.add_argument('path', help='File ending in .ldif or .jsonl, '
+                                   'optionally followed by .gz.')
+    load.add_argument('--checkpoint',
+                      help='Progress file, to resume an interrupted import.')
+    load.add_argument('--batch-size', type=int, default=1000)
+    load.add_argument('--workers', type=int, default=0,
+                      help='Concurrent adds. Defaults to half the pool size.')
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the command.
+
+    Args:
+        argv (List[str], optional): Arguments. Defaults to sys.argv.
+
+    Returns:
+        int: Exit status, 1 if any entry failed to import.
+    """
+    args = parser().parse_args(argv)
+    try:
+        if args.command == 'export':
+            count = bituldap.export_entries(
+                args.path, args.kind or ['users', 'groups'],
+                args.attributes, args.page_size)
+            print(f'Exported {count} entries to {args.path}')
+            return 0
+
+        result = bituldap.import_entries(args.path, args.checkpoint,
+                                         args.batch_size, args.workers)
+    except ValueError as e:
+        print(f'bituldap: {e}', file=sys.stderr)
+        return 2
+    finally:
+        bituldap.close_connections()
+
+    for failure in result.failures:
+        print(f'{failure.dn}: {failure.error}', file=sys.stderr)
+    print(f'Added {result.added}, existing {result.existing}, '
+          f'failed {len(result.failures)}')
+    return 1 if result.failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,7 +4,7 @@ from os import environ
 from pathlib import Path
 from typing import List, Union, Tuple
 
-from ldap3 import Server
+from ldap3 import HASHED_SALTED_SHA, Server
 from ldap3.utils.uri import parse_uri  # type: ignore
 
 from .types import Configuration, LdapQueryOptions
@@ -27,32 +27,31 @@ def list_from_environ(key: str, default: List[str]) -> List[str]:
     return default
 
 
-def uri_to_servers(uri: str, connect_timeout=5) -> List[Server]:
+def uri_to_servers(uri: Union[str, List[str]],
+                   connect_timeout=5) -> List[Server]:
     """Convert a URI string to Server objects.
 
     Args:
-        uri (str): LDAP URI, or multiple separated by space
+        uri (str): LDAP URI, or multiple separated by space, or a list
+            of URIs.
+        connect_timeout (int): Seconds to wait for a connection to each
+            server.
 
     Returns:
         List[Server]: List of server objects.
     """
     servers: List[Server] = []
     if isinstance(uri, str):
-        values = parse_uri(uri)
-        servers = [Server(
-                    host=values["host"],
-                    port=values["port"],
-                    use_ssl=values["ssl"],
-                    connect_timeout=connect_timeout
-                   )]
-
-    elif isinstance(uri, list):
+        uri = uri.split()
+
+    if isinstance(uri, list):
         for item in uri:
             values = parse_uri(item)
             servers.append(Server(
                             host=values["host"],
                             port=values["port"],
-                            use_ssl=values["ssl"]
+                            use_ssl=values["ssl"],
+                            connect_timeout=connect_timeout
                           ))
     return servers
 
@@ -73,6 +72,8 @@ def parse_dict(data: dict) -> Tuple[bool, Union[Configuration, None]]:
     connection_timeout = data.get("connection_timeout", 5)
     servers = uri_to_servers(data.get("uri", "ldap://localhost"),
                              connect_timeout=connection_timeout)
+    read_servers = uri_to_servers(data.get("read_uri", []),
+                                  connect_timeout=connection_timeout)
 
     if not servers:
         return False, None
@@ -96,6 +97,30 @@ def parse_dict(data: dict) -> Tuple[bool, Union[Configuration, None]]:
         read_only=data.get("readonly", False),
         users=users,
         groups=groups,
+        pool_min_size=data.get("pool_min_size", 0),
+        pool_max_size=data.get("pool_max_size", 10),
+        pool_idle_timeout=data.get("pool_idle_timeout", 300),
+        pool_timeout=data.get("pool_timeout", 30),
+        cache_size=data.get("cache_size", 0),
+        cache_user_ttl=data.get("cache_user_ttl", 60),
+        cache_group_ttl=data.get("cache_group_ttl", 60),
+        cache_negative_ttl=data.get("cache_negative_ttl", 10),
+        uid_counter_dn=data.get("uid_counter_dn", ""),
+        gid_counter_dn=data.get("gid_counter_dn", ""),
+        server_strategy=data.get("server_strategy", "fastest"),
+        server_failure_threshold=data.get("server_failure_threshold", 3),
+        server_reset_timeout=data.get("server_reset_timeout", 30),
+        read_servers=read_servers,
+        read_your_writes=data.get("read_your_writes", 0),
+        retry_attempts=data.get("retry_attempts", 3),
+        retry_backoff=data.get("retry_backoff", 0.1),
+        retry_max_backoff=data.get("retry_max_backoff", 2.0),
+        retry_deadline=data.get("retry_deadline", 30),
+        membership_index=data.get("membership_index", False),
+        membership_index_interval=data.get("membership_index_interval", 60),
+        membership_index_rebuild=data.get("membership_index_rebuild", 3600),
+        password_hash=data.get("password_hash", HASHED_SALTED_SHA),
+        slow_query_threshold=data.get("slow_query_threshold", 0),
     )
 
 
@@ -142,10 +167,16 @@ def environment() -> Configuration:
         auxiliary_classes=list_from_environ("BITU_GROUP_AUX", []),
     )
 
-    servers = uri_to_servers(environ.get("BITU_LDAP_URI", "ldap://localhost"))
+    connection_timeout = int(environ.get("BITU_CONNECTION_TIMEOUT", 5))
+    servers = uri_to_servers(
+        environ.get("BITU_LDAP_URI", "ldap://localhost"),
+        connect_timeout=connection_timeout)
+    read_servers = uri_to_servers(environ.get("BITU_LDAP_READ_URI", ""),
+                                  connect_timeout=connection_timeout)
     read_only = environ.get("BITU_LDAP_READONLY", True)
     if isinstance(read_only, str) and read_only.lower() == "false":
         read_only = False
+    membership_index = environ.get("BITU_MEMBERSHIP_INDEX", "false")
 
     configuration = Configuration(
         servers=servers,
@@ -154,6 +185,35 @@ def environment() -> Configuration:
         read_only=bool(read_only),
         users=users,
         groups=groups,
+        pool_min_size=int(environ.get("BITU_POOL_MIN_SIZE", 0)),
+        pool_max_size=int(environ.get("BITU_POOL_MAX_SIZE", 10)),
+        pool_idle_timeout=int(environ.get("BITU_POOL_IDLE_TIMEOUT", 300)),
+        pool_timeout=int(environ.get("BITU_POOL_TIMEOUT", 30)),
+        cache_size=int(environ.get("BITU_CACHE_SIZE", 0)),
+        cache_user_ttl=int(environ.get("BITU_CACHE_USER_TTL", 60)),
+        cache_group_ttl=int(environ.get("BITU_CACHE_GROUP_TTL", 60)),
+        cache_negative_ttl=int(environ.get("BITU_CACHE_NEGATIVE_TTL", 10)),
+        uid_counter_dn=environ.get("BITU_UID_COUNTER_DN", ""),
+        gid_counter_dn=environ.get("BITU_GID_COUNTER_DN", ""),
+        server_strategy=environ.get("BITU_SERVER_STRATEGY", "fastest"),
+        server_failure_threshold=int(
+            environ.get("BITU_SERVER_FAILURE_THRESHOLD", 3)),
+        server_reset_timeout=int(
+            environ.get("BITU_SERVER_RESET_TIMEOUT", 30)),
+        read_servers=read_servers,
+        read_your_writes=int(environ.get("BITU_READ_YOUR_WRITES", 0)),
+        retry_attempts=int(environ.get("BITU_RETRY_ATTEMPTS", 3)),
+        retry_backoff=float(environ.get("BITU_RETRY_BACKOFF", 0.1)),
+        retry_max_backoff=float(environ.get("BITU_RETRY_MAX_BACKOFF", 2.0)),
+        retry_deadline=int(environ.get("BITU_RETRY_DEADLINE", 30)),
+        membership_index=membership_index.lower() == "true",
+        membership_index_interval=int(
+            environ.get("BITU_MEMBERSHIP_INDEX_INTERVAL", 60)),
+        membership_index_rebuild=int(
+            environ.get("BITU_MEMBERSHIP_INDEX_REBUILD", 3600)),
+        password_hash=environ.get("BITU_PASSWORD_HASH", HASHED_SALTED_SHA),
+        slow_query_threshold=float(
+            environ.get("BITU_SLOW_QUERY_THRESHOLD", 0)),
     )
 
     return configuration
@@ -0,0 +1,168 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import copy
+import functools
+from typing import Callable, List, Optional, Tuple, Union
+
+from ldap3 import Connection, ObjectDef, Reader, Writer
+from ldap3.abstract.entry import WritableEntry
+
+from . import instrument
+
+""" Writer cursor which reports successfully committed changes, allowing
+    caches to be invalidated when entries returned by this library are
+    committed using entry_commit_changes().
+"""
+
+commit_listeners: List[Callable[[dict], None]] = []
+
+# Functions borrowing and releasing a connection for each commit, and
+# running the commit with retries, set by the library to use its
+# connection pool. Without them, entries commit using the connection they
+# were read with.
+connection_source: Optional[Tuple[
+    Callable[[], Connection],
+    Callable[[Connection], None],
+    Callable[[Connection, Callable[[], bool]], bool]]] = None
+
+
+def set_connection_source(
+        borrow: Callable[[], Connection],
+        release: Callable[[Connection], None],
+        retry: Callable[[Connection, Callable[[], bool]], bool] = (
+            lambda connection, commit: commit())) -> None:
+    """Set the functions providing connections for commits. Connections
+    are pooled and shared between threads, so an entry must not use the
+    connection it was read with once that has been handed back.
+
+    Args:
+        borrow (Callable): Function returning a bound connection.
+        release (Callable): Function handing the connection back.
+        retry (Callable, optional): Function taking the borrowed
+            connection and the commit, running the commit, e.g. again
+            on a new session if the server dropped the connection while
+            it was idle in the pool. Defaults to a single attempt.
+    """
+    global connection_source
+    connection_source = (borrow, release, retry)
+
+
+def add_commit_listener(listener: Callable[[dict], None]) -> None:
+    """Register a function to be called with the LDAP request of every
+    successful add, modify, delete or modify DN operation.
+
+    Args:
+        listener (Callable): Function taking the request dictionary.
+    """
+    if listener not in commit_listeners:
+        commit_listeners.append(listener)
+
+
+def remove_commit_listener(listener: Callable[[dict], None]) -> None:
+    """Unregister a function added with add_commit_listener().
+
+    Args:
+        listener (Callable): Previously registered function.
+    """
+    if listener in commit_listeners:
+        commit_listeners.remove(listener)
+
+
+def notify_commit(request: dict) -> None:
+    """Call all commit listeners for a successful operation.
+
+    Args:
+        request (dict): LDAP request, containing at least "entry", the DN
+            of the changed entry, and "type".
+    """
+    for listener in list(commit_listeners):
+        listener(request)
+
+
+class CommitEntry(WritableEntry):
+    """ldap3 WritableEntry, committing changes using a connection borrowed
+    for the commit, and reporting commits as "commit" operations to the
+    operation listeners."""
+
+    def entry_commit_changes(self, refresh=True, controls=None,
+                             clear_history=True):
+        if connection_source is None:
+            with instrument.timed('commit',
+                                  self.entry_cursor.connection) as event:
+                event.success = super().entry_commit_changes(
+                    refresh, controls, clear_history)
+            return event.success
+
+        borrow, release, retry = connection_source
+        cursor = self.entry_cursor
+        connection = borrow()
+        # The cursor is shared by all entries of a search, so the
+        # connection is swapped on a copy used by this entry only.
+        self._state.cursor = copy.copy(cursor)
+        self._state.cursor.connection = connection
+        try:
+            commit = functools.partial(super().entry_commit_changes,
+                                       refresh, controls, clear_history)
+            with instrument.timed('commit', connection) as event:
+                event.success = retry(connection, commit)
+        finally:
+            self._state.cursor = cursor
+            release(connection)
+        return event.success
+
+
+class CommitWriter(Writer):
+    """ldap3 Writer cursor, notifying commit listeners of changes."""
+    entry_class = CommitEntry
+
+    def _store_operation_in_history(self, request, result, response):
+        super()._store_operation_in_history(request, result, response)
+        if request and result and result.get('result') == 0:
+            notify_commit(request)
+
+
+def writer_from_reader(reader: Reader) -> CommitWriter:
+    """Convert a Reader cursor to a CommitWriter, like
+    ldap3.Writer.from_cursor().
+
+    Args:
+        reader (Reader): Cursor of a completed search.
+
+    Returns:
+        CommitWriter: Writer containing writable copies of the entries.
+    """
+    writer = CommitWriter(reader.connection, reader.definition,
+                          attributes=reader.attributes)
+    for entry in reader.entries:
+        entry.entry_writable(reader.definition, writer)
+    writer.execution_time = reader.execution_time
+    return writer
+
+
+def cursor_from_responses(connection: Connection,
+                          object_def: ObjectDef,
+                          base: str,
+                          responses: List[dict]
+                          ) -> Union[Reader, CommitWriter]:
+    """Build entries from search responses, without querying the server.
+    A CommitWriter is returned for read/write connections, else a Reader.
+
+    Args:
+        connection (Connection): LDAP connection the entries will use.
+        object_def (ObjectDef): Object representation of the LDAP object
+            classes.
+        base (str): Search base of the cursor.
+        responses (List[dict]): Search result entries.
+
+    Returns:
+        Union[Reader, CommitWriter]: Cursor containing the entries.
+    """
+    cursor: Union[Reader, CommitWriter]
+    if connection.read_only:
+        cursor = Reader(connection, object_def, base)
+    else:
+        cursor = CommitWriter(connection, object_def)
+    for response in responses:
+        entry = cursor._create_entry(response)  # type: ignore[union-attr]
+        if entry is not None:
+            cursor.entries.append(entry)
+    return cursor
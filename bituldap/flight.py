@@ -0,0 +1,82 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import threading
+from typing import (Any, Callable, Dict, Hashable, Optional, Tuple, Type,
+                    Union)
+
+""" Coalescing of concurrent identical requests, also known as
+    single-flight. The first caller for a key runs the request, callers
+    arriving while it is in flight wait for it to finish, and receive the
+    same result, or exception. Exceptions particular to the first caller,
+    e.g. exceeding its budget, can be kept from the others, which then run
+    the request themselves.
+
+    Results are not kept after the request completes, so this does not
+    serve stale data, it only removes duplicate work during bursts.
+"""
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Thread-safe coalescing of calls sharing a key."""
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def do(self, key: Hashable, function: Callable[[], Any],
+           unshared: Union[Type[BaseException],
+                           Tuple[Type[BaseException], ...]] = ()
+           ) -> Tuple[Any, bool]:
+        """Call function, unless a call with the same key is already in
+        flight, in which case wait for its result instead.
+
+        Args:
+            key (Hashable): Identity of the request.
+            function (Callable[[], Any]): Function performing the request.
+            unshared (Union[Type, Tuple], optional): Exceptions raised only
+                in the caller running the function. Callers waiting for it
+                call the function themselves instead.
+
+        Raises:
+            Exception: Any exception raised by the function, also in
+                callers sharing the result, unless listed in unshared.
+
+        Returns:
+            Any: Return value of the function.
+            bool: The result was shared with another caller, and must not
+                be modified.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if isinstance(call.error, unshared):
+                return function(), False
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
@@ -0,0 +1,216 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+""" In-memory index of group membership, allowing member_of() and
+    membership checks to be answered without querying the server.
+
+    The index is built from one scan of the groups subtree, and kept up
+    to date by polling for groups with a newer modifyTimestamp than the
+    newest seen so far. Polling does not reveal deleted groups, so the
+    index is rebuilt from scratch at a longer interval.
+"""
+
+# Attributes holding the DNs of group members.
+MEMBER_DN_ATTRIBUTES = ('member', 'uniquemember')
+
+
+def split_response(response: dict) -> Tuple[List[str], dict, str]:
+    """Separate the member DNs from the search response of a group.
+
+    Args:
+        response (dict): Search result entry of a group.
+
+    Returns:
+        List[str]: Member DNs.
+        dict: Copy of the response, without member attributes.
+        str: Modification timestamp of the group, or an empty string.
+    """
+    members: List[str] = []
+    stripped = dict(response)
+    timestamp = ''
+    for key in ('attributes', 'raw_attributes'):
+        values = {}
+        for name, value in response.get(key, {}).items():
+            if name.lower() in MEMBER_DN_ATTRIBUTES:
+                if key == 'attributes':
+                    members.extend(str(member) for member in value)
+                continue
+            if key == 'raw_attributes' and name.lower() == 'modifytimestamp':
+                raw = value[0] if value else b''
+                timestamp = raw.decode() if isinstance(raw, bytes) else raw
+            values[name] = value
+        stripped[key] = values
+    return members, stripped, timestamp
+
+
+class MembershipIndex:
+    """Thread-safe index of group members, and the groups of members.
+    DNs are compared ignoring case.
+    """
+
+    def __init__(self) -> None:
+        self.high_water = ''
+        self.loaded_at = 0.0
+        self.polled_at = 0.0
+        self.refresh_lock = threading.Lock()
+        self._groups: Dict[str, dict] = {}
+        self._members: Dict[str, Dict[str, str]] = {}
+        self._member_of: Dict[str, Set[str]] = {}
+        self._dirty: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at > 0
+
+    @property
+    def pending(self) -> bool:
+        """Groups have been marked as changed since the last refresh."""
+        return bool(self._dirty)
+
+    def load(self, responses: Iterable[dict]) -> None:
+        """Replace the contents of the index.
+
+        Args:
+            responses (Iterable[dict]): Search result entries of all
+                groups.
+        """
+        with self._lock:
+            self._groups.clear()
+            self._members.clear()
+            self._member_of.clear()
+            self.high_water = ''
+            for response in responses:
+                self._store(response)
+            self.loaded_at = self.polled_at = time.monotonic()
+
+    def update(self, responses: Iterable[dict]) -> None:
+        """Add or replace groups found by a poll for changed groups,
+        advancing the high water mark and poll time.
+
+        Args:
+            responses (Iterable[dict]): Search result entries of changed
+                groups.
+        """
+        with self._lock:
+            for response in responses:
+                self._store(response)
+            self.polled_at = time.monotonic()
+
+    def replace(self, responses: Iterable[dict]) -> None:
+        """Add or replace groups read again after being marked as changed.
+        The high water mark and poll time are left as they are, as other
+        groups may have changed earlier without having been polled yet.
+
+        Args:
+            responses (Iterable[dict]): Search result entries of changed
+                groups.
+        """
+        with self._lock:
+            for response in responses:
+                self._store(response, advance=False)
+
+    def remove(self, dn: str) -> None:
+        """Remove a deleted group from the index.
+
+        Args:
+            dn (str): Distinguished Name of the group.
+        """
+        with self._lock:
+            self._discard(dn.lower())
+
+    def mark(self, dn: str) -> None:
+        """Mark a group as changed, to be read again on the next refresh.
+
+        Args:
+            dn (str): Distinguished Name of the group.
+        """
+        with self._lock:
+            self._dirty.add(dn)
+
+    def take_dirty(self) -> List[str]:
+        """Get and clear the groups marked as changed.
+
+        Returns:
+            List[str]: Distinguished Names of changed groups.
+        """
+        with self._lock:
+            dirty, self._dirty = list(self._dirty), set()
+            return dirty
+
+    def get(self, group_dn: str) -> Optional[dict]:
+        """Get the search response of a group, without members.
+
+        Args:
+            group_dn (str): Distinguished Name of the group.
+
+        Returns:
+            Optional[dict]: Search response, None if not indexed.
+        """
+        with self._lock:
+            return self._groups.get(group_dn.lower())
+
+    def groups_of(self, dn: str) -> List[dict]:
+        """Get the groups a DN is a direct member of.
+
+        Args:
+            dn (str): Distinguished Name of a group member.
+
+        Returns:
+            List[dict]: Search responses of the groups, without members.
+                The responses are shared, and must not be modified.
+        """
+        with self._lock:
+            return [self._groups[group]
+                    for group in self._member_of.get(dn.lower(), ())]
+
+    def members(self, group_dn: str) -> List[str]:
+        """Get the member DNs of a group.
+
+        Args:
+            group_dn (str): Distinguished Name of the group.
+
+        Returns:
+            List[str]: Distinguished Names of the members.
+        """
+        with self._lock:
+            return list(self._members.get(group_dn.lower(), {}).values())
+
+    def is_member(self, dn: str, group_dn: str) -> bool:
+        """Check whether a DN is a direct member of a group.
+
+        Args:
+            dn (str): Distinguished Name of a possible member.
+            group_dn (str): Distinguished Name of the group.
+
+        Returns:
+            bool: dn is a member of the group.
+        """
+        with self._lock:
+            return dn.lower() in self._members.get(group_dn.lower(), {})
+
+    def _store(self, response: dict, advance: bool = True) -> None:
+        members, stripped, timestamp = split_response(response)
+        group = response['dn'].lower()
+        self._discard(group)
+        self._groups[group] = stripped
+        self._members[group] = {member.lower(): member
+                                for member in members}
+        for member in self._members[group]:
+            self._member_of.setdefault(member, set()).add(group)
+        if advance and timestamp > self.high_water:
+            self.high_water = timestamp
+
+    def _discard(self, group: str) -> None:
+        self._groups.pop(group, None)
+        for member in self._members.pop(group, {}):
+            groups = self._member_of.get(member)
+            if groups is not None:
+                groups.discard(group)
+                if not groups:
+                    del self._member_of[member]
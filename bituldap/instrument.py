@@ -0,0 +1,445 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import bisect
+import contextvars
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import (Callable, Dict, Iterable, Iterator, List, Optional,
+                    Tuple, TypeVar)
+
+from ldap3 import Connection
+
+""" Instrumentation of LDAP operations. Every instrumented operation is
+    reported to the registered operation listeners as an Event, holding
+    the operation name, server, search filter, number of entries returned
+    and latency.
+
+    Operations are either single LDAP requests, e.g. "bind", "search" or
+    "modify", or calls of library functions, e.g. "get_single_object",
+    which may make several requests.
+
+    Trackers, entered using track(), count the requests made within a
+    block, on the same thread or asyncio task, and enforce a budget.
+"""
+
+# Content type of the Prometheus text exposition format.
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Assertion values of filter components, e.g. "=jdoe)" in "(uid=jdoe)".
+FILTER_VALUE = re.compile(r'(~=|>=|<=|:=|=)[^()]*\)')
+
+# Identical filter components repeated, e.g. the terms of an OR filter.
+REPEATED_COMPONENT = re.compile(r'(\([^()]*\))\1+')
+
+# Tracker counter of each LDAP request operation.
+REQUEST_COUNTERS = {
+    'bind': 'binds',
+    'search': 'searches',
+    'add': 'modifies',
+    'modify': 'modifies',
+    'delete': 'modifies',
+    'modify_dn': 'modifies',
+    'commit': 'modifies',
+}
+
+T = TypeVar('T')
+
+
+@dataclass
+class Event:
+    """Data class for a completed operation, passed to operation
+    listeners. The search filter is the filter sent to the server, which
+    may contain personal data, filter_shape omits the values.
+    """
+    operation: str
+    server: str = ''
+    search_filter: str = ''
+    entries: int = 0
+    latency: float = 0.0
+    success: bool = True
+    error: str = ''
+
+    @property
+    def filter_shape(self) -> str:
+        """Search filter with the assertion values replaced by "*"."""
+        return shape_filter(self.search_filter)
+
+
+operation_listeners: List[Callable[[Event], None]] = []
+
+
+def add_operation_listener(listener: Callable[[Event], None]) -> None:
+    """Register a function to be called with an Event after every
+    instrumented operation. Listeners are called on the thread running
+    the operation, and should return quickly.
+
+    Args:
+        listener (Callable): Function taking the Event.
+    """
+    if listener not in operation_listeners:
+        operation_listeners.append(listener)
+
+
+def remove_operation_listener(listener: Callable[[Event], None]) -> None:
+    """Unregister a function added with add_operation_listener().
+
+    Args:
+        listener (Callable): Previously registered function.
+    """
+    if listener in operation_listeners:
+        operation_listeners.remove(listener)
+
+
+def emit(event: Event) -> None:
+    """Call all operation listeners for a completed operation.
+
+    Args:
+        event (Event): The completed operation.
+    """
+    for listener in list(operation_listeners):
+        listener(event)
+    for tracker in active_trackers.get():
+        tracker.record(event)
+
+
+def server_name(connection: Optional[Connection]) -> str:
+    """Get the name of the server used by a connection, e.g.
+    "ldap://ldap.example.org:389".
+
+    Args:
+        connection (Connection, optional): LDAP connection.
+
+    Returns:
+        str: Server name, or an empty string without a connection.
+    """
+    if connection is None or connection.server is None:
+        return ''
+    return str(connection.server.name)
+
+
+def shape_filter(search_filter: str) -> str:
+    """Replace the assertion values of an LDAP filter by "*", and
+    collapse repeated components, so filters differing only by values
+    have the same shape, e.g. "(|(uid=a)(uid=b))" becomes "(|(uid=*))".
+
+    Args:
+        search_filter (str): LDAP filter.
+
+    Returns:
+        str: Shape of the filter.
+    """
+    shape = FILTER_VALUE.sub(r'\1*)', search_filter)
+    return REPEATED_COMPONENT.sub(r'\1', shape)
+
+
+def count_entries(responses: Optional[List[dict]]) -> int:
+    """Count the entries in search responses, leaving out referrals.
+
+    Args:
+        responses (List[dict], optional): Search responses.
+
+    Returns:
+        int: Number of entries.
+    """
+    return sum(1 for response in responses or ()
+               if response.get('type') == 'searchResEntry')
+
+
+@contextmanager
+def timed(operation: str, connection: Optional[Connection] = None,
+          search_filter: str = '') -> Iterator[Event]:
+    """Time an operation, and report it to the operation listeners when
+    the block exits. The event is yielded, so the block can set the
+    number of entries, the outcome or the filter, once known. Exceptions
+    mark the operation as failed, and are raised again.
+
+    LDAP requests are admitted by the active trackers before the block
+    runs, so a request exceeding a strict budget is never sent.
+
+    Args:
+        operation (str): Operation name, e.g. "search".
+        connection (Connection, optional): Connection used, identifying
+            the server.
+        search_filter (str, optional): LDAP filter of a search.
+
+    Raises:
+        BudgetExceeded: The request would exceed the budget of a strict
+            tracker. The block is not run.
+
+    Yields:
+        Event: The operation, reported when the block exits.
+    """
+    for tracker in active_trackers.get():
+        tracker.admit(operation)
+    event = Event(operation, server_name(connection), search_filter)
+    started = time.perf_counter()
+    try:
+        yield event
+    except Exception as e:
+        event.success = False
+        event.error = type(e).__name__
+        raise
+    finally:
+        event.latency = time.perf_counter() - started
+        emit(event)
+
+
+def timed_iteration(operation: str, items: Iterable[T],
+                    connection: Optional[Connection] = None,
+                    search_filter: str = '') -> Iterator[T]:
+    """Report an iteration, e.g. over the results of a paged search, as
+    a single operation once it is exhausted or closed, with the number of
+    items as entries. The latency includes time spent by the consumer.
+
+    Args:
+        operation (str): Operation name, e.g. "search".
+        items (Iterable[T]): Items, e.g. a paged search generator.
+        connection (Connection, optional): Connection used, identifying
+            the server.
+        search_filter (str, optional): LDAP filter of a search.
+
+    Yields:
+        T: The items.
+    """
+    with timed(operation, connection, search_filter) as event:
+        for item in items:
+            event.entries += 1
+            yield item
+
+
+class BudgetExceeded(Exception):
+    """Raised when a tracked block makes more LDAP requests, or reads more
+    entries, than its budget allows. Requests are refused before being
+    sent. Functions running requests in worker threads finish the work
+    they can, and attach their partial outcome as result, e.g. a list of
+    BulkResult.
+    """
+
+    def __init__(self, message: str, result: object = None) -> None:
+        super().__init__(message)
+        self.result = result
+
+
+class Tracker:
+    """Counts of the LDAP requests made, and entries returned, within a
+    track() block. Writes, i.e. adds, modifies, deletes, renames and
+    commits, are counted as modifies.
+
+    Args:
+        budget (Dict[str, Optional[int]]): Maximum binds, searches,
+            modifies and entries, None for no limit.
+        strict (bool): Raise BudgetExceeded instead of sending a request
+            exceeding the budget, else only count.
+    """
+
+    def __init__(self, budget: Dict[str, Optional[int]],
+                 strict: bool = True) -> None:
+        self.budget = budget
+        self.strict = strict
+        self.binds = 0
+        self.searches = 0
+        self.modifies = 0
+        self.entries = 0
+        self.operations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._tokens: List[contextvars.Token] = []
+
+    def __enter__(self) -> 'Tracker':
+        self._tokens.append(
+            active_trackers.set(active_trackers.get() + (self,)))
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        active_trackers.reset(self._tokens.pop())
+
+    def __repr__(self) -> str:
+        return (f'Tracker(binds={self.binds}, searches={self.searches}, '
+                f'modifies={self.modifies}, entries={self.entries})')
+
+    def counts(self) -> Dict[str, int]:
+        """Get the counts.
+
+        Returns:
+            Dict[str, int]: Number of binds, searches, modifies and
+                entries.
+        """
+        return {'binds': self.binds, 'searches': self.searches,
+                'modifies': self.modifies, 'entries': self.entries}
+
+    @property
+    def exceeded(self) -> List[str]:
+        """Names of the counts exceeding the budget."""
+        counts = self.counts()
+        return [name for name, limit in self.budget.items()
+                if limit is not None and counts[name] > limit]
+
+    def admit(self, operation: str) -> None:
+        """Count an LDAP request about to be sent. This is called before
+        every operation started while the tracker is active.
+
+        Args:
+            operation (str): Operation name, e.g. "modify".
+
+        Raises:
+            BudgetExceeded: The request would exceed the budget of a
+                strict tracker. It is not counted, and must not be sent.
+        """
+        counter = REQUEST_COUNTERS.get(operation)
+        if counter is None:
+            return
+        with self._lock:
+            count = getattr(self, counter) + 1
+            limit = self.budget.get(counter)
+            if self.strict and limit is not None and count > limit:
+                raise self.exceeded_error(operation, [counter])
+            setattr(self, counter, count)
+
+    def record(self, event: Event) -> None:
+        """Count a completed operation, and the entries returned by a
+        search. This is called for every event emitted while the tracker
+        is active.
+
+        Args:
+            event (Event): The completed operation.
+
+        Raises:
+            BudgetExceeded: A search returned more entries than the
+                budget of a strict tracker allows.
+        """
+        with self._lock:
+            self.operations[event.operation] = \
+                self.operations.get(event.operation, 0) + 1
+            if event.operation != 'search':
+                return
+            self.entries += event.entries
+            limit = self.budget.get('entries')
+            exceeded = (self.strict and limit is not None
+                        and self.entries > limit)
+        if exceeded:
+            raise self.exceeded_error(event.operation, ['entries'])
+
+    def exceeded_error(self, operation: str,
+                       exceeded: List[str]) -> BudgetExceeded:
+        return BudgetExceeded(
+            f'LDAP budget exceeded by {operation}: {self!r}, '
+            'budget ' + ', '.join(f'{name}={self.budget[name]}'
+                                  for name in exceeded))
+
+
+active_trackers: contextvars.ContextVar[Tuple[Tracker, ...]] = \
+    contextvars.ContextVar('bituldap_trackers', default=())
+
+
+def escape_label(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return (value.replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+class MetricsCollector:
+    """Operation listener aggregating operations into counters and
+    latency histograms, per operation and server, which can be rendered
+    in the Prometheus text exposition format, e.g. for a metrics view.
+
+    Args:
+        buckets (Tuple[float, ...], optional): Upper bounds, in seconds,
+            of the latency histogram buckets.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._operations: Dict[Tuple[str, str, str], int] = {}
+        self._entries: Dict[Tuple[str, str], int] = {}
+        self._histograms: Dict[Tuple[str, str], List[float]] = {}
+
+    def __call__(self, event: Event) -> None:
+        key = (event.operation, event.server)
+        result = 'success' if event.success else 'failure'
+        position = bisect.bisect_left(self.buckets, event.latency)
+        with self._lock:
+            counter = key + (result,)
+            self._operations[counter] = self._operations.get(counter, 0) + 1
+            self._entries[key] = self._entries.get(key, 0) + event.entries
+            # Bucket counts, followed by the sum of the latencies.
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = \
+                    [0.0] * (len(self.buckets) + 2)
+            histogram[position] += 1
+            histogram[-1] += event.latency
+
+    def reset(self) -> None:
+        """Clear all counters and histograms."""
+        with self._lock:
+            self._operations.clear()
+            self._entries.clear()
+            self._histograms.clear()
+
+    def counts(self) -> Dict[str, int]:
+        """Get the number of operations of each name, on all servers.
+
+        Returns:
+            Dict[str, int]: Number of operations keyed on operation name.
+        """
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for (operation, _, _), count in self._operations.items():
+                counts[operation] = counts.get(operation, 0) + count
+        return counts
+
+    def render(self) -> str:
+        """Render the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics, served with the content type CONTENT_TYPE.
+        """
+        with self._lock:
+            operations = sorted(self._operations.items())
+            entries = sorted(self._entries.items())
+            histograms = sorted((key, list(values)) for key, values
+                                in self._histograms.items())
+
+        def labels(operation: str, server: str, *extra: str) -> str:
+            pairs = [f'operation="{escape_label(operation)}"',
+                     f'server="{escape_label(server)}"', *extra]
+            return '{' + ','.join(pairs) + '}'
+
+        lines = ['# HELP bituldap_operations_total LDAP operations.',
+                 '# TYPE bituldap_operations_total counter']
+        for (operation, server, result), count in operations:
+            outcome = f'result="{result}"'
+            lines.append('bituldap_operations_total'
+                         f'{labels(operation, server, outcome)} {count}')
+
+        lines += ['# HELP bituldap_entries_total Entries returned by '
+                  'LDAP operations.',
+                  '# TYPE bituldap_entries_total counter']
+        for (operation, server), count in entries:
+            lines.append('bituldap_entries_total'
+                         f'{labels(operation, server)} {count}')
+
+        lines += ['# HELP bituldap_operation_seconds Latency of LDAP '
+                  'operations.',
+                  '# TYPE bituldap_operation_seconds histogram']
+        for (operation, server), values in histograms:
+            cumulative = 0.0
+            bounds = [repr(bound) for bound in self.buckets]
+            for bound, observed in zip(bounds + ['+Inf'], values[:-1]):
+                cumulative += observed
+                le = f'le="{bound}"'
+                lines.append('bituldap_operation_seconds_bucket'
+                             f'{labels(operation, server, le)} '
+                             f'{int(cumulative)}')
+            lines.append('bituldap_operation_seconds_sum'
+                         f'{labels(operation, server)} {values[-1]!r}')
+            lines.append('bituldap_operation_seconds_count'
+                         f'{labels(operation, server)} '
+                         f'{int(cumulative)}')
+        return '\n'.join(lines) + '\n'
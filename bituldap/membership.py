@@ -0,0 +1,45 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+from typing import Dict, List, Optional
+
+from ldap3 import Entry
+
+
+class MembershipMemo:
+    """Memo table of nested group lookups, shared by the calls made while
+    handling a single request, e.g. computing effective permissions.
+
+    Memoised lookups are never refreshed, so a memo should not outlive
+    the request. The memo is not thread-safe, and should be used with the
+    same requested attributes for every call.
+
+    Attributes:
+        groups (Dict[str, Entry]): Group entries, keyed on lower case DN.
+        member_of (Dict[str, List[str]]): Lower case DNs of all groups an
+            object is a member of, directly or through nested groups.
+        members (Dict[str, Optional[List[str]]]): Direct member DNs of a
+            group, or None if the DN is not a group.
+    """
+
+    def __init__(self) -> None:
+        self.groups: Dict[str, Entry] = {}
+        self.member_of: Dict[str, List[str]] = {}
+        self.members: Dict[str, Optional[List[str]]] = {}
+
+    def clear(self) -> None:
+        """Forget all memoised lookups."""
+        self.groups.clear()
+        self.member_of.clear()
+        self.members.clear()
+
+
+def is_descendant(dn: str, base: str) -> bool:
+    """Check whether a DN is below a base DN, ignoring case.
+
+    Args:
+        dn (str): Distinguished Name.
+        base (str): Distinguished Name of the subtree.
+
+    Returns:
+        bool: dn is in the subtree of base, and is not base itself.
+    """
+    return dn.lower().endswith(',' + base.lower())
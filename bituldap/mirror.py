@@ -0,0 +1,368 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import base64
+import datetime
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+
+from .index import split_response
+
+""" Local mirror of users and groups in a SQLite file, for reporting and
+    bulk jobs querying the directory offline, without network round trips.
+
+    The mirror is filled by an initial paged dump of the users and groups
+    subtrees, and kept up to date by reading the entries with a newer
+    modifyTimestamp than the newest already mirrored. Polling does not
+    reveal deleted entries, so the mirrored DNs are reconciled against the
+    server at a longer interval. See bituldap.sync_mirror().
+
+    Entries are returned as dicts in the shape of search responses, with
+    "dn" and "attributes" keys. Binary values are base64 encoded, and
+    other values not representable in JSON are stored as strings.
+"""
+
+# Kinds of mirrored entries.
+USERS = 'users'
+GROUPS = 'groups'
+
+# Attribute naming the entries of each kind, as used by get_user() and
+# get_group().
+NAME_ATTRIBUTES = {USERS: 'uid', GROUPS: 'cn'}
+
+# Attributes holding password hashes or keys, not mirrored unless
+# requested, so they do not end up in a local file.
+SECRET_ATTRIBUTES = frozenset(('userpassword', 'authpassword',
+                               'sambantpassword', 'sambalmpassword',
+                               'krbprincipalkey'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    dn_key TEXT PRIMARY KEY,
+    dn TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT,
+    attributes TEXT NOT NULL,
+    modified TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS entries_name ON entries (kind, name);
+CREATE TABLE IF NOT EXISTS members (
+    group_key TEXT NOT NULL,
+    member_key TEXT NOT NULL,
+    member TEXT NOT NULL,
+    PRIMARY KEY (group_key, member_key)
+);
+CREATE INDEX IF NOT EXISTS members_member ON members (member_key);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def json_value(value: object) -> str:
+    """Convert an attribute value JSON can not represent to a string.
+
+    Args:
+        value (object): Attribute value.
+
+    Returns:
+        str: base64 encoding of bytes, ISO 8601 for timestamps, or the
+            string representation of other values.
+    """
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+def entry_name(kind: str, attributes: dict) -> Optional[str]:
+    """Get the lower case name of an entry, e.g. the uid of a user.
+
+    Args:
+        kind (str): USERS or GROUPS.
+        attributes (dict): Attributes of the entry.
+
+    Returns:
+        Optional[str]: Name, None if the entry has no name attribute.
+    """
+    wanted = NAME_ATTRIBUTES[kind]
+    for name, value in attributes.items():
+        if name.lower() != wanted:
+            continue
+        if isinstance(value, list):
+            value = value[0] if value else None
+        return None if value is None else str(value).lower()
+    return None
+
+
+class Mirror:
+    """Thread-safe SQLite mirror of users and groups. DNs and names are
+    compared ignoring case.
+
+    Args:
+        path (Union[str, Path]): SQLite database file, created if
+            missing. Use ":memory:" for a mirror lasting only as long as
+            the object.
+        include_secrets (bool, optional): Mirror password hashes and
+            other SECRET_ATTRIBUTES. Defaults to False.
+    """
+    USERS = USERS
+    GROUPS = GROUPS
+
+    def __init__(self, path: Union[str, Path],
+                 include_secrets: bool = False) -> None:
+        self.path = path
+        self.include_secrets = include_secrets
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        with self._lock, self._db:
+            self._db.executescript(SCHEMA)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute(
+                'SELECT count(*) FROM entries').fetchone()[0]
+
+    def close(self) -> None:
+        """Close the database file."""
+        with self._lock:
+            self._db.close()
+
+    def load(self, kind: str, responses: Iterable[dict]) -> int:
+        """Replace all mirrored entries of a kind. Nothing is replaced if
+        reading the responses fails.
+
+        Args:
+            kind (str): USERS or GROUPS.
+            responses (Iterable[dict]): Search result entries, which may
+                be a generator of a paged search.
+
+        Returns:
+            int: Number of entries stored.
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                'DELETE FROM members WHERE group_key IN '
+                '(SELECT dn_key FROM entries WHERE kind = ?)', (kind,))
+            self._db.execute('DELETE FROM entries WHERE kind = ?', (kind,))
+            count = self._store(kind, responses)
+            self._set_state(f'{kind}_reconciled', str(time.time()))
+            return count
+
+    def update(self, kind: str, responses: Iterable[dict]) -> int:
+        """Add or replace mirrored entries.
+
+        Args:
+            kind (str): USERS or GROUPS.
+            responses (Iterable[dict]): Search result entries of changed
+                entries.
+
+        Returns:
+            int: Number of entries stored.
+        """
+        with self._lock, self._db:
+            return self._store(kind, responses)
+
+    def reconcile(self, kind: str, dns: Iterable[str]) -> int:
+        """Remove the mirrored entries of a kind no longer on the server.
+
+        Args:
+            kind (str): USERS or GROUPS.
+            dns (Iterable[str]): Distinguished Names of all entries of the
+                kind on the server.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                'CREATE TEMP TABLE IF NOT EXISTS present '
+                '(dn_key TEXT PRIMARY KEY)')
+            self._db.execute('DELETE FROM present')
+            self._db.executemany(
+                'INSERT OR IGNORE INTO present VALUES (?)',
+                ((dn.lower(),) for dn in dns))
+            gone = [row[0] for row in self._db.execute(
+                'SELECT dn_key FROM entries WHERE kind = ? AND dn_key NOT IN '
+                '(SELECT dn_key FROM present)', (kind,))]
+            for dn_key in gone:
+                self._discard(dn_key)
+            self._db.execute('DELETE FROM present')
+            self._set_state(f'{kind}_reconciled', str(time.time()))
+            return len(gone)
+
+    def remove(self, dn: str) -> None:
+        """Remove a deleted entry from the mirror.
+
+        Args:
+            dn (str): Distinguished Name of the entry.
+        """
+        with self._lock, self._db:
+            self._discard(dn.lower())
+
+    def high_water(self, kind: str) -> str:
+        """Get the newest modification timestamp of the mirrored entries.
+
+        Args:
+            kind (str): USERS or GROUPS.
+
+        Returns:
+            str: Generalized time, or an empty string if no entry has a
+                timestamp.
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT max(modified) FROM entries WHERE kind = ?',
+                (kind,)).fetchone()
+        return row[0] or ''
+
+    def reconciled_at(self, kind: str) -> float:
+        """Get the time the entries of a kind were last loaded or
+        reconciled.
+
+        Args:
+            kind (str): USERS or GROUPS.
+
+        Returns:
+            float: time.time() of the last reconciliation, 0 if never.
+        """
+        with self._lock:
+            row = self._db.execute('SELECT value FROM state WHERE key = ?',
+                                   (f'{kind}_reconciled',)).fetchone()
+        return float(row[0]) if row else 0.0
+
+    def get(self, dn: str) -> Optional[dict]:
+        """Get a mirrored entry.
+
+        Args:
+            dn (str): Distinguished Name of the entry.
+
+        Returns:
+            Optional[dict]: Entry, None if not mirrored.
+        """
+        rows = self._entries('dn_key = ?', (dn.lower(),))
+        return rows[0] if rows else None
+
+    def get_user(self, uid: str) -> Optional[dict]:
+        """Get a mirrored user.
+
+        Args:
+            uid (str): User ID.
+
+        Returns:
+            Optional[dict]: User entry, None if not mirrored.
+        """
+        rows = self._entries('kind = ? AND name = ?', (USERS, uid.lower()))
+        return rows[0] if rows else None
+
+    def get_group(self, cn: str) -> Optional[dict]:
+        """Get a mirrored group, without members.
+
+        Args:
+            cn (str): Common name of the group.
+
+        Returns:
+            Optional[dict]: Group entry, None if not mirrored.
+        """
+        rows = self._entries('kind = ? AND name = ?', (GROUPS, cn.lower()))
+        return rows[0] if rows else None
+
+    def list_users(self) -> List[dict]:
+        """List all mirrored users.
+
+        Returns:
+            List[dict]: User entries, ordered by uid.
+        """
+        return self._entries('kind = ?', (USERS,))
+
+    def list_groups(self) -> List[dict]:
+        """List all mirrored groups, without members.
+
+        Returns:
+            List[dict]: Group entries, ordered by common name.
+        """
+        return self._entries('kind = ?', (GROUPS,))
+
+    def member_of(self, dn: str) -> List[dict]:
+        """Get the groups a DN is a direct member of.
+
+        Args:
+            dn (str): Distinguished Name of a group member/user.
+
+        Returns:
+            List[dict]: Group entries, without members.
+        """
+        return self._entries(
+            'dn_key IN (SELECT group_key FROM members WHERE member_key = ?)',
+            (dn.lower(),))
+
+    def members(self, group_dn: str) -> List[str]:
+        """Get the member DNs of a group.
+
+        Args:
+            group_dn (str): Distinguished Name of the group.
+
+        Returns:
+            List[str]: Distinguished Names of the members.
+        """
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                'SELECT member FROM members WHERE group_key = ? '
+                'ORDER BY member_key', (group_dn.lower(),))]
+
+    def is_member(self, dn: str, group_dn: str) -> bool:
+        """Check whether a DN is a direct member of a group.
+
+        Args:
+            dn (str): Distinguished Name of a possible member.
+            group_dn (str): Distinguished Name of the group.
+
+        Returns:
+            bool: dn is a member of the group.
+        """
+        with self._lock:
+            return self._db.execute(
+                'SELECT 1 FROM members WHERE group_key = ? AND '
+                'member_key = ?', (group_dn.lower(), dn.lower())
+            ).fetchone() is not None
+
+    def _entries(self, where: str, parameters: tuple) -> List[dict]:
+        with self._lock:
+            rows = self._db.execute(
+                f'SELECT dn, attributes FROM entries WHERE {where} '
+                'ORDER BY name, dn_key', parameters).fetchall()
+        return [{'dn': dn, 'attributes': json.loads(attributes)}
+                for dn, attributes in rows]
+
+    def _store(self, kind: str, responses: Iterable[dict]) -> int:
+        count = 0
+        for response in responses:
+            members, stripped, timestamp = split_response(response)
+            dn_key = response['dn'].lower()
+            attributes = stripped.get('attributes', {})
+            if not self.include_secrets:
+                attributes = {name: value
+                              for name, value in attributes.items()
+                              if name.lower() not in SECRET_ATTRIBUTES}
+            self._discard(dn_key)
+            self._db.execute(
+                'INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+                (dn_key, response['dn'], kind, entry_name(kind, attributes),
+                 json.dumps(attributes, default=json_value), timestamp))
+            self._db.executemany(
+                'INSERT OR IGNORE INTO members VALUES (?, ?, ?)',
+                ((dn_key, member.lower(), member) for member in members))
+            count += 1
+        return count
+
+    def _discard(self, dn_key: str) -> None:
+        self._db.execute('DELETE FROM members WHERE group_key = ?', (dn_key,))
+        self._db.execute('DELETE FROM entries WHERE dn_key = ?', (dn_key,))
+
+    def _set_state(self, key: str, value: str) -> None:
+        self._db.execute('INSERT OR REPLACE INTO state VALUES (?, ?)',
+                         (key, value))
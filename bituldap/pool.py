@@ -0,0 +1,243 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from ldap3 import Connection
+
+from .types import Configuration
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection could be borrowed from a pool within
+    the configured timeout.
+    """
+
+
+def pool_key(configuration: Configuration, read_only: bool,
+             replica: bool = False) -> tuple:
+    """Build the key used to look up the pool matching a configuration.
+
+    Args:
+        configuration (Configuration): Library configuration.
+        read_only (bool): Key the read-only or the read/write pool.
+        replica (bool): Key the pool of connections to the read servers.
+
+    Returns:
+        tuple: Hashable pool key.
+    """
+    servers = configuration.read_servers if replica else configuration.servers
+    return (tuple(str(server) for server in servers),
+            configuration.username,
+            configuration.password,
+            read_only)
+
+
+def healthy(connection: Connection) -> bool:
+    """Check, without contacting the server, that a connection is usable.
+
+    Args:
+        connection (Connection): LDAP connection.
+
+    Returns:
+        bool: Connection is open and bound.
+    """
+    return not connection.closed and connection.bound
+
+
+class ConnectionPool:
+    """Thread-safe pool of bound LDAP connections.
+
+    Connections are created on demand by the factory, up to max_size,
+    and handed back to the pool with release(). Idle connections older
+    than idle_timeout seconds are unbound rather than reused, as most LDAP
+    servers will have dropped them by then.
+
+    Args:
+        factory (Callable): Function returning a bound flag and a new
+            connection, like create_connection().
+        min_size (int): Number of connections opened when the pool is
+            created.
+        max_size (int): Maximum number of connections, borrowed or idle.
+        idle_timeout (float): Seconds a connection may sit idle in the pool.
+        timeout (float): Seconds to wait for a connection when the pool
+            is exhausted, before raising PoolTimeoutError.
+    """
+
+    def __init__(self,
+                 factory: Callable[[], Tuple[bool, Connection]],
+                 min_size: int = 0,
+                 max_size: int = 10,
+                 idle_timeout: float = 300,
+                 timeout: float = 30):
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+
+        self._condition = threading.Condition()
+        self._idle: List[Tuple[float, Connection]] = []
+        self._borrowed: Dict[int, Connection] = {}
+        self._size = 0
+        self._closed = False
+
+        for _ in range(min(min_size, self.max_size)):
+            bound, connection = self._open()
+            if bound:
+                self._idle.append((time.monotonic(), connection))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, connection: Connection) -> bool:
+        return id(connection) in self._borrowed
+
+    @property
+    def idle(self) -> int:
+        """Number of connections waiting in the pool."""
+        return len(self._idle)
+
+    def _open(self) -> Tuple[bool, Connection]:
+        with self._condition:
+            self._size += 1
+        try:
+            bound, connection = self.factory()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+        if not bound:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            self._close(connection)
+        return bound, connection
+
+    def _close(self, connection: Connection) -> None:
+        try:
+            connection.unbind()
+        except Exception:
+            # The connection is being thrown away, there is nothing
+            # useful to do with errors from a dead socket.
+            pass
+
+    def acquire(self) -> Tuple[bool, Connection]:
+        """Borrow a connection from the pool, opening a new one if no
+        healthy idle connection is available.
+
+        Raises:
+            PoolTimeoutError: All connections are borrowed and none was
+                returned within the timeout.
+
+        Returns:
+            bool: Successfully connected to LDAP server.
+            Connection: LDAP connection object.
+        """
+        deadline = time.monotonic() + self.timeout
+        stale: List[Connection] = []
+        try:
+            with self._condition:
+                while True:
+                    now = time.monotonic()
+                    while self._idle:
+                        released, connection = self._idle.pop()
+                        if (now - released > self.idle_timeout
+                                or not healthy(connection)):
+                            self._size -= 1
+                            stale.append(connection)
+                            continue
+                        self._borrowed[id(connection)] = connection
+                        return True, connection
+
+                    if self._size < self.max_size:
+                        break
+
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f'No LDAP connection available within '
+                            f'{self.timeout} seconds')
+                    self._condition.wait(remaining)
+        finally:
+            for connection in stale:
+                self._close(connection)
+
+        bound, connection = self._open()
+        if bound:
+            with self._condition:
+                self._borrowed[id(connection)] = connection
+        return bound, connection
+
+    def release(self, connection: Connection) -> bool:
+        """Return a borrowed connection to the pool. Connections that
+        are no longer bound are closed instead of being reused.
+
+        Args:
+            connection (Connection): Connection returned by acquire().
+
+        Returns:
+            bool: The connection belonged to this pool.
+        """
+        with self._condition:
+            if self._borrowed.pop(id(connection), None) is None:
+                return False
+
+            if healthy(connection) and not self._closed:
+                self._idle.append((time.monotonic(), connection))
+                self._condition.notify()
+                return True
+
+            self._size -= 1
+            self._condition.notify()
+        self._close(connection)
+        return True
+
+    def discard(self, connection: Connection) -> bool:
+        """Remove a borrowed connection from the pool and close it,
+        e.g. after the server terminated the session.
+
+        Args:
+            connection (Connection): Connection returned by acquire().
+
+        Returns:
+            bool: The connection belonged to this pool.
+        """
+        with self._condition:
+            if self._borrowed.pop(id(connection), None) is None:
+                return False
+            self._size -= 1
+            self._condition.notify()
+        self._close(connection)
+        return True
+
+    def close(self) -> None:
+        """Close all idle connections. Borrowed connections are closed
+        when they are released.
+        """
+        with self._condition:
+            self._closed = True
+            idle = [connection for _, connection in self._idle]
+            self._size -= len(idle)
+            self._idle = []
+            self._condition.notify_all()
+        for connection in idle:
+            self._close(connection)
+
+    @contextmanager
+    def connection(self) -> Iterator[Tuple[bool, Connection]]:
+        """Borrow a connection for the duration of a with block.
+
+        Yields:
+            bool: Successfully connected to LDAP server.
+            Connection: LDAP connection object.
+        """
+        bound, connection = self.acquire()
+        try:
+            yield bound, connection
+        finally:
+            if bound:
+                self.release(connection)
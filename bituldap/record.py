@@ -0,0 +1,158 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from ldap3 import Entry
+
+from .types import Attributes, LdapQueryOptions
+
+""" Compact, read-only records of search results, an alternative to
+    ldap3 entries when holding large numbers of results, e.g. for
+    reports.
+
+    A record holds its DN and a tuple of attribute values. The attribute
+    names are kept in a layout shared by all records with the same
+    attributes, so each record costs little more than its values.
+"""
+
+
+class Layout:
+    """Attribute names of records, shared by records of the same object
+    type with the same attributes.
+
+    Args:
+        options (LdapQueryOptions): Object type of the records.
+        names (Tuple[str, ...]): Attribute names, in value order.
+    """
+    __slots__ = ('options', 'names', 'index')
+
+    def __init__(self, options: LdapQueryOptions,
+                 names: Tuple[str, ...]) -> None:
+        self.options = options
+        self.names = names
+        self.index = {name.lower(): i for i, name in enumerate(names)}
+
+
+class Record:
+    """Immutable search result. Attribute values are read as attributes
+    or items, ignoring case, e.g. record.uid or record['uid']. Multi-valued
+    attributes are tuples.
+
+    Args:
+        dn (str): Distinguished Name of the entry.
+        layout (Layout): Attribute names of the values.
+        values (Tuple): Attribute values.
+    """
+    __slots__ = ('dn', '_layout', '_values')
+
+    def __init__(self, dn: str, layout: Layout, values: Tuple) -> None:
+        object.__setattr__(self, 'dn', dn)
+        object.__setattr__(self, '_layout', layout)
+        object.__setattr__(self, '_values', values)
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        position = self._layout.index.get(name.lower())
+        if position is None:
+            raise AttributeError(name)
+        return self._values[position]
+
+    def __getitem__(self, name: str) -> Any:
+        try:
+            return self.__getattr__(name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._layout.index
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError('Record is read-only, use to_writer()')
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError('Record is read-only, use to_writer()')
+
+    def __reduce__(self) -> tuple:
+        return Record, (self.dn, self._layout, self._values)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Record):
+            return NotImplemented
+        return self.dn == other.dn and self.to_dict() == other.to_dict()
+
+    def __hash__(self) -> int:
+        return hash(self.dn.lower())
+
+    def __repr__(self) -> str:
+        return f'Record({self.dn!r}, {self.to_dict()!r})'
+
+    @property
+    def attributes(self) -> Tuple[str, ...]:
+        """Names of the attributes of the record."""
+        return self._layout.names
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Get an attribute value.
+
+        Args:
+            name (str): Attribute name, in any case.
+            default (Any, optional): Value returned for missing attributes.
+
+        Returns:
+            Any: Attribute value.
+        """
+        position = self._layout.index.get(name.lower())
+        return default if position is None else self._values[position]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the attribute values keyed on attribute name.
+
+        Returns:
+            Dict[str, Any]: Attribute values.
+        """
+        return dict(zip(self._layout.names, self._values))
+
+    def to_writer(self, attributes: Attributes = None) -> Optional[Entry]:
+        """Read the entry again, as a writable ldap3 entry, to make
+        changes.
+
+        Args:
+            attributes (Attributes, optional): LDAP attributes to fetch.
+                Defaults to all attributes.
+
+        Returns:
+            Optional[Entry]: Writable entry, None if it no longer exists.
+        """
+        import bituldap
+        return bituldap.get_entry(self._layout.options, self.dn, attributes)
+
+
+def freeze(value: Any) -> Any:
+    """Convert list values to tuples."""
+    return tuple(value) if isinstance(value, list) else value
+
+
+def records_from_responses(options: LdapQueryOptions,
+                           responses: Iterable[dict]) -> Iterator[Record]:
+    """Build records from search responses. Records with the same
+    attributes share a layout.
+
+    Args:
+        options (LdapQueryOptions): Object type of the records.
+        responses (Iterable[dict]): Search responses, which may be a
+            generator of a paged search.
+
+    Yields:
+        Record: Read-only records.
+    """
+    layouts: Dict[Tuple[str, ...], Layout] = {}
+    for response in responses:
+        if response.get('type') != 'searchResEntry':
+            continue
+        attributes = response.get('attributes', {})
+        names = tuple(attributes.keys())
+        layout = layouts.get(names)
+        if layout is None:
+            layout = layouts[names] = Layout(options, names)
+        yield Record(response['dn'], layout,
+                     tuple(freeze(value) for value in attributes.values()))
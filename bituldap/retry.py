@@ -0,0 +1,133 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, TypeVar
+
+from ldap3 import Connection
+from ldap3.core.exceptions import (LDAPBusyResult, LDAPCommunicationError,
+                                   LDAPResponseTimeoutError,
+                                   LDAPUnavailableResult)
+
+""" Retry policy for LDAP operations failing on transient errors, such
+    as a server terminating the session, or being too busy to respond.
+
+    Operations are retried a limited number of times, with exponential
+    backoff and full jitter between attempts, and never beyond a deadline
+    per call. Other errors are raised right away.
+"""
+
+T = TypeVar('T')
+
+# Errors from which a new attempt, on a new session, may recover.
+RETRYABLE_ERRORS = (LDAPCommunicationError,
+                    LDAPResponseTimeoutError,
+                    LDAPBusyResult,
+                    LDAPUnavailableResult)
+
+# Result codes of failed operations worth retrying: busy and unavailable.
+RETRYABLE_RESULTS = (51, 52)
+
+
+@dataclass
+class RetryPolicy:
+    """Retry settings.
+
+    Args:
+        attempts (int): Maximum number of attempts, including the first.
+        backoff (float): Upper bound of the first delay, in seconds,
+            doubled for every following attempt.
+        max_backoff (float): Upper bound of any delay, in seconds.
+        deadline (float): Seconds after which no new attempt is started.
+    """
+    attempts: int = 3
+    backoff: float = 0.1
+    max_backoff: float = 2.0
+    deadline: float = 30
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before a retry.
+
+        Args:
+            attempt (int): Number of failed attempts so far, from 1.
+
+        Returns:
+            float: Random delay, up to the exponential backoff.
+        """
+        return random.uniform(0, min(self.max_backoff,
+                                     self.backoff * 2 ** (attempt - 1)))
+
+
+def retryable(error: Exception) -> bool:
+    """Check whether an error is transient, and the operation may succeed
+    when retried.
+
+    Args:
+        error (Exception): Error raised by an LDAP operation.
+
+    Returns:
+        bool: The operation should be retried.
+    """
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+def retryable_result(connection: Connection) -> bool:
+    """Check whether the last operation on a connection failed with a
+    transient result code.
+
+    Args:
+        connection (Connection): LDAP connection.
+
+    Returns:
+        bool: The operation should be retried.
+    """
+    result = connection.result or {}
+    return result.get('result') in RETRYABLE_RESULTS
+
+
+def call(operation: Callable[[], T],
+         policy: RetryPolicy,
+         recover: Optional[Callable[[], None]] = None,
+         retry_if: Optional[Callable[[T], bool]] = None) -> T:
+    """Call an operation, retrying it on transient errors.
+
+    Args:
+        operation (Callable[[], T]): LDAP operation.
+        policy (RetryPolicy): Retry settings.
+        recover (Callable, optional): Called before every retry, e.g. to
+            replace a broken connection. Errors raised by recover count
+            as a failed attempt, if retryable.
+        retry_if (Callable, optional): Check of the return value of
+            operation, for operations reporting transient failures by
+            their result rather than by raising.
+
+    Raises:
+        Exception: The last error, if it is not retryable, or when out of
+            attempts or time.
+
+    Returns:
+        T: Return value of the last attempt.
+    """
+    deadline = time.monotonic() + policy.deadline
+    attempt = 0
+    while True:
+        try:
+            if attempt and recover is not None:
+                recover()
+            result = operation()
+            if retry_if is None or not retry_if(result):
+                return result
+            error: Optional[Exception] = None
+        except Exception as e:
+            if not retryable(e):
+                raise
+            error = e
+
+        attempt += 1
+        delay = policy.delay(attempt)
+        if (attempt >= policy.attempts
+                or time.monotonic() + delay > deadline):
+            if error is not None:
+                raise error
+            return result
+        time.sleep(delay)
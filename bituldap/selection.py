@@ -0,0 +1,209 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+from ldap3 import Connection, Server
+
+""" Selection of the LDAP server to connect to, replacing the FIRST
+    strategy of ldap3's ServerPool.
+
+    The latency of connects, binds and searches is tracked per server, as
+    a moving average. Servers failing repeatedly are ejected, opening
+    their circuit breaker. An ejected server is retried once the reset
+    timeout has passed, or earlier if a background probe finds that it
+    accepts connections again.
+"""
+
+# Servers are ordered by their average latency, untried servers first.
+FASTEST = 'fastest'
+
+# Servers take turns, spreading the load.
+ROUND_ROBIN = 'round_robin'
+
+# Servers are used in the configured order, like ServerPool(FIRST).
+FIRST = 'first'
+
+STRATEGIES = (FASTEST, ROUND_ROBIN, FIRST)
+
+
+@dataclass
+class ServerState:
+    """Health and latency statistics of a single server."""
+    server: Server
+    latency: Optional[float] = None
+    requests: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    ejected_at: Optional[float] = None
+
+    @property
+    def ejected(self) -> bool:
+        return self.ejected_at is not None
+
+
+def probe_server(server: Server) -> bool:
+    """Check that a server accepts connections, without binding.
+
+    Args:
+        server (Server): LDAP server.
+
+    Returns:
+        bool: Connection to the server could be opened.
+    """
+    connection = Connection(server)
+    try:
+        connection.open()
+        return True
+    except Exception:
+        return False
+    finally:
+        connection.unbind()
+
+
+class ServerSelector:
+    """Thread-safe selection of healthy servers.
+
+    Args:
+        servers (Sequence[Server]): Configured servers.
+        strategy (str): One of FASTEST, ROUND_ROBIN or FIRST.
+        failure_threshold (int): Consecutive failures before a server is
+            ejected.
+        reset_timeout (float): Seconds before an ejected server is tried
+            again, also the interval of the background probe.
+        probe (Callable, optional): Function checking whether an ejected
+            server is reachable, called from a background thread. No
+            probing is done if None.
+        smoothing (float): Weight of the latest sample in the latency
+            moving average.
+    """
+
+    def __init__(self,
+                 servers: Sequence[Server],
+                 strategy: str = FASTEST,
+                 failure_threshold: int = 3,
+                 reset_timeout: float = 30,
+                 probe: Optional[Callable[[Server], bool]] = None,
+                 smoothing: float = 0.3):
+        if strategy not in STRATEGIES:
+            raise ValueError(f'Unknown server selection strategy: '
+                             f'{strategy}')
+        self.strategy = strategy
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_timeout = reset_timeout
+        self.probe = probe
+        self.smoothing = smoothing
+
+        self._states: Dict[int, ServerState] = {
+            id(server): ServerState(server) for server in servers}
+        self._order = list(self._states.values())
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._prober: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def state(self, server: Server) -> Optional[ServerState]:
+        """Get the statistics of a server.
+
+        Args:
+            server (Server): One of the configured servers.
+
+        Returns:
+            Optional[ServerState]: Server statistics, None for unknown
+                servers.
+        """
+        return self._states.get(id(server))
+
+    def candidates(self) -> List[Server]:
+        """Servers to try, in order of preference. Healthy servers come
+        first, followed by ejected servers due for a retry, and finally
+        the remaining ejected servers, as a last resort.
+
+        Returns:
+            List[Server]: All configured servers.
+        """
+        now = time.monotonic()
+        with self._lock:
+            healthy = [state for state in self._order if not state.ejected]
+            if self.strategy == FASTEST:
+                healthy.sort(key=lambda state: state.latency or 0.0)
+            elif self.strategy == ROUND_ROBIN and healthy:
+                turn = next(self._turn) % len(healthy)
+                healthy = healthy[turn:] + healthy[:turn]
+
+            ejected = sorted((state for state in self._order
+                              if state.ejected),
+                             key=lambda state: state.ejected_at or 0.0)
+            retry = [state for state in ejected
+                     if now - (state.ejected_at or 0.0) >= self.reset_timeout]
+            rest = [state for state in ejected if state not in retry]
+        return [state.server for state in healthy + retry + rest]
+
+    def record_success(self, server: Server, latency: float) -> None:
+        """Record a successful operation, closing the circuit of an
+        ejected server.
+
+        Args:
+            server (Server): Server used.
+            latency (float): Duration of the operation, in seconds.
+        """
+        with self._lock:
+            state = self._states.get(id(server))
+            if state is None:
+                return
+            state.requests += 1
+            state.consecutive_failures = 0
+            state.ejected_at = None
+            if state.latency is None:
+                state.latency = latency
+            else:
+                state.latency += self.smoothing * (latency - state.latency)
+
+    def record_failure(self, server: Server) -> None:
+        """Record a failure to reach a server, ejecting it once the
+        failure threshold is reached.
+
+        Args:
+            server (Server): Server used.
+        """
+        with self._lock:
+            state = self._states.get(id(server))
+            if state is None:
+                return
+            state.requests += 1
+            state.failures += 1
+            state.consecutive_failures += 1
+            if state.consecutive_failures >= self.failure_threshold:
+                state.ejected_at = time.monotonic()
+                self._start_prober()
+
+    def close(self) -> None:
+        """Stop the background probe."""
+        self._stopped.set()
+
+    def _start_prober(self) -> None:
+        if self.probe is None or self._stopped.is_set():
+            return
+        if self._prober is not None:
+            return
+        self._prober = threading.Thread(target=self._run_prober,
+                                        name='bituldap-prober', daemon=True)
+        self._prober.start()
+
+    def _run_prober(self) -> None:
+        while not self._stopped.wait(self.reset_timeout):
+            with self._lock:
+                ejected = [state for state in self._order if state.ejected]
+                if not ejected:
+                    self._prober = None
+                    return
+            for state in ejected:
+                if self.probe is not None and self.probe(state.server):
+                    with self._lock:
+                        state.consecutive_failures = 0
+                        state.ejected_at = None
@@ -1,14 +1,23 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-from typing import Optional
-from ldap3 import Connection  # type: ignore
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
 
+from ldap3 import ObjectDef
+
+from .cache import EntryCache
+from .flight import SingleFlight
+from .index import MembershipIndex
+from .pool import ConnectionPool
+from .selection import ServerSelector
 from .types import Configuration
 
 
-""" The singleton module holds shared connection and configuration objects.
-    These are not intended to be accessed directly, but only via the functions:
-    create_connection and read_configuration in the __init__.py.
+""" The singleton module holds shared connection pools and configuration
+    objects. These are not intended to be accessed directly, but only via
+    the functions: create_connection and read_configuration in the
+    __init__.py.
 
     Using the function to access the variables will ensure correct
     initialization.
@@ -17,9 +26,37 @@ from .types import Configuration
     singletons by default.
 
     Variables:
-        shared_connection (Connection): Connection singleton.
+        shared_pools (Dict[tuple, ConnectionPool]): Connection pools, keyed
+            on configuration and read-only flag.
+        shared_pools_lock (Lock): Guards creation of connection pools.
+        shared_selectors (Dict[tuple, ServerSelector]): Server health and
+            latency, keyed on configured servers.
+        shared_selectors_lock (Lock): Guards creation of server selectors,
+            separately from the pools, as opening a pool selects servers.
+        shared_object_definitions (Dict[tuple, ObjectDef]): ObjectDef
+            cache, keyed on object classes and schema.
+        shared_object_definitions_lock (Lock): Guards the ObjectDef cache.
+        shared_entry_cache (EntryCache): Cache of user and group entries.
+        shared_membership_index (MembershipIndex): Index of group
+            members, if enabled.
+        shared_flights (SingleFlight): Searches currently in flight, shared
+            by concurrent callers.
+        shared_last_write (float): time.monotonic() of the latest change
+            committed, for the read-your-writes window.
+        shared_executor (ThreadPoolExecutor): Thread pool running
+            operations for the asyncio API.
         shared_configuration (Configuration): Configuration singleton.
 """
 
-shared_connection: Optional[Connection] = None
+shared_pools: Dict[tuple, ConnectionPool] = {}
+shared_pools_lock = threading.Lock()
+shared_selectors: Dict[tuple, ServerSelector] = {}
+shared_selectors_lock = threading.Lock()
+shared_object_definitions: Dict[tuple, ObjectDef] = {}
+shared_object_definitions_lock = threading.Lock()
+shared_entry_cache: Optional[EntryCache] = None
+shared_membership_index: Optional[MembershipIndex] = None
+shared_flights = SingleFlight()
+shared_last_write = 0.0
+shared_executor: Optional[ThreadPoolExecutor] = None
 shared_configuration: Optional[Configuration] = None
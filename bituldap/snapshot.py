@@ -0,0 +1,406 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import base64
+import gzip
+import json
+import pickle
+import threading
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import (IO, Dict, Iterable, Iterator, List, Optional, Sequence,
+                    Tuple, Union, cast)
+
+from ldap3 import ALL_ATTRIBUTES, MOCK_SYNC, SUBTREE, Connection, Server
+from ldap3.protocol.rfc4512 import DsaInfo, SchemaInfo
+from ldap3.protocol.schemas.slapd24 import (slapd_2_4_dsa_info,
+                                            slapd_2_4_schema)
+from ldap3.utils.ciDict import CaseInsensitiveDict
+from ldap3.utils.dn import safe_dn
+
+""" Snapshots of directory subtrees, for loading into ldap3 MOCK_SYNC
+    servers, e.g. as test fixtures or local development stand-ins.
+
+    Snapshot files hold the raw attribute values of each entry, either
+    pickled, which is the fastest to load, or as JSON Lines, one entry per
+    line, which is streamed and can be read by other tools. Files ending
+    in .gz are compressed.
+
+    A Snapshot keeps a directory in memory, read-only, and forks it into
+    independent mock servers. Forks share the entries of the snapshot,
+    copying each entry the first time they access it, so changes made to
+    a fork never reach the snapshot or other forks.
+"""
+
+# Entry DN and raw attribute values, keyed on attribute name.
+RawEntry = Tuple[str, Dict[str, List[bytes]]]
+
+# Header of pickled snapshots.
+PICKLE_FORMAT = 'bituldap-snapshot'
+PICKLE_VERSION = 1
+
+# Attributes computed by the mock server, rather than stored.
+OPERATIONAL_ATTRIBUTES = {'entrydn'}
+
+
+def open_file(path: Union[str, Path], mode: str) -> IO:
+    """Open a snapshot file, compressed if the name ends in .gz.
+
+    Args:
+        path (Union[str, Path]): File name.
+        mode (str): File mode, e.g. "rb" or "wt".
+
+    Returns:
+        IO: File object.
+    """
+    if str(path).endswith('.gz'):
+        return cast(IO, gzip.open(path, mode))
+    return open(path, mode)
+
+
+def is_jsonl(path: Union[str, Path]) -> bool:
+    """Check whether a file name denotes JSON Lines, e.g. "dump.jsonl"
+    or "dump.jsonl.gz"."""
+    name = str(path)
+    if name.endswith('.gz'):
+        name = name[:-3]
+    return name.endswith('.jsonl')
+
+
+def encode_value(value: bytes) -> Union[str, Dict[str, str]]:
+    """Encode a raw value for JSON, as text if valid UTF-8, else as
+    {"base64": "..."}."""
+    try:
+        return value.decode('utf-8')
+    except UnicodeDecodeError:
+        return {'base64': base64.b64encode(value).decode('ascii')}
+
+
+def decode_value(value: Union[str, Dict[str, str]]) -> bytes:
+    """Decode a raw value encoded by encode_value()."""
+    if isinstance(value, dict):
+        return base64.b64decode(value['base64'])
+    return value.encode('utf-8')
+
+
+def to_json(dn: str, attributes: Dict[str, List[bytes]]) -> dict:
+    """Convert an entry to a JSON object, as written to JSON Lines files.
+
+    Args:
+        dn (str): Distinguished Name of the entry.
+        attributes (Dict[str, List[bytes]]): Raw attribute values.
+
+    Returns:
+        dict: Object with the keys dn and attributes.
+    """
+    return {'dn': dn,
+            'attributes': {name: [encode_value(value) for value in values]
+                           for name, values in attributes.items()}}
+
+
+def from_json(item: dict) -> RawEntry:
+    """Convert a JSON object written by to_json() back to an entry.
+
+    Args:
+        item (dict): Object with the keys dn and attributes.
+
+    Returns:
+        RawEntry: DN and raw attribute values.
+    """
+    return item['dn'], {name: [decode_value(value) for value in values]
+                        for name, values in item['attributes'].items()}
+
+
+def read_directory(connection: Connection, base: str,
+                   query: str = '(objectClass=*)',
+                   attributes: Sequence[str] = (ALL_ATTRIBUTES,),
+                   page_size: int = 1000) -> Iterator[RawEntry]:
+    """Read the entries of a subtree, with their raw attribute values,
+    using a paged search.
+
+    Args:
+        connection (Connection): LDAP connection, to a real or mock
+            server.
+        base (str): Distinguished Name of the subtree.
+        query (str, optional): LDAP filter. Defaults to all entries.
+        attributes (Sequence[str], optional): Attributes to fetch.
+            Defaults to all user attributes.
+        page_size (int, optional): Number of entries per page.
+
+    Yields:
+        RawEntry: DN and raw attribute values of each entry.
+    """
+    responses = connection.extend.standard.paged_search(
+        base, query, SUBTREE, attributes=list(attributes),
+        paged_size=page_size, generator=True)
+    for response in responses:
+        if response['type'] != 'searchResEntry':
+            continue
+        yield response['dn'], {name: list(values) for name, values
+                               in response['raw_attributes'].items()
+                               if name.lower() not in OPERATIONAL_ATTRIBUTES}
+
+
+def dump(entries: Iterable[RawEntry], path: Union[str, Path]) -> int:
+    """Write entries to a snapshot file. JSON Lines files are written as
+    the entries are read, pickled files once all entries are read.
+
+    Args:
+        entries (Iterable[RawEntry]): Entries, e.g. from read_directory().
+        path (Union[str, Path]): File name, ending in .jsonl for JSON
+            Lines, optionally followed by .gz for compression.
+
+    Returns:
+        int: Number of entries written.
+    """
+    count = 0
+    if is_jsonl(path):
+        with open_file(path, 'wt') as fp:
+            for dn, attributes in entries:
+                fp.write(json.dumps(to_json(dn, attributes)) + '\n')
+                count += 1
+        return count
+
+    items = list(entries)
+    with open_file(path, 'wb') as fp:
+        pickle.dump({'format': PICKLE_FORMAT, 'version': PICKLE_VERSION,
+                     'entries': items}, fp, protocol=pickle.HIGHEST_PROTOCOL)
+    return len(items)
+
+
+def read(path: Union[str, Path]) -> Iterator[RawEntry]:
+    """Read entries from a snapshot file. Pickled snapshots must only be
+    read from trusted sources, as unpickling can run arbitrary code.
+
+    Args:
+        path (Union[str, Path]): File written by dump().
+
+    Raises:
+        ValueError: The file is not a snapshot.
+
+    Yields:
+        RawEntry: DN and raw attribute values of each entry.
+    """
+    if is_jsonl(path):
+        with open_file(path, 'rt') as fp:
+            for line in fp:
+                if line.strip():
+                    yield from_json(json.loads(line))
+        return
+
+    with open_file(path, 'rb') as fp:
+        data = pickle.load(fp)
+    if not isinstance(data, dict) or data.get('format') != PICKLE_FORMAT:
+        raise ValueError(f'{path} is not a snapshot')
+    yield from data['entries']
+
+
+def stored_entry(dn: str, attributes: Dict[str, List[bytes]]
+                 ) -> CaseInsensitiveDict:
+    """Build an entry as stored by a mock server.
+
+    Args:
+        dn (str): Escaped Distinguished Name of the entry.
+        attributes (Dict[str, List[bytes]]): Raw attribute values.
+
+    Returns:
+        CaseInsensitiveDict: Attribute values keyed on attribute name.
+    """
+    entry: CaseInsensitiveDict = CaseInsensitiveDict()
+    for name, values in attributes.items():
+        if name.lower() not in OPERATIONAL_ATTRIBUTES:
+            entry[name] = list(values)
+    entry['entryDN'] = [dn.encode('utf-8')]
+    return entry
+
+
+def copy_entry(entry: CaseInsensitiveDict) -> CaseInsensitiveDict:
+    """Copy a stored entry, and its lists of values."""
+    return CaseInsensitiveDict({name: list(values)
+                                for name, values in entry.items()})
+
+
+def directory_key(dn: str) -> str:
+    """Key of an entry in a directory, ignoring case, like the keys of
+    ldap3's CaseInsensitiveDict."""
+    return dn.strip().lower()
+
+
+def load(connection: Connection, entries: Iterable[RawEntry]) -> int:
+    """Add entries to the directory of a MOCK_SYNC connection, replacing
+    existing entries with the same DN. Unlike add_entry() of the mock
+    strategy, values are stored as given, without schema validation.
+
+    Args:
+        connection (Connection): MOCK_SYNC connection.
+        entries (Iterable[RawEntry]): Entries, e.g. from read().
+
+    Returns:
+        int: Number of entries loaded.
+    """
+    server = connection.server
+    count = 0
+    with server.dit_lock:
+        for dn, attributes in entries:
+            escaped = safe_dn(dn)
+            server.dit[escaped] = stored_entry(escaped, attributes)
+            count += 1
+    return count
+
+
+class ForkedDirectory(MutableMapping):
+    """Directory of a mock server, keyed on DN ignoring case, sharing the
+    entries of a snapshot until they are accessed. The mock strategy
+    changes entries in place, and reads and changes look the same, so
+    each entry is copied the first time it is read, leaving the snapshot
+    unchanged.
+
+    Args:
+        entries (Dict[str, Tuple[str, CaseInsensitiveDict]]): DN and
+            entry of the snapshot, keyed on directory_key() of the DN.
+    """
+
+    def __init__(self, entries: Dict[str, Tuple[str, CaseInsensitiveDict]]
+                 ) -> None:
+        self._entries = dict(entries)
+        self._shared = set(self._entries)
+        self._lock = threading.Lock()
+
+    def __contains__(self, dn: object) -> bool:
+        return isinstance(dn, str) and directory_key(dn) in self._entries
+
+    def __getitem__(self, dn: str) -> CaseInsensitiveDict:
+        key = directory_key(dn)
+        if key not in self._shared:
+            return self._entries[key][1]
+        with self._lock:
+            stored_dn, entry = self._entries[key]
+            if key in self._shared:
+                entry = copy_entry(entry)
+                self._entries[key] = (stored_dn, entry)
+                self._shared.discard(key)
+            return entry
+
+    def __setitem__(self, dn: str, entry: CaseInsensitiveDict) -> None:
+        key = directory_key(dn)
+        with self._lock:
+            stored_dn = self._entries[key][0] if key in self._entries else dn
+            self._entries[key] = (stored_dn, entry)
+            self._shared.discard(key)
+
+    def __delitem__(self, dn: str) -> None:
+        key = directory_key(dn)
+        with self._lock:
+            del self._entries[key]
+            self._shared.discard(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter([dn for dn, _ in self._entries.values()])
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class Snapshot:
+    """Read-only directory held in memory, which can be forked into
+    independent MOCK_SYNC servers, e.g. one per test, without loading the
+    entries again.
+
+    Args:
+        entries (Iterable[RawEntry]): Entries of the directory.
+        dsa_info (DsaInfo, optional): Server info of the forks. Defaults
+            to that of OpenLDAP 2.4.
+        schema (SchemaInfo, optional): Schema of the forks. Defaults to
+            that of OpenLDAP 2.4.
+    """
+
+    def __init__(self, entries: Iterable[RawEntry],
+                 dsa_info: Optional[DsaInfo] = None,
+                 schema: Optional[SchemaInfo] = None) -> None:
+        self.dsa_info = dsa_info or DsaInfo.from_json(slapd_2_4_dsa_info)
+        self.schema = schema or SchemaInfo.from_json(slapd_2_4_schema)
+        self._entries: Dict[str, Tuple[str, CaseInsensitiveDict]] = {}
+        for dn, attributes in entries:
+            escaped = safe_dn(dn)
+            self._entries[directory_key(escaped)] = (
+                escaped, stored_entry(escaped, attributes))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path],
+                  dsa_info: Optional[DsaInfo] = None,
+                  schema: Optional[SchemaInfo] = None) -> 'Snapshot':
+        """Read a snapshot file written by dump().
+
+        Args:
+            path (Union[str, Path]): Snapshot file.
+            dsa_info (DsaInfo, optional): Server info of the forks.
+            schema (SchemaInfo, optional): Schema of the forks.
+
+        Returns:
+            Snapshot: Snapshot of the entries in the file.
+        """
+        return cls(read(path), dsa_info, schema)
+
+    @classmethod
+    def from_server(cls, server: Server) -> 'Snapshot':
+        """Take a snapshot of all entries of a mock server, e.g. after
+        loading them using entries_from_json(), with the info and schema
+        of the server.
+
+        Args:
+            server (Server): Server used by MOCK_SYNC connections.
+
+        Returns:
+            Snapshot: Snapshot of the entries of the server.
+        """
+        with server.dit_lock:
+            entries = [(dn, dict(entry.items()))
+                       for dn, entry
+                       in server.dit.items()]  # type: ignore
+        return cls(entries, server.info, server.schema)
+
+    def entries(self) -> Iterator[RawEntry]:
+        """Iterate over the entries, e.g. to dump() them.
+
+        Yields:
+            RawEntry: DN and raw attribute values of each entry.
+        """
+        for dn, entry in self._entries.values():
+            yield dn, {name: list(values) for name, values in entry.items()
+                       if name.lower() not in OPERATIONAL_ATTRIBUTES}
+
+    def fork(self, name: str = 'mock_server') -> Server:
+        """Create a server holding a fork of the snapshot, for use by
+        MOCK_SYNC connections. Changes made on the server are not seen by
+        the snapshot or other forks.
+
+        Args:
+            name (str, optional): Host name of the server.
+
+        Returns:
+            Server: Mock server.
+        """
+        server = Server.from_definition(name, self.dsa_info, self.schema)
+        server.dit = ForkedDirectory(self._entries)  # type: ignore
+        return server
+
+    def connect(self, user: Optional[str] = None,
+                password: Optional[str] = None,
+                name: str = 'mock_server') -> Connection:
+        """Open a MOCK_SYNC connection to a new fork of the snapshot,
+        bound as the user, or anonymously if no user is given.
+
+        Args:
+            user (str, optional): DN of the user to bind as. The entry
+                of the user must hold the password in userPassword.
+            password (str, optional): Password of the user.
+            name (str, optional): Host name of the server.
+
+        Returns:
+            Connection: Connection to the fork.
+        """
+        connection = Connection(self.fork(name), user=user,
+                                password=password, client_strategy=MOCK_SYNC)
+        connection.bind()
+        return connection
@@ -0,0 +1,265 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import base64
+import itertools
+import json
+import os
+import re
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import (IO, Dict, Iterable, Iterator, List, Optional, Tuple,
+                    Union)
+
+from .snapshot import RawEntry, from_json, open_file, to_json
+
+""" Streaming export and import files, in LDIF or JSON Lines.
+
+    The format is chosen by the file name: names ending in .ldif are LDIF
+    content records (RFC 2849), names ending in .jsonl are JSON Lines in
+    the format of directory snapshots. A further .gz suffix compresses
+    the file. Entries are written and read one at a time, so files of
+    any size are processed in constant memory.
+"""
+
+# Lines of LDIF files are folded at this width.
+LDIF_WIDTH = 76
+
+# Values written as is in LDIF, a SAFE-STRING of RFC 2849. Other values,
+# e.g. non-ASCII text, are base64 encoded.
+SAFE_STRING = re.compile(rb'(?:[\x01-\x09\x0b\x0c\x0e-\x1f\x21-\x39\x3b'
+                         rb'\x3d-\x7f][\x01-\x09\x0b\x0c\x0e-\x7f]*)?')
+
+
+def file_format(path: Union[str, Path]) -> str:
+    """Get the format of an export file from its name.
+
+    Args:
+        path (Union[str, Path]): Export file.
+
+    Raises:
+        ValueError: The name ends in neither .ldif nor .jsonl, optionally
+            followed by .gz.
+
+    Returns:
+        str: Either ldif or jsonl.
+    """
+    suffixes = [suffix.lower() for suffix in Path(path).suffixes]
+    if suffixes and suffixes[-1] == '.gz':
+        suffixes.pop()
+    if suffixes and suffixes[-1] in ('.ldif', '.jsonl'):
+        return suffixes[-1][1:]
+    raise ValueError(f'Unknown export format: {path}, '
+                     'expected a .ldif or .jsonl file')
+
+
+def ldif_line(name: str, value: bytes) -> str:
+    """Format an attribute value as a, possibly folded, LDIF line.
+
+    Args:
+        name (str): Attribute name, or dn.
+        value (bytes): Raw value.
+
+    Returns:
+        str: LDIF line, without a trailing newline.
+    """
+    if SAFE_STRING.fullmatch(value) and not value.endswith(b' '):
+        line = f'{name}: {value.decode("ascii")}' if value else f'{name}:'
+    else:
+        line = f'{name}:: {base64.b64encode(value).decode("ascii")}'
+    if len(line) <= LDIF_WIDTH:
+        return line
+    width = LDIF_WIDTH - 1
+    return '\n '.join([line[:LDIF_WIDTH]] +
+                      [line[i:i + width]
+                       for i in range(LDIF_WIDTH, len(line), width)])
+
+
+def ldif_record(dn: str, attributes: Dict[str, List[bytes]]) -> str:
+    """Format an entry as an LDIF content record.
+
+    Args:
+        dn (str): Distinguished Name of the entry.
+        attributes (Dict[str, List[bytes]]): Raw attribute values.
+
+    Returns:
+        str: LDIF record, ending in an empty line.
+    """
+    lines = [ldif_line('dn', dn.encode('utf-8'))]
+    for name, values in attributes.items():
+        lines.extend(ldif_line(name, value) for value in values)
+    return '\n'.join(lines) + '\n\n'
+
+
+def unfolded_lines(fp: IO[str]) -> Iterator[str]:
+    """Read the logical lines of an LDIF file, joining folded lines and
+    dropping comments. Records are separated by empty strings.
+
+    Args:
+        fp (IO[str]): LDIF file.
+
+    Yields:
+        str: Unfolded line.
+    """
+    current: Optional[str] = None
+    for line in fp:
+        line = line.rstrip('\r\n')
+        if line.startswith(' ') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None and not current.startswith('#'):
+            yield current
+        current = line
+    if current is not None and not current.startswith('#'):
+        yield current
+
+
+def parse_ldif_line(line: str) -> Tuple[str, bytes]:
+    """Split an LDIF line into the attribute name and raw value.
+
+    Args:
+        line (str): Unfolded LDIF line.
+
+    Raises:
+        ValueError: The line is not an attribute value, or refers to a URL.
+
+    Returns:
+        Tuple[str, bytes]: Attribute name and raw value.
+    """
+    name, separator, value = line.partition(':')
+    if not separator or not name:
+        raise ValueError(f'Invalid LDIF line: {line!r}')
+    if value.startswith(':'):
+        return name, base64.b64decode(value[1:].strip())
+    if value.startswith('<'):
+        raise ValueError(f'LDIF values from URLs are not supported: {name}')
+    return name, value.lstrip(' ').encode('utf-8')
+
+
+def read_ldif(fp: IO[str]) -> Iterator[RawEntry]:
+    """Read the content records of an LDIF file. Change records other
+    than add are rejected.
+
+    Args:
+        fp (IO[str]): LDIF file.
+
+    Raises:
+        ValueError: The file is not valid LDIF, or holds change records.
+
+    Yields:
+        RawEntry: DN and raw attribute values of each entry.
+    """
+    record: List[Tuple[str, bytes]] = []
+    for line in itertools.chain(unfolded_lines(fp), ['']):
+        if line:
+            record.append(parse_ldif_line(line))
+            continue
+        if not record:
+            continue
+        if record[0][0].lower() == 'version':
+            record.pop(0)
+        if record:
+            name, value = record[0]
+            if name.lower() != 'dn':
+                raise ValueError(f'LDIF record without a dn: {name}')
+            attributes: Dict[str, List[bytes]] = {}
+            for name, raw in record[1:]:
+                if name.lower() == 'changetype':
+                    if raw.lower() != b'add':
+                        raise ValueError('Unsupported LDIF change type: ' +
+                                         raw.decode('utf-8', 'replace'))
+                    continue
+                attributes.setdefault(name, []).append(raw)
+            yield value.decode('utf-8'), attributes
+        record = []
+
+
+def write(entries: Iterable[RawEntry], path: Union[str, Path]) -> int:
+    """Write entries to an export file, as they are read.
+
+    Args:
+        entries (Iterable[RawEntry]): DN and raw attribute values.
+        path (Union[str, Path]): Export file. See file_format().
+
+    Returns:
+        int: Number of entries written.
+    """
+    ldif = file_format(path) == 'ldif'
+    count = 0
+    with open_file(path, 'wt') as fp:
+        if ldif:
+            fp.write('version: 1\n\n')
+        for dn, attributes in entries:
+            if ldif:
+                fp.write(ldif_record(dn, attributes))
+            else:
+                fp.write(json.dumps(to_json(dn, attributes)) + '\n')
+            count += 1
+    return count
+
+
+def read(path: Union[str, Path]) -> Iterator[RawEntry]:
+    """Read the entries of an export file, one at a time.
+
+    Args:
+        path (Union[str, Path]): Export file. See file_format().
+
+    Raises:
+        ValueError: The file is not a valid export file.
+
+    Yields:
+        RawEntry: DN and raw attribute values of each entry.
+    """
+    ldif = file_format(path) == 'ldif'
+    with open_file(path, 'rt') as fp:
+        if ldif:
+            yield from read_ldif(fp)
+            return
+        for line in fp:
+            if line.strip():
+                yield from_json(json.loads(line))
+
+
+@dataclass
+class Checkpoint:
+    """Progress of an import, saved after every batch, so an interrupted
+    import can resume where it stopped.
+    """
+    source: str
+    position: int = 0
+    added: int = 0
+    existing: int = 0
+    failed: int = 0
+
+    @classmethod
+    def load(cls, path: Union[str, Path], source: str) -> 'Checkpoint':
+        """Load the checkpoint of an import, or start a new one.
+
+        Args:
+            path (Union[str, Path]): Checkpoint file.
+            source (str): Import file the checkpoint belongs to.
+
+        Raises:
+            ValueError: The checkpoint belongs to another import file.
+
+        Returns:
+            Checkpoint: Saved or new progress.
+        """
+        try:
+            with open(path) as fp:
+                checkpoint = cls(**json.load(fp))
+        except FileNotFoundError:
+            return cls(source)
+        if checkpoint.source != source:
+            raise ValueError(f'Checkpoint {path} belongs to '
+                             f'{checkpoint.source}, not {source}')
+        return checkpoint
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Save the checkpoint, replacing the file atomically.
+
+        Args:
+            path (Union[str, Path]): Checkpoint file.
+        """
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w') as fp:
+            json.dump(asdict(self), fp)
+        os.replace(temporary, path)
@@ -1,7 +1,12 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
-from dataclasses import dataclass
-from typing import List, Union
-from ldap3 import Server
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Union
+from ldap3 import HASHED_SALTED_SHA, Server
+
+
+# Attributes requested by query functions: a single attribute, a list of
+# attributes or None for the default set of the function.
+Attributes = Optional[Union[str, Sequence[str]]]
 
 
 @dataclass
@@ -25,3 +30,50 @@ class Configuration:
     servers: List[Server]
     users: LdapQueryOptions
     groups: LdapQueryOptions
+    pool_min_size: int = 0
+    pool_max_size: int = 10
+    pool_idle_timeout: int = 300
+    pool_timeout: int = 30
+    cache_size: int = 0
+    cache_user_ttl: int = 60
+    cache_group_ttl: int = 60
+    cache_negative_ttl: int = 10
+    uid_counter_dn: str = ''
+    gid_counter_dn: str = ''
+    server_strategy: str = 'fastest'
+    server_failure_threshold: int = 3
+    server_reset_timeout: int = 30
+    read_servers: List[Server] = field(default_factory=list)
+    read_your_writes: int = 0
+    retry_attempts: int = 3
+    retry_backoff: float = 0.1
+    retry_max_backoff: float = 2.0
+    retry_deadline: int = 30
+    membership_index: bool = False
+    membership_index_interval: int = 60
+    membership_index_rebuild: int = 3600
+    password_hash: str = HASHED_SALTED_SHA
+    slow_query_threshold: float = 0
+
+
+@dataclass
+class BulkResult:
+    """Data class for the outcome of a single entry of a bulk operation.
+    The error is a message from the server or library, if not successful,
+    and the code the LDAP result code, if the server rejected the entry.
+    """
+    dn: str
+    success: bool
+    error: str = ''
+    code: int = 0
+
+
+@dataclass
+class ImportResult:
+    """Data class for the outcome of an import. Entries which already
+    exist are left as they are. Counts include entries imported before
+    resuming from a checkpoint, failures only those of the last run.
+    """
+    added: int = 0
+    existing: int = 0
+    failures: List[BulkResult] = field(default_factory=list)
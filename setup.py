@@ -11,4 +11,5 @@ setup(
    packages=find_packages(exclude=["*.tests", "*.tests.*"]),
    install_requires=['ldap3'], #external packages as dependencies
    package_data={"bituldap": ["py.typed"]},
+   entry_points={"console_scripts": ["bituldap=bituldap.cli:main"]},
 )
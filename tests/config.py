@@ -4,10 +4,27 @@ from unittest.mock import patch
 from ldap3 import Server, Connection, MOCK_SYNC
 from ldap3.protocol.schemas.slapd24 import slapd_2_4_schema, slapd_2_4_dsa_info
 
-def connect():
-    username = 'cn=admin,dc=example,dc=org'
-    password = 'adminpassword'
+from bituldap.snapshot import Snapshot
+
+username = 'cn=admin,dc=example,dc=org'
+password = 'adminpassword'
+
+# Test directory, loaded once and forked by every connect().
+fixture = None
+
 
+def directory():
+    global fixture
+    if fixture is None:
+        server = Server.from_definition('mock_server', slapd_2_4_dsa_info, slapd_2_4_schema)
+        connection = Connection(server=server, client_strategy=MOCK_SYNC)
+        connection.strategy.add_entry(username, {'userPassword': password, 'sn': 'admin'})
+        connection.strategy.entries_from_json('tests/data/entries.json')
+        fixture = Snapshot.from_server(server)
+    return fixture
+
+
+def connect():
     users = b.types.LdapQueryOptions(
         'ou=people,dc=example,dc=org',
         ['inetOrgPerson'], ['posixAccount'])
@@ -16,7 +33,7 @@ def connect():
         'ou=groups,dc=example,dc=org',
         ['groupOfNames'], ['posixGroup'])
 
-    server = Server.from_definition('mock_server', slapd_2_4_dsa_info, slapd_2_4_schema)
+    server = directory().fork('mock_server')
     b.singleton.shared_configuration = b.types.Configuration(
         servers=[server],
         username=username,
@@ -27,6 +44,4 @@ def connect():
 
     connection = Connection(server=server, user=username, password=password,
                              client_strategy=MOCK_SYNC)
-    connection.strategy.add_entry(username, {'userPassword': password, 'sn': 'admin'})
-    connection.strategy.entries_from_json('tests/data/entries.json')
     return connection.bind(), connection
@@ -0,0 +1,47 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import asyncio
+import unittest
+
+from unittest.mock import patch
+
+import bituldap
+from bituldap import aio
+from tests import config
+
+
+class AsyncTestCase(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        aio.shutdown()
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    async def test_get_user(self, mock_connect):
+        user = await aio.get_user('eduncan')
+        self.assertEqual(user.loginShell, '/bin/csh')
+        self.assertIsNone(await aio.get_user('nobody'))
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    async def test_concurrent(self, mock_connect):
+        group, groups = await asyncio.gather(
+            aio.get_group('www'),
+            aio.member_of('uid=acarr,ou=people,dc=example,dc=org'))
+        self.assertEqual(group.entry_dn, 'cn=www,ou=groups,dc=example,dc=org')
+        self.assertEqual(len(groups), 6)
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    async def test_new_group(self, mock_connect):
+        user_dn = 'uid=lisa59,ou=people,dc=example,dc=org'
+        self.assertEqual(await aio.next_gid_number(), 9001)
+        created, group = await aio.new_group('async', members=[user_dn])
+        self.assertTrue(created)
+        self.assertEqual(group.gidNumber, 9001)
+
+        group.description = 'Created from a coroutine'
+        self.assertTrue(await aio.commit(group))
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    async def test_track(self, mock_connect):
+        with bituldap.track() as usage:
+            await asyncio.gather(aio.get_user('eduncan'),
+                                 aio.get_group('www'))
+        self.assertEqual(usage.searches, 2)
@@ -0,0 +1,65 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import unittest
+
+from unittest.mock import patch
+
+import bituldap as b
+from bituldap import allocator
+from tests import config
+
+UID_COUNTER = 'cn=uidNumber,ou=people,dc=example,dc=org'
+GID_COUNTER = 'cn=gidNumber,ou=groups,dc=example,dc=org'
+
+
+class AllocatorTestCase(unittest.TestCase):
+    def setUp(self):
+        c = b.read_configuration()
+        c.uid_counter_dn = UID_COUNTER
+        c.gid_counter_dn = GID_COUNTER
+
+    def tearDown(self):
+        c = b.read_configuration()
+        c.uid_counter_dn = ''
+        c.gid_counter_dn = ''
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_seed_and_allocate(self, mock_connect):
+        first = b.next_uid_number()
+        self.assertEqual(first, b.scan_next_id(
+            'ou=people,dc=example,dc=org', 'posixAccount', 'uidNumber'))
+        self.assertEqual(b.next_uid_number(), first + 1)
+
+        bound, connection = mock_connect.return_value
+        self.assertEqual(allocator.read_counter(connection, UID_COUNTER,
+                                                'uidNumber'),
+                         (True, first + 2))
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_reserve_block(self, mock_connect):
+        self.assertEqual(b.next_gid_number(), 9001)
+        block = b.reserve_gid_numbers(100)
+        self.assertEqual(block, range(9002, 9102))
+        self.assertEqual(b.next_gid_number(), 9102)
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_compare_and_swap(self, mock_connect):
+        bound, connection = mock_connect.return_value
+        b.next_uid_number()
+        exists, current = allocator.read_counter(connection, UID_COUNTER,
+                                                 'uidNumber')
+        self.assertTrue(allocator.compare_and_swap(
+            connection, UID_COUNTER, 'uidNumber', current, current + 1))
+
+        # A second client holding the old value must fail.
+        self.assertFalse(allocator.compare_and_swap(
+            connection, UID_COUNTER, 'uidNumber', current, current + 1))
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_retry_exhausted(self, mock_connect):
+        bound, connection = mock_connect.return_value
+        b.next_uid_number()
+        with patch("bituldap.allocator.compare_and_swap",
+                   return_value=False):
+            with self.assertRaises(b.AllocationError):
+                allocator.reserve(connection, UID_COUNTER, 'uidNumber', 1,
+                                  lambda: 0, retries=2)
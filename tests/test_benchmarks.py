@@ -0,0 +1,36 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import json
+import tempfile
+import unittest
+
+from pathlib import Path
+
+import bituldap as b
+from benchmarks import directory, run
+
+
+class BenchmarkTestCase(unittest.TestCase):
+    def tearDown(self):
+        b.invalidate_object_definitions()
+
+    def test_directory(self):
+        spec = directory.DirectorySpec(users=50, groups=9, members=5,
+                                       nesting=2)
+        entries = dict(directory.entries(spec))
+        self.assertEqual(len(entries), 3 + 50 + 9)
+        # Groups form chains of three, each containing the next.
+        self.assertIn(directory.group_dn(1),
+                      entries[directory.group_dn(0)]['member'])
+        self.assertNotIn(directory.group_dn(3),
+                         entries[directory.group_dn(2)]['member'])
+
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as path:
+            output = Path(path) / 'results.json'
+            run.main(['--scale', '20', '--repeat', '1', '--target', '0',
+                      '--benchmark', 'get_user', 'memory',
+                      '--output', str(output), '--quiet'])
+            results = json.loads(output.read_text())['results']
+        self.assertEqual([result['benchmark'] for result in results],
+                         ['get_user', 'memory'])
+        self.assertGreater(results[0]['median'], 0)
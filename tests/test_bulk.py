@@ -0,0 +1,34 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import contextvars
+import threading
+import unittest
+
+from bituldap.bulk import BulkWorkers
+from bituldap.instrument import BudgetExceeded
+
+caller = contextvars.ContextVar('caller', default=None)
+
+
+class BulkWorkersTestCase(unittest.TestCase):
+    def test_map(self):
+        caller.set('test')
+        with BulkWorkers(2, 'test-bulk') as runner:
+            results = list(runner.map(
+                lambda value: (value, caller.get(),
+                               threading.current_thread().name),
+                range(4)))
+        self.assertEqual([result[:2] for result in results],
+                         [(value, 'test') for value in range(4)])
+        self.assertTrue(all(result[2].startswith('test-bulk')
+                            for result in results))
+
+    def test_refusals(self):
+        with BulkWorkers(0, 'test-bulk') as runner:
+            self.assertEqual(runner.workers, 1)
+            runner.check([])
+            runner.refuse(BudgetExceeded('first'))
+            runner.refuse(BudgetExceeded('second'))
+        with self.assertRaises(BudgetExceeded) as raised:
+            runner.check(['outcome'])
+        self.assertEqual(str(raised.exception), 'first')
+        self.assertEqual(raised.exception.result, ['outcome'])
@@ -0,0 +1,96 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import unittest
+
+from unittest.mock import patch
+
+import bituldap as b
+from bituldap.cache import EntryCache
+from tests import config
+
+
+class EntryCacheTestCase(unittest.TestCase):
+    def test_lru(self):
+        cache = EntryCache(size=2)
+        cache.store(('ou=people', 'uid', 'a', ()), None, 60)
+        cache.store(('ou=people', 'uid', 'b', ()), None, 60)
+        cache.get(('ou=people', 'uid', 'a', ()))
+        cache.store(('ou=people', 'uid', 'c', ()), None, 60)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(('ou=people', 'uid', 'b', ())))
+        self.assertIsNotNone(cache.get(('ou=people', 'uid', 'a', ())))
+
+    def test_negative_invalidation(self):
+        cache = EntryCache()
+        cache.store(('ou=people', 'uid', 'Jdoe', ()), None, 60)
+        cache.invalidate('uid=jdoe,ou=people')
+        self.assertEqual(len(cache), 0)
+
+
+class CachedLookupTestCase(unittest.TestCase):
+    def setUp(self):
+        b.singleton.shared_entry_cache = None
+        b.read_configuration().cache_size = 100
+
+    def tearDown(self):
+        b.read_configuration().cache_size = 0
+        b.singleton.shared_entry_cache = None
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_cached_user(self, mock_connect):
+        user = b.get_user('eduncan')
+        cached = b.get_user('eduncan')
+        self.assertEqual(b.entry_cache().hits, 1)
+        self.assertIsNot(user, cached)
+        self.assertEqual(user.entry_dn, cached.entry_dn)
+        self.assertEqual(cached.loginShell, user.loginShell)
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_negative(self, mock_connect):
+        self.assertIsNone(b.get_user('mflintstone'))
+        self.assertIsNone(b.get_user('mflintstone'))
+        self.assertEqual(b.entry_cache().hits, 1)
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_commit_invalidates(self, mock_connect):
+        user = b.get_user('csweetchuck')
+        user.loginShell = '/bin/zsh'
+        self.assertTrue(user.entry_commit_changes())
+        self.assertEqual(len(b.entry_cache()), 0)
+        self.assertEqual(b.get_user('csweetchuck').loginShell, '/bin/zsh')
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_new_user_invalidates(self, mock_connect):
+        uid = 'bfife'
+        self.assertIsNone(b.get_user(uid))
+        user = b.new_user(uid)
+        user.uidNumber = 9876
+        user.gidNumber = 2000
+        user.homeDirectory = f'/home/{uid}'
+        user.cn = uid
+        user.sn = 'Fife'
+        self.assertTrue(user.entry_commit_changes())
+        self.assertEqual(b.get_user(uid).sn, 'Fife')
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_revalidate(self, mock_connect):
+        bound, connection = mock_connect.return_value
+        dn = 'uid=gpyle,ou=people,dc=example,dc=org'
+        connection.strategy.add_entry(dn, {
+            'objectClass': ['inetOrgPerson', 'posixAccount'],
+            'uid': 'gpyle', 'cn': 'gpyle', 'sn': 'Pyle',
+            'uidNumber': 9877, 'gidNumber': 2000,
+            'homeDirectory': '/home/gpyle',
+            'modifyTimestamp': '20240101000000Z'})
+
+        b.get_user('gpyle')
+        cache = b.entry_cache()
+        cached = cache.get((b.read_configuration().users.dn, 'uid', 'gpyle',
+                            ()))
+        cached.expires = 0
+        self.assertTrue(b.revalidate_entry(connection, cached))
+        self.assertEqual(b.get_user('gpyle').sn, 'Pyle')
+
+        connection.strategy.entries[dn]['modifyTimestamp'] = [
+            b'20250101000000Z']
+        cached.expires = 0
+        self.assertFalse(b.revalidate_entry(connection, cached))
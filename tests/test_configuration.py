@@ -42,4 +42,6 @@ class ConfigurationFileTestCase(unittest.TestCase):
         success, c = b.configure.file(Path(self.config_file))
         self.assertEqual(len(c.servers), 2)
         ports = [server.port for server in c.servers]
-        self.assertEqual(ports, [1389, 1636])
\ No newline at end of file
+        self.assertEqual(ports, [1389, 1636])
+        self.assertEqual([server.connect_timeout for server in c.servers],
+                         [5, 5])
\ No newline at end of file
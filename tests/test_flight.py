@@ -0,0 +1,134 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import threading
+import time
+import unittest
+
+from unittest.mock import patch
+
+import bituldap as b
+from bituldap.flight import SingleFlight
+from bituldap.instrument import BudgetExceeded
+from tests import config
+
+
+class SingleFlightTestCase(unittest.TestCase):
+    def test_shared_error(self):
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        errors = []
+
+        def fail():
+            started.set()
+            release.wait()
+            raise ValueError('failed')
+
+        def call():
+            try:
+                flight.do('key', fail)
+            except ValueError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(errors), 3)
+        self.assertEqual(len(flight), 0)
+        self.assertEqual(flight.do('key', lambda: 1), (1, False))
+
+    def test_unshared_error(self):
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def leader():
+            calls.append('leader')
+            started.set()
+            release.wait()
+            raise ValueError('failed')
+
+        results = []
+        thread = threading.Thread(target=lambda: results.append(
+            flight.do('key', lambda: calls.append('follower') or 2,
+                      unshared=ValueError)))
+        with self.assertRaises(ValueError):
+            threading.Timer(0.1, thread.start).start()
+            threading.Timer(0.2, release.set).start()
+            flight.do('key', leader, unshared=ValueError)
+        thread.join()
+        self.assertEqual(calls, ['leader', 'follower'])
+        self.assertEqual(results, [(2, False)])
+
+
+class CoalescedLookupTestCase(unittest.TestCase):
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_get_group(self, mock_connect):
+        started, release = threading.Event(), threading.Event()
+        query = b.ldap_query
+
+        def slow_query(*args, **kwargs):
+            started.set()
+            release.wait()
+            return query(*args, **kwargs)
+
+        results = []
+        with patch("bituldap.ldap_query", side_effect=slow_query) as search:
+            threads = [threading.Thread(
+                       target=lambda: results.append(b.get_group('www')))
+                       for _ in range(4)]
+            threads[0].start()
+            started.wait()
+            for thread in threads[1:]:
+                thread.start()
+            time.sleep(0.1)
+            release.set()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(search.call_count, 1)
+        self.assertEqual(len(results), 4)
+        self.assertEqual({group.entry_dn for group in results},
+                         {'cn=www,ou=groups,dc=example,dc=org'})
+        # Every caller gets its own, writable, entry.
+        self.assertEqual(len({id(group) for group in results}), 4)
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_budget_not_shared(self, mock_connect):
+        started, release = threading.Event(), threading.Event()
+        query = b.ldap_query
+
+        def slow_query(*args, **kwargs):
+            if not started.is_set():
+                started.set()
+                release.wait()
+            return query(*args, **kwargs)
+
+        def tracked():
+            try:
+                with b.track(entries=0):
+                    b.get_group('www')
+            except BudgetExceeded as e:
+                errors.append(e)
+
+        errors, results = [], []
+        with patch("bituldap.ldap_query", side_effect=slow_query):
+            leader = threading.Thread(target=tracked)
+            follower = threading.Thread(
+                target=lambda: results.append(b.get_group('www')))
+            leader.start()
+            started.wait()
+            follower.start()
+            time.sleep(0.1)
+            release.set()
+            leader.join()
+            follower.join()
+
+        self.assertEqual(len(errors), 1)
+        self.assertEqual([group.entry_dn for group in results],
+                         ['cn=www,ou=groups,dc=example,dc=org'])
@@ -71,4 +71,135 @@ class GroupTestCase(unittest.TestCase):
         self.assertTrue(group.entry_commit_changes())
         del group
         group = b.get_group('accounting')
-        self.assertEqual(member_count, len(group.member))
\ No newline at end of file
+        self.assertEqual(member_count, len(group.member))
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_list_excludes_members(self, mock_connect):
+        group = b.list_groups('CommonName: www')[0]
+        self.assertNotIn('member', group.entry_attributes)
+        self.assertIn('gidNumber', group.entry_attributes)
+
+        group = b.list_groups('CommonName: www', b.ALL_ATTRIBUTES)[0]
+        self.assertGreater(len(group.member), 0)
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_group_attributes(self, mock_connect):
+        group = b.get_group('www', attributes=['cn', 'gidNumber'])
+        self.assertNotIn('member', group.entry_attributes)
+        self.assertGreater(group.gidNumber.value, 0)
+
+        dn = 'uid=acarr,ou=people,dc=example,dc=org'
+        groups = b.member_of(dn, attributes='cn')
+        self.assertEqual(len(groups), 6)
+        self.assertNotIn('gidNumber', groups[0].entry_attributes)
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_resolve_members(self, mock_connect):
+        members = ['uid=acarr,ou=people,dc=example,dc=org',
+                   'uid=eduncan,ou=people,dc=example,dc=org',
+                   'uid=millersamantha,ou=people,dc=example,dc=org',
+                   'uid=lisa59,ou=people,dc=example,dc=org',
+                   'uid=nobody,ou=people,dc=example,dc=org']
+        created, group = b.new_group('resolvers', gid_number=9998,
+                                     members=members)
+        self.assertTrue(created)
+
+        with patch("bituldap.ldap_search", wraps=b.ldap_search) as search:
+            users = list(b.resolve_members(group, chunk_size=2))
+            self.assertEqual(search.call_count, 3)
+        self.assertEqual(sorted(user.entry_dn for user in users),
+                         sorted(members[:4]))
+
+        users = list(b.resolve_members('resolvers', attributes=['uid']))
+        self.assertEqual(len(users), 4)
+        self.assertNotIn('loginShell', users[0].entry_attributes)
+        self.assertEqual(list(b.resolve_members('missing')), [])
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_nested_groups(self, mock_connect):
+        user = 'uid=lisa59,ou=people,dc=example,dc=org'
+        other = 'uid=eduncan,ou=people,dc=example,dc=org'
+        outer = 'cn=outer,ou=groups,dc=example,dc=org'
+        inner = 'cn=inner,ou=groups,dc=example,dc=org'
+        # The groups contain each other, a cycle.
+        b.new_group('outer', gid_number=9996, members=[inner, other])
+        b.new_group('inner', gid_number=9997, members=[user, outer])
+
+        direct = {group.entry_dn for group in b.member_of(user)}
+        memo = b.MembershipMemo()
+        groups = b.transitive_member_of(user, memo=memo)
+        dns = [group.entry_dn for group in groups]
+        self.assertEqual(set(dns), direct | {outer})
+        self.assertLess(dns.index(inner), dns.index(outer))
+        self.assertNotIn('member', groups[0].entry_attributes)
+
+        with patch("bituldap.ldap_search", wraps=b.ldap_search) as search:
+            b.transitive_member_of(user, memo=memo)
+            self.assertEqual(search.call_count, 0)
+
+        self.assertEqual(sorted(b.expand_group('outer', memo=memo)),
+                         sorted([other, user]))
+        self.assertEqual(b.expand_group('missing'), [])
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_is_member(self, mock_connect):
+        group = 'cn=www,ou=groups,dc=example,dc=org'
+        self.assertTrue(b.is_member('uid=acarr,ou=people,dc=example,dc=org',
+                                    group))
+        self.assertFalse(b.is_member('uid=nobody,ou=people,dc=example,dc=org',
+                                     group))
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_member_diffs(self, mock_connect):
+        people = [f'uid=diff{i},ou=people,dc=example,dc=org' for i in range(5)]
+        b.new_group('diffs', gid_number=9994, members=people[:2])
+
+        success, added = b.add_members('diffs', [people[1].upper()] + people,
+                                       chunk_size=2)
+        self.assertTrue(success)
+        self.assertEqual(added, people[2:])
+        group = b.get_group('diffs')
+        self.assertEqual(len(group.member), 5)
+
+        success, removed = b.remove_members(
+            'diffs', people[3:] + ['uid=nobody,ou=people,dc=example,dc=org'])
+        self.assertTrue(success)
+        self.assertEqual(removed, people[3:])
+
+        success, added, removed = b.set_members('diffs', people[1:4])
+        self.assertTrue(success)
+        self.assertEqual(added, people[3:4])
+        self.assertEqual(removed, people[:1])
+        group = b.get_group('diffs')
+        self.assertEqual(sorted(group.member.values), sorted(people[1:4]))
+
+        self.assertEqual(b.add_members('missing', people), (False, []))
+        self.assertFalse(b.set_members('missing', people)[0])
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_select_members_bounded(self, mock_connect):
+        bound, connection = mock_connect.return_value
+        people = [f'uid=mixed{i},ou=people,dc=example,dc=org'
+                  for i in range(64)]
+        b.new_group('mixed', gid_number=9993, members=people[::2])
+        group_dn = 'cn=mixed,ou=groups,dc=example,dc=org'
+
+        with patch("bituldap.base_search", wraps=b.base_search) as search:
+            selected = b.select_members(connection, group_dn, 'member',
+                                        people, present=True, chunk_size=64)
+        self.assertEqual(selected, people[::2])
+        # Alternating members and non-members would take 2n - 1 searches
+        # if chunks were split down to single DNs.
+        self.assertLessEqual(search.call_count,
+                             2 ** (b.MEMBER_SPLIT_DEPTH + 1) - 1 + 64)
+        self.assertLess(search.call_count, 2 * 64 - 1)
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_bulk_create_groups(self, mock_connect):
+        member = 'uid=acarr,ou=people,dc=example,dc=org'
+        results = b.bulk_create_groups(
+            [{'cn': 'bulk-a', 'member': [member]},
+             {'cn': 'bulk-b', 'member': [member], 'gidNumber': 9993}])
+        self.assertTrue(all(result.success for result in results))
+        self.assertEqual(b.get_group('bulk-b').gidNumber.value, 9993)
+        self.assertGreater(b.get_group('bulk-a').gidNumber.value, 0)
@@ -0,0 +1,80 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import unittest
+
+from unittest.mock import patch
+
+import bituldap as b
+from bituldap.index import MembershipIndex
+from tests import config
+
+
+def group(dn, members, timestamp=b'20240101000000Z'):
+    return {'dn': dn, 'type': 'searchResEntry',
+            'attributes': {'cn': [dn[3:dn.index(',')]], 'member': members},
+            'raw_attributes': {'cn': [dn[3:dn.index(',')].encode()],
+                               'member': [m.encode() for m in members],
+                               'modifyTimestamp': [timestamp]}}
+
+
+class MembershipIndexTestCase(unittest.TestCase):
+    def test_update(self):
+        index = MembershipIndex()
+        index.load([group('cn=a,ou=groups', ['uid=x,ou=people']),
+                    group('cn=b,ou=groups', ['uid=X,ou=people',
+                                             'uid=y,ou=people'])])
+        self.assertEqual(len(index.groups_of('uid=x,ou=people')), 2)
+        self.assertNotIn('member', index.get('cn=a,ou=groups')['attributes'])
+        self.assertEqual(index.high_water, '20240101000000Z')
+
+        index.update([group('cn=b,ou=groups', ['uid=y,ou=people'],
+                            b'20240102000000Z')])
+        self.assertEqual([g['dn'] for g in index.groups_of('uid=x,ou=people')],
+                         ['cn=a,ou=groups'])
+        self.assertTrue(index.is_member('uid=Y,ou=people', 'CN=b,ou=groups'))
+        self.assertEqual(index.high_water, '20240102000000Z')
+
+        index.remove('cn=a,ou=groups')
+        self.assertEqual(index.groups_of('uid=x,ou=people'), [])
+
+    def test_replace(self):
+        index = MembershipIndex()
+        index.load([group('cn=a,ou=groups', [])])
+        polled_at = index.polled_at
+
+        # Re-reading a group changed locally must not skip changes to
+        # other groups, made before it and not yet polled.
+        index.replace([group('cn=a,ou=groups', ['uid=x,ou=people'],
+                             b'20240105000000Z')])
+        self.assertTrue(index.is_member('uid=x,ou=people', 'cn=a,ou=groups'))
+        self.assertEqual(index.high_water, '20240101000000Z')
+        self.assertEqual(index.polled_at, polled_at)
+
+
+class IndexedLookupTestCase(unittest.TestCase):
+    def setUp(self):
+        self.connection = config.connect()
+        b.read_configuration().membership_index = True
+        b.singleton.shared_membership_index = None
+
+    def tearDown(self):
+        b.read_configuration().membership_index = False
+        b.singleton.shared_membership_index = None
+
+    def test_member_of(self):
+        dn = 'uid=acarr,ou=people,dc=example,dc=org'
+        with patch("bituldap.create_connection",
+                   return_value=self.connection):
+            self.assertEqual(len(b.member_of(dn)), 6)
+            self.assertTrue(b.is_member(
+                dn, 'cn=www,ou=groups,dc=example,dc=org'))
+
+            with patch("bituldap.group_responses") as search:
+                groups = b.member_of(dn)
+                search.assert_not_called()
+            self.assertEqual(len(groups), 6)
+            self.assertNotIn('member', groups[0].entry_attributes)
+
+            # Groups changed using this library are read again.
+            b.new_group('indexed', gid_number=9995, members=[dn])
+            self.assertTrue(b.singleton.shared_membership_index.pending)
+            self.assertEqual(len(b.member_of(dn)), 7)
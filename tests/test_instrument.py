@@ -0,0 +1,184 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import unittest
+
+from unittest.mock import patch
+
+import bituldap as b
+from bituldap import instrument
+from bituldap.instrument import MetricsCollector
+from tests import config
+
+
+class InstrumentTestCase(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.collector = MetricsCollector()
+        b.add_operation_listener(self.events.append)
+        b.add_operation_listener(self.collector)
+
+    def tearDown(self):
+        instrument.remove_operation_listener(self.events.append)
+        instrument.remove_operation_listener(self.collector)
+
+    def operations(self):
+        return [event.operation for event in self.events]
+
+    def test_shape_filter(self):
+        self.assertEqual(instrument.shape_filter('(uid=jdoe)'), '(uid=*)')
+        self.assertEqual(instrument.shape_filter(
+            '(&(objectClass=posixAccount)(|(uid=a)(uid=b)(uid=c)))'),
+            '(&(objectClass=*)(|(uid=*)))')
+        self.assertEqual(instrument.shape_filter('(uidNumber>=1000)'),
+                         '(uidNumber>=*)')
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_events(self, mock_connect):
+        user = b.get_user('eduncan')
+        self.assertEqual(self.operations(), ['search', 'get_single_object'])
+        search, lookup = self.events
+        self.assertEqual(search.server, 'ldap://mock_server:389')
+        self.assertEqual(search.entries, 1)
+        self.assertIn('eduncan', search.search_filter)
+        self.assertNotIn('eduncan', search.filter_shape)
+        self.assertEqual(lookup.filter_shape, '(uid=*)')
+        self.assertGreater(lookup.latency, 0)
+
+        self.events.clear()
+        user.loginShell = '/bin/zsh'
+        self.assertTrue(user.entry_commit_changes())
+        self.assertEqual(self.operations(), ['commit'])
+
+        self.events.clear()
+        self.assertTrue(b.set_user_password(user.entry_dn, 'secret'))
+        self.assertEqual(self.operations(), ['modify', 'set_user_password'])
+
+        self.events.clear()
+        self.assertGreater(len(b.list_groups()), 1)
+        self.assertEqual(self.operations(), ['search', 'list_groups'])
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_render(self, mock_connect):
+        b.get_user('eduncan')
+        b.get_user('missing')
+        text = self.collector.render()
+        self.assertIn('# TYPE bituldap_operation_seconds histogram', text)
+        self.assertIn('bituldap_operations_total{operation="search",'
+                      'server="ldap://mock_server:389",result="success"} 2',
+                      text)
+        self.assertIn('bituldap_entries_total{operation="get_single_object",'
+                      'server=""} 1', text)
+        self.assertIn('bituldap_operation_seconds_bucket{operation="search",'
+                      'server="ldap://mock_server:389",le="+Inf"} 2', text)
+        self.assertEqual(self.collector.counts()['get_single_object'], 2)
+
+        self.collector.reset()
+        self.assertEqual(self.collector.counts(), {})
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_slow_log(self, mock_connect):
+        configuration = b.read_configuration()
+        configuration.slow_query_threshold = 1e-9
+        try:
+            with self.assertLogs('bituldap.slow') as logs:
+                b.get_user('eduncan')
+        finally:
+            configuration.slow_query_threshold = 0
+        self.assertIn('(uid=*)', logs.output[-1])
+        self.assertNotIn('eduncan', ''.join(logs.output))
+
+
+class TrackTestCase(unittest.TestCase):
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_counts(self, mock_connect):
+        dn = 'uid=acarr,ou=people,dc=example,dc=org'
+        with b.track() as usage:
+            user = b.get_user('eduncan')
+            with b.track() as inner:
+                groups = b.member_of(dn)
+        self.assertEqual(inner.counts(), {'binds': 0, 'searches': 1,
+                                          'modifies': 0,
+                                          'entries': len(groups)})
+        self.assertEqual(usage.searches, 2)
+        self.assertEqual(usage.entries, len(groups) + 1)
+        self.assertEqual(usage.operations['get_single_object'], 1)
+
+        with b.track() as usage:
+            user.loginShell = '/bin/zsh'
+            user.entry_commit_changes()
+            b.set_user_password(dn, 'secret')
+            users = list(b.iter_users('loginShell: /bin/csh', 'uid'))
+        self.assertEqual(usage.modifies, 2)
+        self.assertEqual(usage.searches, 1)
+        self.assertEqual(usage.entries, len(users))
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_worker_threads(self, mock_connect):
+        users = [{'uid': f'tracked{i}', 'cn': 'Tracked', 'sn': 'Tracked',
+                  'gidNumber': 2000, 'uidNumber': 7000 + i,
+                  'homeDirectory': f'/home/tracked{i}'}
+                 for i in range(3)]
+        with b.track() as usage:
+            results = b.bulk_create_users(users, workers=2)
+        self.assertEqual(usage.modifies, 3)
+
+        with b.track() as usage:
+            b.set_passwords({result.dn: 'secret' for result in results},
+                            workers=2)
+        self.assertEqual(usage.modifies, 3)
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_budget(self, mock_connect):
+        with self.assertRaises(instrument.BudgetExceeded) as raised:
+            with b.track(searches=1):
+                b.get_user('eduncan')
+                b.get_user('acarr')
+                self.fail('The second search exceeds the budget')
+        self.assertIn('searches=1', str(raised.exception))
+
+        with b.track(searches=1, strict=False) as usage:
+            b.get_user('eduncan')
+            b.get_user('acarr')
+        self.assertEqual(usage.exceeded, ['searches'])
+
+        # Events after the block are not counted.
+        b.get_user('eduncan')
+        self.assertEqual(usage.searches, 2)
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_budget_refuses_writes(self, mock_connect):
+        dn = 'uid=eduncan,ou=people,dc=example,dc=org'
+        members = len(b.get_group('www').member)
+        with self.assertRaises(instrument.BudgetExceeded):
+            with b.track(modifies=0):
+                b.add_members('www', [dn])
+        # The modify was never sent.
+        self.assertEqual(len(b.get_group('www').member), members)
+
+        user = b.get_user('eduncan')
+        user.loginShell = '/bin/zsh'
+        with self.assertRaises(instrument.BudgetExceeded):
+            with b.track(modifies=0):
+                user.entry_commit_changes()
+        self.assertEqual(b.get_user('eduncan').loginShell, '/bin/csh')
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_budget_bulk_results(self, mock_connect):
+        users = [{'uid': f'budget{i}', 'cn': 'Budget', 'sn': 'Budget',
+                  'gidNumber': 2000, 'uidNumber': 7100 + i,
+                  'homeDirectory': f'/home/budget{i}'}
+                 for i in range(3)]
+        with self.assertRaises(instrument.BudgetExceeded) as raised:
+            with b.track(modifies=2):
+                b.bulk_create_users(users, workers=1)
+        results = raised.exception.result
+        self.assertEqual([result.success for result in results],
+                         [True, True, False])
+        self.assertIsNone(b.get_user('budget2'))
+
+        with self.assertRaises(instrument.BudgetExceeded) as raised:
+            with b.track(modifies=1):
+                b.set_passwords({result.dn: 'secret' for result in results},
+                                workers=1)
+        self.assertEqual([result.success
+                          for result in raised.exception.result],
+                         [True, False, False])
@@ -0,0 +1,117 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import unittest
+
+from unittest.mock import patch
+
+from ldap3.core.exceptions import LDAPCommunicationError
+
+import bituldap as b
+from bituldap.mirror import Mirror
+from tests import config
+
+
+def response(dn, attributes, timestamp=b'20240101000000Z'):
+    raw = {name: [str(value).encode() for value in values]
+           for name, values in attributes.items()}
+    raw['modifyTimestamp'] = [timestamp]
+    return {'dn': dn, 'type': 'searchResEntry',
+            'attributes': attributes, 'raw_attributes': raw}
+
+
+class MirrorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.mirror = Mirror(':memory:')
+
+    def tearDown(self):
+        self.mirror.close()
+
+    def test_load_and_update(self):
+        self.mirror.load(Mirror.USERS, [
+            response('uid=x,ou=people', {'uid': ['x'], 'photo': [b'\xff']}),
+            response('uid=y,ou=people', {'uid': ['y']})])
+        self.mirror.load(Mirror.GROUPS, [
+            response('cn=a,ou=groups', {'cn': ['a'],
+                                        'member': ['uid=x,ou=people']})])
+        self.assertEqual(len(self.mirror), 3)
+        self.assertEqual(self.mirror.get_user('X')['dn'], 'uid=x,ou=people')
+        self.assertEqual(self.mirror.get_user('x')['attributes']['photo'],
+                         ['/w=='])
+        self.assertNotIn('member',
+                         self.mirror.get_group('a')['attributes'])
+        self.assertEqual([g['dn'] for g in
+                          self.mirror.member_of('UID=x,ou=people')],
+                         ['cn=a,ou=groups'])
+        self.assertEqual(self.mirror.high_water(Mirror.USERS),
+                         '20240101000000Z')
+
+        self.mirror.update(Mirror.GROUPS, [
+            response('cn=a,ou=groups', {'cn': ['a'],
+                                        'member': ['uid=y,ou=people']},
+                     b'20240102000000Z')])
+        self.assertEqual(self.mirror.member_of('uid=x,ou=people'), [])
+        self.assertTrue(self.mirror.is_member('uid=y,ou=people',
+                                              'cn=A,ou=groups'))
+        self.assertEqual(self.mirror.high_water(Mirror.GROUPS),
+                         '20240102000000Z')
+
+        self.assertEqual(self.mirror.reconcile(Mirror.USERS,
+                                               ['uid=Y,ou=people']), 1)
+        self.assertIsNone(self.mirror.get_user('x'))
+        self.assertGreater(self.mirror.reconciled_at(Mirror.USERS), 0)
+
+    def test_secrets(self):
+        entry = response('uid=x,ou=people', {'uid': ['x'],
+                                             'userPassword': [b'{SSHA}x']})
+        self.mirror.load(Mirror.USERS, [entry])
+        self.assertNotIn('userPassword',
+                         self.mirror.get_user('x')['attributes'])
+
+        mirror = Mirror(':memory:', include_secrets=True)
+        try:
+            mirror.load(Mirror.USERS, [entry])
+            self.assertIn('userPassword', mirror.get_user('x')['attributes'])
+        finally:
+            mirror.close()
+
+    def test_failed_load(self):
+        self.mirror.load(Mirror.USERS, [
+            response('uid=x,ou=people', {'uid': ['x']})])
+
+        def responses():
+            yield response('uid=y,ou=people', {'uid': ['y']})
+            raise LDAPCommunicationError('connection lost')
+
+        with self.assertRaises(LDAPCommunicationError):
+            self.mirror.load(Mirror.USERS, responses())
+        self.assertEqual([u['dn'] for u in self.mirror.list_users()],
+                         ['uid=x,ou=people'])
+
+
+class SyncMirrorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.mirror = Mirror(':memory:')
+
+    def tearDown(self):
+        self.mirror.close()
+
+    def test_sync(self):
+        bound, connection = config.connect()
+        dn = 'uid=acarr,ou=people,dc=example,dc=org'
+        with patch("bituldap.create_connection",
+                   return_value=(bound, connection)):
+            b.sync_mirror(self.mirror)
+            self.assertEqual(len(self.mirror.list_users()),
+                             len(b.list_users()))
+            self.assertEqual(len(self.mirror.member_of(dn)),
+                             len(b.member_of(dn)))
+            self.assertEqual(self.mirror.get_user('acarr')['dn'], dn)
+
+            # The mock server has no modification timestamps, so entries
+            # with one are polled for changes, and reconciled.
+            self.mirror.update(Mirror.USERS, [response(
+                'uid=gone,ou=people,dc=example,dc=org', {'uid': ['gone']})])
+            b.sync_mirror(self.mirror, reconcile_interval=3600)
+            self.assertIsNotNone(self.mirror.get_user('gone'))
+            b.sync_mirror(self.mirror, reconcile_interval=0)
+            self.assertIsNone(self.mirror.get_user('gone'))
+            self.assertIsNotNone(self.mirror.get_user('acarr'))
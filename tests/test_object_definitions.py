@@ -0,0 +1,67 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import unittest
+
+from unittest.mock import patch
+
+from ldap3 import Reader
+
+import bituldap as b
+from bituldap import singleton
+from tests import config
+
+
+class ObjectDefinitionTestCase(unittest.TestCase):
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_cached(self, mock_connect):
+        bound, connection = mock_connect.return_value
+        c = b.read_configuration()
+        b.invalidate_object_definitions()
+        users = b.object_definition(c.users, connection)
+        cached = list(singleton.shared_object_definitions.values())
+        self.assertEqual(len(cached), 1)
+        self.assertIsNot(users, cached[0])
+        b.object_definition(c.users, connection)
+        self.assertEqual(len(singleton.shared_object_definitions), 1)
+        b.object_definition(c.groups, connection)
+        self.assertEqual(len(singleton.shared_object_definitions), 2)
+
+        # Extra attributes result in a separate definition.
+        extended = b.object_definition(c.users, connection,
+                                       ['modifyTimestamp'])
+        self.assertIn('modifyTimestamp', extended)
+        self.assertNotIn('modifyTimestamp', users)
+
+        b.invalidate_object_definitions()
+        self.assertEqual(singleton.shared_object_definitions, {})
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_schema_change(self, mock_connect):
+        bound, connection = mock_connect.return_value
+        c = b.read_configuration()
+        b.object_definition(c.users, connection)
+        count = len(singleton.shared_object_definitions)
+
+        timestamp = connection.server.schema.modify_time_stamp
+        connection.server.schema.modify_time_stamp = ['20250101000000Z']
+        try:
+            b.object_definition(c.users, connection)
+            self.assertEqual(len(singleton.shared_object_definitions),
+                             count + 1)
+        finally:
+            connection.server.schema.modify_time_stamp = timestamp
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_copies_are_independent(self, mock_connect):
+        bound, connection = mock_connect.return_value
+        options = b.types.LdapQueryOptions('ou=people,dc=example,dc=org',
+                                           ['inetOrgPerson'], [])
+        object_def = b.object_definition(options, connection)
+        reader = Reader(connection, object_def, options.dn, 'uid: eduncan')
+        reader.search()
+        # The reader adds posixAccount, found on the entry, to its copy.
+        self.assertIn('posixAccount', object_def._auxiliary_class)
+        self.assertIn('uidNumber', object_def)
+
+        fresh = b.object_definition(options, connection)
+        self.assertEqual(fresh._auxiliary_class, [])
+        self.assertNotIn('uidNumber', fresh)
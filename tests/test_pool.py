@@ -0,0 +1,168 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import threading
+import unittest
+
+from unittest.mock import patch
+
+from ldap3 import Server, Connection, MOCK_SYNC
+from ldap3.core.exceptions import LDAPSessionTerminatedByServerError
+
+import bituldap as b
+from bituldap.pool import ConnectionPool, PoolTimeoutError
+from tests import config
+
+
+def mock_connection():
+    server = Server('mock_server')
+    connection = Connection(server=server, client_strategy=MOCK_SYNC)
+    return connection.bind(), connection
+
+
+class PoolTestCase(unittest.TestCase):
+    def test_reuse(self):
+        pool = ConnectionPool(mock_connection, max_size=2)
+        bound, c1 = pool.acquire()
+        self.assertTrue(bound)
+        self.assertTrue(pool.release(c1))
+        bound, c2 = pool.acquire()
+        self.assertIs(c1, c2)
+        self.assertEqual(len(pool), 1)
+
+    def test_min_size(self):
+        pool = ConnectionPool(mock_connection, min_size=2, max_size=4)
+        self.assertEqual(len(pool), 2)
+        self.assertEqual(pool.idle, 2)
+
+    def test_exhausted(self):
+        pool = ConnectionPool(mock_connection, max_size=1, timeout=0.05)
+        bound, c1 = pool.acquire()
+        with self.assertRaises(PoolTimeoutError):
+            pool.acquire()
+
+        # A released connection wakes up waiting borrowers.
+        timer = threading.Timer(0.01, pool.release, [c1])
+        pool.timeout = 5
+        timer.start()
+        bound, c2 = pool.acquire()
+        self.assertIs(c1, c2)
+
+    def test_idle_timeout(self):
+        pool = ConnectionPool(mock_connection, idle_timeout=0)
+        bound, c1 = pool.acquire()
+        pool.release(c1)
+        bound, c2 = pool.acquire()
+        self.assertIsNot(c1, c2)
+        self.assertTrue(c1.closed)
+        self.assertEqual(len(pool), 1)
+
+    def test_unhealthy_release(self):
+        pool = ConnectionPool(mock_connection)
+        bound, c1 = pool.acquire()
+        c1.unbind()
+        self.assertTrue(pool.release(c1))
+        self.assertEqual(len(pool), 0)
+        self.assertFalse(pool.release(c1))
+
+    def test_discard(self):
+        pool = ConnectionPool(mock_connection)
+        bound, c1 = pool.acquire()
+        self.assertTrue(pool.discard(c1))
+        self.assertEqual(len(pool), 0)
+        self.assertTrue(c1.closed)
+
+
+class SharedPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        # Set the shared configuration, so pools are keyed on the
+        # configuration used by the mocked connections.
+        config.connect()
+
+    def tearDown(self):
+        b.close_connections()
+
+    @patch("bituldap.__ldap_reconnect",
+           side_effect=lambda *args: config.connect())
+    def test_connection_reused(self, mock_reconnect):
+        self.assertEqual(b.get_user('eduncan').uidNumber, 6237)
+        self.assertEqual(b.get_user('millersamantha').uidNumber, 4873)
+        self.assertEqual(mock_reconnect.call_count, 1)
+
+    @patch("bituldap.__ldap_reconnect",
+           side_effect=lambda *args: config.connect())
+    def test_read_only_pool(self, mock_reconnect):
+        b.get_user('eduncan')
+        b.list_groups()
+        self.assertEqual(mock_reconnect.call_count, 2)
+        self.assertIsNot(b.connection_pool(), b.connection_pool(True))
+
+    def test_commit_borrows_connection(self):
+        _, connection = config.connect()
+
+        def reconnect(*args):
+            shared = Connection(server=connection.server,
+                                user=config.username, password=config.password,
+                                client_strategy=MOCK_SYNC)
+            return shared.bind(), shared
+
+        with patch("bituldap.__ldap_reconnect", side_effect=reconnect):
+            user = b.get_user('eduncan')
+            read_with = user.entry_cursor.connection
+            # Another thread now holds the connection the entry was read with.
+            bound, held = b.create_connection()
+            self.assertIs(held, read_with)
+            user.loginShell = '/bin/zsh'
+            self.assertTrue(user.entry_commit_changes())
+            self.assertIs(user.entry_cursor.connection, read_with)
+            b.release_connection(held)
+            self.assertEqual(len(b.connection_pool()), 2)
+        self.assertEqual(b.get_user('eduncan').loginShell, '/bin/zsh')
+
+    def test_commit_retried(self):
+        _, connection = config.connect()
+
+        def reconnect(*args):
+            shared = Connection(server=connection.server,
+                                user=config.username, password=config.password,
+                                client_strategy=MOCK_SYNC)
+            return shared.bind(), shared
+
+        with patch("bituldap.__ldap_reconnect", side_effect=reconnect):
+            user = b.get_user('eduncan')
+            pooled = user.entry_cursor.connection
+            modify = pooled.modify
+            attempts = []
+
+            # The server dropped the pooled connection while it was idle.
+            def dropped(*args, **kwargs):
+                attempts.append(args)
+                if len(attempts) == 1:
+                    raise LDAPSessionTerminatedByServerError('dropped')
+                return modify(*args, **kwargs)
+
+            user.loginShell = '/bin/zsh'
+            with patch.object(pooled, 'modify', side_effect=dropped):
+                self.assertTrue(user.entry_commit_changes())
+            self.assertEqual(len(attempts), 2)
+        self.assertEqual(b.get_user('eduncan').loginShell, '/bin/zsh')
+
+    def test_min_size_reconnect(self):
+        b.singleton.shared_configuration.pool_min_size = 2
+        server = b.singleton.shared_configuration.servers[0]
+
+        def mock_connection(**kwargs):
+            return Connection(client_strategy=MOCK_SYNC, **kwargs)
+
+        # The pool opens its first connections with the real reconnect,
+        # which selects the server while the pool is being created.
+        pools = []
+        with patch("bituldap.Connection", side_effect=mock_connection):
+            thread = threading.Thread(
+                target=lambda: pools.append(b.connection_pool()), daemon=True)
+            thread.start()
+            thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(pools[0].idle, 2)
+        bound, connection = pools[0].acquire()
+        self.assertTrue(bound)
+        self.assertIs(connection.server, server)
+        pools[0].release(connection)
@@ -0,0 +1,48 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import pickle
+import unittest
+
+from unittest.mock import patch
+
+import bituldap as b
+from bituldap.record import Record
+from tests import config
+
+
+class RecordTestCase(unittest.TestCase):
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_compact_search(self, mock_connect):
+        users = b.list_users('loginShell: /bin/csh', ['uid', 'loginShell'],
+                             compact=True)
+        self.assertGreater(len(users), 1)
+        user = users[0]
+        self.assertIsInstance(user, Record)
+        self.assertEqual(user.LOGINSHELL, '/bin/csh')
+        self.assertEqual(user['loginShell'], '/bin/csh')
+        self.assertNotIn('homeDirectory', user)
+        self.assertIsNone(user.get('homeDirectory'))
+        with self.assertRaises(AttributeError):
+            user.homeDirectory
+        with self.assertRaises(AttributeError):
+            user.loginShell = '/bin/sh'
+
+        # Records of the same search share their attribute names.
+        self.assertIs(users[0]._layout, users[1]._layout)
+        self.assertEqual(pickle.loads(pickle.dumps(user)), user)
+
+        groups = b.list_groups(compact=True)
+        self.assertEqual(len(groups), len(b.list_groups()))
+        self.assertNotIn('member', groups[0])
+        self.assertEqual(sum(1 for _ in b.iter_users(compact=True)), 1479)
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_to_writer(self, mock_connect):
+        user = b.get_user('eduncan', compact=True)
+        self.assertEqual(user.dn, 'uid=eduncan,ou=people,dc=example,dc=org')
+        self.assertEqual(tuple(user.uid), ('eduncan',))
+
+        writer = user.to_writer()
+        writer.loginShell = '/bin/zsh'
+        self.assertTrue(writer.entry_commit_changes())
+        self.assertEqual(b.get_user('eduncan').loginShell, '/bin/zsh')
+        self.assertIsNone(b.get_group('missing', compact=True))
@@ -0,0 +1,77 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import unittest
+
+from unittest.mock import MagicMock, patch
+
+from ldap3.core.exceptions import (LDAPInvalidFilterError,
+                                   LDAPSessionTerminatedByServerError)
+
+import bituldap as b
+from bituldap import retry
+from bituldap.retry import RetryPolicy
+from tests import config
+
+
+class RetryPolicyTestCase(unittest.TestCase):
+    policy = RetryPolicy(attempts=3, backoff=0)
+
+    def test_recovers(self):
+        recover = MagicMock()
+        operation = MagicMock(side_effect=[
+            LDAPSessionTerminatedByServerError('terminated'), 'result'])
+        self.assertEqual(retry.call(operation, self.policy, recover),
+                         'result')
+        self.assertEqual(operation.call_count, 2)
+        recover.assert_called_once()
+
+    def test_attempts(self):
+        operation = MagicMock(
+            side_effect=LDAPSessionTerminatedByServerError('terminated'))
+        with self.assertRaises(LDAPSessionTerminatedByServerError):
+            retry.call(operation, self.policy)
+        self.assertEqual(operation.call_count, 3)
+
+    def test_not_retryable(self):
+        operation = MagicMock(side_effect=LDAPInvalidFilterError('filter'))
+        with self.assertRaises(LDAPInvalidFilterError):
+            retry.call(operation, self.policy)
+        self.assertEqual(operation.call_count, 1)
+
+    def test_deadline(self):
+        operation = MagicMock(
+            side_effect=LDAPSessionTerminatedByServerError('terminated'))
+        policy = RetryPolicy(attempts=10, backoff=60, deadline=0)
+        with self.assertRaises(LDAPSessionTerminatedByServerError):
+            retry.call(operation, policy)
+        self.assertEqual(operation.call_count, 1)
+
+    def test_retry_if(self):
+        operation = MagicMock(side_effect=[False, False, True])
+        self.assertTrue(retry.call(operation, self.policy,
+                                   retry_if=lambda ok: not ok))
+        self.assertEqual(operation.call_count, 3)
+
+
+class RetryOperationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.connection = config.connect()
+        b.read_configuration().retry_backoff = 0
+
+    def test_session_terminated(self):
+        bound, connection = self.connection
+        search = connection.search
+        failures = [LDAPSessionTerminatedByServerError('terminated')]
+
+        def flapping(*args, **kwargs):
+            if failures:
+                raise failures.pop()
+            return search(*args, **kwargs)
+
+        with patch("bituldap.create_connection",
+                   return_value=self.connection), \
+                patch.object(connection, 'search', side_effect=flapping), \
+                patch("bituldap.reconnect") as reconnect:
+            user = b.get_user('eduncan')
+
+        self.assertEqual(user.uidNumber, 6237)
+        reconnect.assert_called_once_with(connection)
@@ -0,0 +1,82 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import unittest
+
+from unittest.mock import call, patch
+
+from ldap3 import MOCK_SYNC, Connection, Server
+
+import bituldap as b
+from tests import config
+
+
+class ReadWriteRoutingTestCase(unittest.TestCase):
+    def setUp(self):
+        bound, self.primary = config.connect()
+        # Mock entries are stored per server, so the replica connection
+        # sees the same entries, but can not write them.
+        self.replica = Connection(self.primary.server,
+                                  user=self.primary.user,
+                                  password=self.primary.password,
+                                  read_only=True,
+                                  client_strategy=MOCK_SYNC)
+        self.replica.bind()
+        self.configuration = b.read_configuration()
+        self.configuration.read_servers = [Server('replica.example.org')]
+        b.singleton.shared_last_write = 0.0
+
+        def reconnect(read_only=False, replica=False):
+            return True, self.replica if replica else self.primary
+
+        patcher = patch("bituldap.__ldap_reconnect", side_effect=reconnect)
+        self.reconnect = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        b.close_connections()
+
+    def test_reads_from_replica(self):
+        groups = b.list_groups()
+        self.assertEqual(len(groups), 9)
+        self.assertIs(groups[0].entry_cursor.connection, self.replica)
+        self.reconnect.assert_called_once_with(True, True)
+
+    def test_writable_lookup(self):
+        user = b.get_user('eduncan')
+        self.assertIs(user.entry_cursor.connection, self.primary)
+        self.assertEqual(self.reconnect.call_count, 2)
+
+        user.loginShell = '/bin/zsh'
+        self.assertTrue(user.entry_commit_changes())
+        self.assertEqual(b.get_users(['eduncan'])['eduncan'].loginShell,
+                         '/bin/zsh')
+
+    def test_read_your_writes(self):
+        self.configuration.read_your_writes = 60
+        self.assertTrue(b.set_user_password(
+            'uid=eduncan,ou=people,dc=example,dc=org', 'secret'))
+        self.assertTrue(b.recently_written())
+
+        groups = b.list_groups()
+        self.assertIs(groups[0].entry_cursor.connection, self.primary)
+        self.assertNotIn(call(True, True), self.reconnect.call_args_list)
+
+
+class ReadServerConfigurationTestCase(unittest.TestCase):
+    def test_parse_dict(self):
+        success, c = b.configure.parse_dict({
+            'uri': 'ldap://primary.example.org',
+            'read_uri': ['ldap://replica1.example.org',
+                         'ldap://replica2.example.org'],
+            'read_your_writes': 5})
+        self.assertTrue(success)
+        self.assertEqual([server.host for server in c.read_servers],
+                         ['replica1.example.org', 'replica2.example.org'])
+        self.assertEqual(c.read_your_writes, 5)
+
+    def test_environment(self):
+        with patch.dict('os.environ', {
+                'BITU_LDAP_READ_URI': 'ldap://replica1.example.org',
+                'BITU_READ_YOUR_WRITES': '5'}):
+            c = b.configure.environment()
+        self.assertEqual(c.read_servers[0].host, 'replica1.example.org')
+        self.assertEqual(c.read_your_writes, 5)
@@ -19,3 +19,64 @@ class SearchTestCase(unittest.TestCase):
         user = b.get_user('eduncan')
         self.assertEqual(user.entry_dn, 'uid=eduncan,ou=people,dc=example,dc=org')
         self.assertEqual(user.loginShell, '/bin/csh')
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_iter_users(self, mock_connect):
+        users = b.iter_users(page_size=100)
+        self.assertEqual(sum(1 for _ in users), 1479)
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_iter_users_attributes(self, mock_connect):
+        user = next(b.iter_users('uid: eduncan', attributes=['uid']))
+        self.assertEqual(user.uid, 'eduncan')
+        self.assertNotIn('loginShell', user.entry_attributes)
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_iter_groups(self, mock_connect):
+        cns = [group.entry_dn for group in b.iter_groups(page_size=3)]
+        self.assertEqual(len(cns), len(b.list_groups()))
+        self.assertIn('cn=www,ou=groups,dc=example,dc=org', cns)
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_list_users(self, mock_connect):
+        users = b.list_users('loginShell: /bin/csh')
+        self.assertIn('uid=eduncan,ou=people,dc=example,dc=org',
+                      [user.entry_dn for user in users])
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_user_attributes(self, mock_connect):
+        user = b.get_user('eduncan', attributes=['uid', 'loginShell'])
+        self.assertEqual(user.loginShell, '/bin/csh')
+        self.assertNotIn('homeDirectory', user.entry_attributes)
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_get_users(self, mock_connect):
+        uids = ['eduncan', 'millersamantha', 'nobody', 'dfackler (sgt)']
+        with patch("bituldap.ldap_search", wraps=b.ldap_search) as search:
+            users = b.get_users(uids)
+            self.assertEqual(search.call_count, 1)
+        self.assertEqual(list(users), uids)
+        self.assertEqual(users['eduncan'].loginShell, '/bin/csh')
+        self.assertEqual(users['millersamantha'].uidNumber, 4873)
+        self.assertIsNone(users['nobody'])
+        self.assertIsNone(users['dfackler (sgt)'])
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_get_groups_chunked(self, mock_connect):
+        cns = ['www', 'accounting', 'ITS', 'missing']
+        with patch("bituldap.ldap_search", wraps=b.ldap_search) as search:
+            groups = b.get_groups(cns, attributes=['cn', 'gidNumber'])
+            self.assertEqual(search.call_count, 1)
+        self.assertEqual(groups['www'].entry_dn,
+                         'cn=www,ou=groups,dc=example,dc=org')
+        self.assertIsNone(groups['missing'])
+
+        groups = b.get_groups(['www', 'WWW', 'Www'])
+        self.assertEqual({group.entry_dn for group in groups.values()},
+                         {'cn=www,ou=groups,dc=example,dc=org'})
+
+        filters = list(b.or_filters('cn', cns, chunk_size=3))
+        self.assertEqual(len(filters), 2)
+        self.assertEqual(filters[1], '(|(cn=missing))')
+        self.assertEqual(list(b.or_filters('cn', ['a(b)'])),
+                         ['(|(cn=a\\28b\\29))'])
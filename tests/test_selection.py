@@ -0,0 +1,87 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import unittest
+
+from unittest.mock import MagicMock, patch
+
+from ldap3 import Server
+from ldap3.core.exceptions import LDAPSocketOpenError
+
+import bituldap as b
+from bituldap.selection import ROUND_ROBIN, ServerSelector
+from tests import config
+
+
+class ServerSelectorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.servers = [Server('ldap1.example.org'),
+                        Server('ldap2.example.org'),
+                        Server('ldap3.example.org')]
+
+    def test_fastest(self):
+        selector = ServerSelector(self.servers)
+        selector.record_success(self.servers[0], 0.5)
+        selector.record_success(self.servers[1], 0.1)
+        self.assertEqual(selector.candidates(),
+                         [self.servers[2], self.servers[1], self.servers[0]])
+
+    def test_round_robin(self):
+        selector = ServerSelector(self.servers, strategy=ROUND_ROBIN)
+        first = [selector.candidates()[0] for _ in range(3)]
+        self.assertEqual(first, self.servers)
+
+    def test_circuit_breaker(self):
+        selector = ServerSelector(self.servers, failure_threshold=2,
+                                  reset_timeout=60)
+        selector.record_failure(self.servers[0])
+        self.assertEqual(selector.candidates()[0], self.servers[0])
+        selector.record_failure(self.servers[0])
+        self.assertTrue(selector.state(self.servers[0]).ejected)
+        self.assertEqual(selector.candidates()[-1], self.servers[0])
+
+        selector.record_success(self.servers[0], 0.0)
+        self.assertFalse(selector.state(self.servers[0]).ejected)
+
+    def test_reset_timeout(self):
+        selector = ServerSelector(self.servers, failure_threshold=1,
+                                  reset_timeout=0)
+        selector.record_failure(self.servers[0])
+        selector.record_failure(self.servers[1])
+        # Ejected servers due for a retry are still tried, after the
+        # healthy ones.
+        self.assertEqual(selector.candidates(),
+                         [self.servers[2], self.servers[0], self.servers[1]])
+
+
+class FailoverTestCase(unittest.TestCase):
+    def setUp(self):
+        bound, self.connection = config.connect()
+        self.configuration = b.read_configuration()
+        self.configuration.servers = [Server('ldap1.example.org'),
+                                      Server('ldap2.example.org')]
+        self.configuration.server_strategy = 'first'
+
+    def tearDown(self):
+        b.close_connections()
+
+    def test_failover(self):
+        down, up = self.configuration.servers
+
+        def connection(server, **kwargs):
+            mock = MagicMock(server=server)
+
+            def bind():
+                if mock.server is down:
+                    raise LDAPSocketOpenError('down')
+                return True
+
+            mock.bind.side_effect = bind
+            return mock
+
+        with patch("bituldap.Connection", side_effect=connection):
+            bound, c = b.connection_pool().acquire()
+
+        self.assertTrue(bound)
+        self.assertIs(c.server, up)
+        selector = b.server_selector()
+        self.assertEqual(selector.state(down).failures, 1)
+        self.assertEqual(selector.state(up).requests, 1)
@@ -0,0 +1,76 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+import tempfile
+import unittest
+
+from unittest.mock import patch
+
+from ldap3 import MOCK_SYNC, Connection
+
+import bituldap as b
+from bituldap import snapshot
+from bituldap.snapshot import Snapshot
+from tests import config
+
+
+class SnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_fork(self):
+        dn = 'uid=eduncan,ou=people,dc=example,dc=org'
+        first = config.directory().connect(config.username, config.password)
+        second = config.directory().connect(config.username, config.password)
+        self.assertTrue(first.modify(dn, {'loginShell': [
+            ('MODIFY_REPLACE', ['/bin/zsh'])]}))
+        self.assertTrue(first.delete('uid=acarr,ou=people,dc=example,dc=org'))
+
+        second.search(dn, '(objectClass=*)', attributes=['loginShell'])
+        self.assertEqual(second.entries[0].loginShell.value, '/bin/csh')
+        self.assertTrue(second.search(
+            'ou=people,dc=example,dc=org', '(uid=acarr)'))
+        first.search(dn, '(objectClass=*)', attributes=['loginShell'])
+        self.assertEqual(first.entries[0].loginShell.value, '/bin/zsh')
+        self.assertEqual(len(first.server.dit), len(config.directory()) - 1)
+
+    def test_dump_and_load(self):
+        connection = config.directory().connect()
+        entries = list(snapshot.read_directory(connection,
+                                               'ou=groups,dc=example,dc=org'))
+        entries.append(('cn=binary,dc=example,dc=org',
+                        {'objectClass': [b'device'], 'cn': [b'binary'],
+                         'description': [b'\xff\x00']}))
+
+        for name in ('groups.pickle', 'groups.jsonl.gz'):
+            self.assertEqual(snapshot.dump(entries, self.path(name)),
+                             len(entries))
+            self.assertEqual(list(snapshot.read(self.path(name))), entries)
+
+        fixture = Snapshot.from_file(self.path('groups.pickle'))
+        self.assertEqual(len(fixture), len(entries))
+        forked = fixture.connect()
+        forked.search('ou=groups,dc=example,dc=org', '(cn=www)',
+                      attributes=['gidNumber'])
+        self.assertEqual(len(forked.entries), 1)
+
+        target = Connection(fixture.fork('target'), client_strategy=MOCK_SYNC)
+        self.assertEqual(snapshot.load(target, entries[:2]), 2)
+
+        with open(self.path('other'), 'wb') as fp:
+            fp.write(b'\x80\x04N.')
+        with self.assertRaises(ValueError):
+            list(snapshot.read(self.path('other')))
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_dump_snapshot(self, mock_connect):
+        path = self.path('directory.jsonl')
+        count = b.dump_snapshot(path)
+        self.assertEqual(count, len(b.list_users()) + len(b.list_groups()) + 2)
+        fixture = Snapshot.from_file(path)
+        self.assertEqual(len(fixture), count)
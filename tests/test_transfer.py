@@ -0,0 +1,160 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import io
+import os
+import tempfile
+import unittest
+
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+import bituldap as b
+from bituldap import cli, transfer
+from bituldap.instrument import BudgetExceeded
+from tests import config
+
+LDIF = """version: 1
+
+# A comment, which is
+  folded.
+dn: uid=jdoe,ou=people,dc=example,dc=org
+changetype: add
+objectClass: inetOrgPerson
+cn: John
+  Doe
+sn:: RMO4ZQ==
+description:
+
+"""
+
+
+class TransferTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_ldif(self):
+        path = self.path('entries.ldif')
+        with open(path, 'w') as fp:
+            fp.write(LDIF)
+        self.assertEqual(list(transfer.read(path)), [
+            ('uid=jdoe,ou=people,dc=example,dc=org',
+             {'objectClass': [b'inetOrgPerson'], 'cn': [b'John Doe'],
+              'sn': ['Døe'.encode()], 'description': [b'']})])
+
+        with open(path, 'w') as fp:
+            fp.write('dn: cn=x,dc=example,dc=org\nchangetype: delete\n')
+        with self.assertRaises(ValueError):
+            list(transfer.read(path))
+        with self.assertRaises(ValueError):
+            transfer.write([], self.path('entries.txt'))
+
+    def test_round_trip(self):
+        entries = [
+            ('cn=Søren,dc=example,dc=org',
+             {'objectClass': [b'device'], 'cn': ['Søren'.encode()],
+              'description': [b' leading space', b'x' * 200, b':colon',
+                              b'\xff\x00', b'trailing ']}),
+            ('cn=plain,dc=example,dc=org',
+             {'objectClass': [b'device'], 'cn': [b'plain']}),
+        ]
+        for name in ('entries.ldif', 'entries.ldif.gz', 'entries.jsonl.gz'):
+            self.assertEqual(transfer.write(entries, self.path(name)), 2)
+            self.assertEqual(list(transfer.read(self.path(name))), entries)
+
+        with open(self.path('entries.ldif')) as fp:
+            lines = fp.read().splitlines()
+        self.assertIn('dn:: Y249U8O4cmVuLGRjPWV4YW1wbGUsZGM9b3Jn', lines)
+        self.assertIn('description:: OmNvbG9u', lines)
+        self.assertTrue(all(len(line) <= transfer.LDIF_WIDTH
+                            for line in lines))
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_export_import(self, mock_connect):
+        path = self.path('directory.ldif.gz')
+        total = len(b.list_users()) + len(b.list_groups())
+        self.assertEqual(b.export_entries(path), total)
+        self.assertEqual(b.export_entries(self.path('groups.jsonl'),
+                                          ['groups'], 'cn'),
+                         len(b.list_groups()))
+        with self.assertRaises(ValueError):
+            b.export_entries(path, ['printers'])
+
+        shell = b.get_user('acarr').loginShell.value
+        _, connection = mock_connect.return_value
+        deleted = ['uid=acarr,ou=people,dc=example,dc=org',
+                   'cn=www,ou=groups,dc=example,dc=org']
+        for dn in deleted:
+            self.assertTrue(connection.delete(dn))
+
+        result = b.import_entries(path, batch_size=5, workers=2)
+        self.assertEqual((result.added, result.existing, result.failures),
+                         (2, total - 2, []))
+        self.assertEqual(b.get_user('acarr').loginShell.value, shell)
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_checkpoint(self, mock_connect):
+        path = self.path('users.jsonl')
+        checkpoint = self.path('users.progress')
+        total = b.export_entries(path, ['users'])
+        _, connection = mock_connect.return_value
+        for user in b.list_users():
+            connection.delete(user.entry_dn)
+
+        calls = []
+        add_entry = b.add_entry
+
+        def interrupted(dn, attributes):
+            if len(calls) == 4:
+                raise KeyboardInterrupt
+            calls.append(dn)
+            return add_entry(dn, attributes)
+
+        with patch('bituldap.add_entry', side_effect=interrupted):
+            with self.assertRaises(KeyboardInterrupt):
+                b.import_entries(path, checkpoint, batch_size=2, workers=1)
+        self.assertEqual(transfer.Checkpoint.load(
+            checkpoint, os.path.realpath(path)).position, 4)
+
+        result = b.import_entries(path, checkpoint, batch_size=2)
+        self.assertEqual((result.added, result.existing), (total, 0))
+        self.assertEqual(len(b.list_users()), total)
+
+        # A completed import is not repeated.
+        result = b.import_entries(path, checkpoint)
+        self.assertEqual(result.added, total)
+        with self.assertRaises(ValueError):
+            b.import_entries(self.path('other.jsonl'), checkpoint)
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_budget(self, mock_connect):
+        path = self.path('users.jsonl')
+        checkpoint = self.path('users.progress')
+        total = b.export_entries(path, ['users'])
+        _, connection = mock_connect.return_value
+        for user in b.list_users():
+            connection.delete(user.entry_dn)
+
+        with self.assertRaises(BudgetExceeded) as raised:
+            with b.track(modifies=3):
+                b.import_entries(path, checkpoint, batch_size=2, workers=1)
+        self.assertEqual(raised.exception.result.added, 3)
+        # The interrupted batch is not saved, and is added on resuming.
+        self.assertEqual(transfer.Checkpoint.load(
+            checkpoint, os.path.realpath(path)).position, 2)
+        result = b.import_entries(path, checkpoint, batch_size=2)
+        self.assertEqual(len(b.list_users()), total)
+        self.assertEqual(result.failures, [])
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_cli(self, mock_connect):
+        path = self.path('users.ldif')
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(cli.main(['export', '--kind', 'users', path]), 0)
+            self.assertEqual(cli.main(['import', path]), 0)
+        self.assertIn(f'existing {len(b.list_users())}', output.getvalue())
@@ -1,9 +1,13 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
+import threading
 import unittest
 
 from unittest.mock import patch
 
+from ldap3 import HASHED_SALTED_SHA, HASHED_SALTED_SHA512
+
 import bituldap as b
+from bituldap.pool import PoolTimeoutError
 from tests import config
 
 class UserTestCase(unittest.TestCase):
@@ -91,3 +95,94 @@ class UserTestCase(unittest.TestCase):
         user2 = b.get_user(uid2)
         self.assertEqual(user1.uidNumber, uid_number)
         self.assertIsNone(user2)
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_bulk_create_users(self, mock_connect):
+        users = [{'uid': f'bulk{i}', 'cn': f'bulk{i}', 'sn': 'Bulk',
+                  'gidNumber': 2000, 'homeDirectory': f'/home/bulk{i}'}
+                 for i in range(5)]
+        users.append(dict(users[0]))
+        users.append({'cn': 'nameless'})
+        first = b.next_uid_number()
+
+        with patch("bituldap.scan_next_id",
+                   wraps=b.scan_next_id) as scan:
+            results = b.bulk_create_users(users, workers=3)
+            self.assertEqual(scan.call_count, 1)
+
+        self.assertEqual([result.success for result in results],
+                         [True] * 5 + [False, False])
+        self.assertEqual(results[0].dn, 'uid=bulk0,ou=people,dc=example,dc=org')
+        self.assertTrue(results[5].error)
+        self.assertEqual(results[6].error, 'Missing uid')
+        numbers = sorted(b.get_user(f'bulk{i}').uidNumber.value
+                         for i in range(5))
+        self.assertEqual(numbers[0], first)
+        self.assertEqual(len(set(numbers)), 5)
+
+    def test_bulk_create_pool_exhausted(self):
+        connected = config.connect()
+        adds = []
+
+        def create_connection(*args, **kwargs):
+            if threading.current_thread().name.startswith('bituldap-bulk'):
+                adds.append(1)
+                if len(adds) == 2:
+                    raise PoolTimeoutError('timeout')
+            return connected
+
+        users = [{'uid': f'bulk{i}', 'cn': f'bulk{i}', 'sn': 'Bulk',
+                  'gidNumber': 2000, 'homeDirectory': f'/home/bulk{i}'}
+                 for i in range(3)]
+        with patch("bituldap.create_connection",
+                   side_effect=create_connection):
+            results = b.bulk_create_users(users, workers=1)
+            self.assertEqual([result.success for result in results],
+                             [True, False, True])
+            self.assertIn('timeout', results[1].error)
+            self.assertIsNone(b.get_user('bulk1'))
+
+    @patch("bituldap.create_connection", return_value=config.connect())
+    def test_set_passwords(self, mock_connect):
+        connection = mock_connect.return_value[1]
+        users = [f'uid={uid},ou=people,dc=example,dc=org'
+                 for uid in ('acarr', 'eduncan', 'lisa59')]
+        passwords = {dn: f'secret-{i}' for i, dn in enumerate(users)}
+        passwords['uid=nobody,ou=people,dc=example,dc=org'] = 'secret'
+
+        config_ = b.read_configuration()
+        config_.password_hash = HASHED_SALTED_SHA512
+        try:
+            results = b.set_passwords(passwords, workers=2)
+        finally:
+            config_.password_hash = HASHED_SALTED_SHA
+
+        self.assertEqual([result.dn for result in results], list(passwords))
+        self.assertEqual([result.success for result in results],
+                         [True, True, True, False])
+        self.assertTrue(results[3].error)
+        connection.search(users[0], '(objectClass=*)',
+                          attributes=['userPassword'])
+        value = connection.response[0]['attributes']['userPassword'][0]
+        self.assertTrue(value.lower().startswith(b'{ssha512}'))
+
+    def test_set_passwords_pool_exhausted(self):
+        connected = config.connect()
+        users = [f'uid={uid},ou=people,dc=example,dc=org'
+                 for uid in ('acarr', 'eduncan', 'lisa59')]
+        passwords = {dn: 'secret' for dn in users}
+
+        # One worker times out waiting for a connection, the other sets
+        # all passwords.
+        with patch("bituldap.create_connection",
+                   side_effect=[PoolTimeoutError('timeout'), connected]):
+            results = b.set_passwords(passwords, workers=2)
+        self.assertEqual([result.success for result in results],
+                         [True, True, True])
+
+        with patch("bituldap.create_connection",
+                   side_effect=PoolTimeoutError('timeout')):
+            results = b.set_passwords(passwords, workers=2)
+        self.assertEqual([result.success for result in results],
+                         [False, False, False])
+        self.assertIn('timeout', results[0].error)